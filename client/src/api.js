@@ -3,8 +3,10 @@ const API_BASE_URL = 'http://127.0.0.1:8002';
 export const APIS = {
   plant: {
     getAll: "/plants/",
+    getAllExpanded: "/plants/?expand=species,system,mix,care_plan",
     create: "/plants/",
     getOne: "/plants/{id}/",
+    getOneExpanded: "/plants/{id}/?expand=species,system,mix,care_plan",
     updateOne: "/plants/{id}/",
     deleteOne: "/plants/{id}/",
     waterMany: "/plants/water/",
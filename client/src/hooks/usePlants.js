@@ -1,8 +1,21 @@
 import { useState, useEffect } from 'react';
 import { simplePost, simpleFetch, simplePatch,simpleDelete, APIS, apiBuilder } from '../api';
 
-/** Query all plants and their related data. */
-export const usePlants = (initialPlants) => {
+/** The display shape of a plant whose references the server expanded. */
+const withReferences = (plant) => ({
+  ...plant,
+  species: plant.species || { name: 'Unknown Species' },
+  system: plant.system || { name: 'Unknown System' },
+  mix: plant.mix || { name: 'Unknown Mix' },
+  carePlan: plant.care_plan || { name: 'Unknown Care Plan' },
+});
+
+/**
+ * Query all plants with their species, system, mix and care plan embedded.
+ * Pass `{ references: false }` to skip loading the full reference lists
+ * that only the plant forms need.
+ */
+export const usePlants = (initialPlants, { references = true } = {}) => {
   const [plants, setPlants] = useState([]);
   const [systems, setSystems] = useState([]);
   const [mixes, setMixes] = useState([]);
@@ -12,40 +25,35 @@ export const usePlants = (initialPlants) => {
   const [isLoading, setIsLoading] = useState(true); 
   const [error, setError] = useState(null);
 
+  /** Re-read a written plant with its references embedded. */
+  const fetchExpanded = async (id) =>
+    withReferences(await simpleFetch(apiBuilder(APIS.plant.getOneExpanded).setId(id).get()));
+
   useEffect(() => {
     const fetchData = async () => {
       setIsLoading(true);
       setError(null);
       try {
-        let fetchedPlants = [];
         if (!initialPlants) {
-          fetchedPlants = await simpleFetch(apiBuilder(APIS.plant.getAll).get());
+          // One request, the server joins the references
+          const fetchedPlants = await simpleFetch(apiBuilder(APIS.plant.getAllExpanded).get());
+          setPlants(fetchedPlants.map(withReferences));
         } else {
-          fetchedPlants = initialPlants;
+          setPlants(initialPlants);
         }
 
-        // Fetch all related data in parallel
-        const [fetchedSystems, fetchedSpecies, fetchedMixes, fetchedCarePlans] = await Promise.all([
-          simpleFetch(apiBuilder(APIS.system.getAll).get()),
-          simpleFetch(apiBuilder(APIS.species.getAll).get()),
-          simpleFetch(apiBuilder(APIS.mix.getAll).get()),
-          simpleFetch(apiBuilder(APIS.carePlans.getAll).get())
-        ]);
-
-        // Join all related data into plants
-        const plantsWithData = fetchedPlants.map(plant => ({
-          ...plant,
-          species: fetchedSpecies.find(s => s.id === plant.species_id) || { name: 'Unknown Species' },
-          system: fetchedSystems.find(s => s.id === plant.system_id) || { name: 'Unknown System' },
-          mix: fetchedMixes.find(m => m.id === plant.mix_id) || { name: 'Unknown Mix' },
-          carePlan: fetchedCarePlans.find(c => c.id === plant.care_plan_id) || { name: 'Unknown Care Plan' },
-        }));
-
-        setPlants(plantsWithData);
-        setSystems(fetchedSystems);
-        setMixes(fetchedMixes);
-        setCarePlans(fetchedCarePlans);
-        setSpecies(fetchedSpecies);
+        if (references) {
+          const [fetchedSystems, fetchedSpecies, fetchedMixes, fetchedCarePlans] = await Promise.all([
+            simpleFetch(apiBuilder(APIS.system.getAll).get()),
+            simpleFetch(apiBuilder(APIS.species.getAll).get()),
+            simpleFetch(apiBuilder(APIS.mix.getAll).get()),
+            simpleFetch(apiBuilder(APIS.carePlans.getAll).get())
+          ]);
+          setSystems(fetchedSystems);
+          setMixes(fetchedMixes);
+          setCarePlans(fetchedCarePlans);
+          setSpecies(fetchedSpecies);
+        }
 
       } catch (error) {
         console.error('Error fetching data:', error);
@@ -55,17 +63,16 @@ export const usePlants = (initialPlants) => {
       }
     };
     fetchData();
-  }, [initialPlants]);
+  }, [initialPlants, references]);
 
   const createPlant = async (newPlant) => {
     setIsLoading(true);
     setError(null); // Reset error before new action
     try {
       const createdPlant = await simplePost(apiBuilder(APIS.plant.create).get(), newPlant);
-      // Manually join species to the newly created plant to update UI instantly
-      const species = await simpleFetch(apiBuilder(APIS.species.getOne).setId(createdPlant.species_id).get());
-      const newPlantWithSpecies = { ...createdPlant, species };
-      setPlants(prevPlants => [...prevPlants, newPlantWithSpecies]);
+      // Same shape as the listed plants, so filters and cards keep working
+      const expandedPlant = await fetchExpanded(createdPlant.id);
+      setPlants(prevPlants => [...prevPlants, expandedPlant]);
     } catch (error) {
       setError(error.message || 'Failed to create plant.');
       throw error; // Re-throw for the component to handle
@@ -94,10 +101,9 @@ export const usePlants = (initialPlants) => {
     setIsLoading(true);
     setError(null);
     try {
-      const data = await simplePatch(apiBuilder(APIS.plant.updateOne).setId(id).get(), updatedPlant);
-      const species = await simpleFetch(apiBuilder(APIS.species.getOne).setId(data.species_id).get());
-      const updatedPlantWithSpecies = { ...data, species };
-      setPlants(prevPlants => prevPlants.map(plant => (plant.id === id ? updatedPlantWithSpecies : plant)));
+      await simplePatch(apiBuilder(APIS.plant.updateOne).setId(id).get(), updatedPlant);
+      const expandedPlant = await fetchExpanded(id);
+      setPlants(prevPlants => prevPlants.map(plant => (plant.id === id ? expandedPlant : plant)));
     } catch (error) {
       setError(error.message || 'Failed to update plant.');
       throw error;
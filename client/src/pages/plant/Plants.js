@@ -61,7 +61,15 @@ const SystemFilter = ({ systems, selectedSystem, setSelectedSystem }) => (
 const PlantsList = () => {
     const [activeFilters, setActiveFilters] = useState([]);
     const [searchTerm, setSearchTerm] = useState('');
-    const { plants, systems, isLoading, error, deprecatePlant, updatePlant } = usePlants();
+    const { plants, isLoading, error, deprecatePlant, updatePlant } = usePlants(undefined, { references: false });
+    // Only systems that hold plants are worth filtering on
+    const systems = useMemo(() => {
+        const bySystemId = new Map();
+        plants.forEach(plant => {
+            if (plant.system && plant.system.id) bySystemId.set(plant.system.id, plant.system);
+        });
+        return [...bySystemId.values()];
+    }, [plants]);
     const [selectedSystem, setSelectedSystem] = useState(null);
     const { id } = useParams();
 
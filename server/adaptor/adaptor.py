@@ -12,11 +12,14 @@ from flask import Flask, jsonify, Response
 from flask_cors import CORS
 
 from shared.adaptor import generate_frames, read_sensor
+from shared.compression import init_compression
 from shared.logger import setup_logger
 
 logger = setup_logger(__name__, logging.DEBUG)
 
 app = Flask(__name__)
+# The MJPEG feed is streamed as is, sensor readings are below the threshold
+init_compression(app)
 
 
 @app.route("/video_feed")
@@ -2,259 +2,337 @@
 This module handles background tasks for the application using APScheduler.
 """
 
+import functools
+import os
 import time
-from datetime import datetime, timedelta, timezone
-from typing import List, Dict
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
 from flask import Flask
 from flask_apscheduler import APScheduler
-from models.plant import Plant, CarePlan, PlantCareEvent, CareEventType
-from models.alert import Alert, AlertTypes
+from models.plant import PlantCareEvent, CARE_EVENTS
+from models.alert import Alert
 from models.app import Brain, STATUS
-from shared.db import Table
+from shared.db import Table, MAX_PAGE_SIZE
+from shared import queue
+from shared.alerts import DUE_ALERTS
+from shared.job_history import record_run
+from shared.lease import Lease
 from shared.logger import logger
 
 # Initialize the scheduler
 scheduler: APScheduler = APScheduler()
 
+# Seconds a job lease survives without a heartbeat, e.g. after a crash.
+JOB_LEASE_TTL_SECONDS = float(os.getenv("JOB_LEASE_TTL_SECONDS", "60"))
+
+
+def leased(name: str, when: Optional[Callable[[], bool]] = None) -> Callable:
+    """
+    Run the decorated job only while holding the job's lease, so it never
+    runs twice at once across processes or hosts. The job is passed the
+    lease, whose token fences what it records. Every run is recorded in the
+    job history.
+
+    Args:
+        name: Name of the job's lease and history
+        when: Cheap check run first; when it returns False the job is
+            skipped without taking the lease or recording a run
+    """
+
+    def decorator(job: Callable) -> Callable:
+        @functools.wraps(job)
+        def wrapper():
+            if when is not None and not when():
+                return None
+            lease = Lease(name, JOB_LEASE_TTL_SECONDS)
+            if not lease.acquire():
+                logger.info(f"Skipping {name} - lease held by another process")
+                return None
+            try:
+                return record_run(name, lambda: job(lease=lease))
+            finally:
+                lease.release()
+
+        return wrapper
+
+    return decorator
+
+
+def _save_brain(brain: Brain, prefix: str, lease: Optional[Lease]) -> None:
+    """
+    Record one job's run on the Brain, fenced by the job's lease token.
+
+    Only the job's own fields are written, and only if no run holding a
+    newer lease has recorded itself in the meantime.
+    """
+    fields = {
+        key: value
+        for key, value in brain.to_dict().items()
+        if key.startswith(prefix) or key == "updated_on"
+    }
+    condition = {}
+    if lease is not None:
+        token_field = f"{prefix}_token"
+        condition = {"$or": [{token_field: None}, {token_field: {"$lte": lease.token}}]}
+    if not Table.BRAIN.update_fields(str(brain.id), fields, condition):
+        logger.warning(
+            f"Not recording {prefix} run with stale lease token "
+            f"{lease.token if lease else None}"
+        )
+
 
 @scheduler.task("cron", id="manage_plant_alerts_job", hour=23)
-def manage_plant_alerts() -> None:
+@leased("manage_plant_alerts")
+def manage_plant_alerts(lease: Optional[Lease] = None) -> Dict[str, Any]:
     """
-    Cron job to create watering alerts for plants that are due.
+    Cron job to create care alerts for plants that are due.
     This job runs daily at 23:00 to check for plants that need care.
+
+    Plants carry precomputed due dates, so each kind of care is one indexed
+    range query for the due plants, one lookup of their existing alerts and
+    one bulk insert. The work tracks the number of due plants, not all plants.
     """
     logger.info("Running manage_plant_alerts job...")
 
-    # Check if 24 hours have passed since last run
+    # The schedule and the lease decide when this runs, reruns are harmless
     brain = Brain.get_brain()
-    if brain.plant_alert_check_last_run:
-        hours_since_last = (
-            datetime.now(timezone.utc) - brain.plant_alert_check_last_run
-        ).total_seconds() / 3600
-        if hours_since_last < 24:
-            logger.info(
-                f"Skipping plant alerts job - only {hours_since_last:.1f} hours since last run"
-            )
-            return
-
     start_time = time.time()
+    token = lease.token if lease else None
 
     try:
-        # Fetch all existing alerts to avoid creating duplicates
-        existing_alerts: List[Alert] = Table.ALERT.get_many()
-        plants_with_alerts: Dict[str, Alert] = {
-            str(alert.model_id): alert for alert in existing_alerts
-        }
-
-        # Fetch all plants and care plans
-        plants: List[Plant] = Table.PLANT.get_many()
-        care_plans_list: List[CarePlan] = Table.CARE_PLAN.get_many()
-        care_plans: Dict[str, CarePlan] = {str(cp.id): cp for cp in care_plans_list}
-
-        now = datetime.now(timezone.utc)
-        alerts_created_count = 0
-
-        for plant in plants:
-            plant_id_str = str(plant.id)
-            care_plan: CarePlan = (
-                care_plans.get(str(plant.care_plan_id)) if plant.care_plan_id else None
-            )
-
-            if care_plan is None:
-                continue
-
-            try:
-                # Check for watering alert
-                if not _has_alert_type(
-                    plants_with_alerts, plant_id_str, AlertTypes.WATER
-                ):
-                    if care_plan.watering and plant.watered_on:
-                        water_due_date = plant.watered_on + timedelta(
-                            days=float(care_plan.watering)
-                        )
-                        if water_due_date < now:
-                            new_alert = Alert(
-                                model_id=plant.id, alert_type=AlertTypes.WATER
-                            )
-                            Table.ALERT.create(new_alert)
-                            alerts_created_count += 1
-                            logger.info(
-                                f"Created watering alert for plant: ID: {plant.id}"
-                            )
-
-                # Check for fertilize alert
-                if not _has_alert_type(
-                    plants_with_alerts, plant_id_str, AlertTypes.FERTILIZE
-                ):
-                    if care_plan.fertilizing and plant.fertilized_on:
-                        fertilize_due_date = plant.fertilized_on + timedelta(
-                            days=float(care_plan.fertilizing)
-                        )
-                        if fertilize_due_date < now:
-                            new_alert = Alert(
-                                model_id=plant.id, alert_type=AlertTypes.FERTILIZE
-                            )
-                            Table.ALERT.create(new_alert)
-                            alerts_created_count += 1
-                            logger.info(
-                                f"Created fertilize alert for plant: ID: {plant.id}"
-                            )
-
-                # Check for repot alert
-                if not _has_alert_type(
-                    plants_with_alerts, plant_id_str, AlertTypes.REPOT
-                ):
-                    if care_plan.potting and plant.potted_on:
-                        potting_due_date = plant.potted_on + timedelta(
-                            days=float(care_plan.potting)
-                        )
-                        if potting_due_date < now:
-                            new_alert = Alert(
-                                model_id=plant.id, alert_type=AlertTypes.REPOT
-                            )
-                            Table.ALERT.create(new_alert)
-                            alerts_created_count += 1
-                            logger.info(
-                                f"Created repot alert for plant: ID: {plant.id}"
-                            )
-
-                # Check for cleanse alert
-                if not _has_alert_type(
-                    plants_with_alerts, plant_id_str, AlertTypes.CLEANSE
-                ):
-                    if care_plan.cleaning and plant.cleansed_on:
-                        cleaning_due_date = plant.cleansed_on + timedelta(
-                            days=float(care_plan.cleaning)
-                        )
-                        if cleaning_due_date < now:
-                            new_alert = Alert(
-                                model_id=plant.id, alert_type=AlertTypes.CLEANSE
-                            )
-                            Table.ALERT.create(new_alert)
-                            alerts_created_count += 1
-                            logger.info(
-                                f"Created cleanse alert for plant: ID: {plant.id}"
-                            )
-
-            except (ValueError, TypeError) as e:
-                logger.warning(
-                    f"Could not process care schedule for plant ID: {plant.id}. Error: {e}"
-                )
+        stats = _create_due_alerts()
 
         logger.info(
-            f"Finished manage_plant_alerts job. Created {alerts_created_count} new alerts."
+            f"Finished manage_plant_alerts job. Created {stats['items_written']} "
+            f"new alerts for {stats['items_scanned']} overdue plant cares."
         )
 
         # Update brain with successful completion
         duration = time.time() - start_time
-        brain.update_plant_alert_check(duration, STATUS.SUCCESS)
-        Table.BRAIN.update(str(brain.id), brain)
+        brain.update_plant_alert_check(duration, STATUS.SUCCESS, token)
+        _save_brain(brain, "plant_alert_check", lease)
+        return stats
 
     except Exception as e:
         logger.exception(f"An error occurred during the manage_plant_alerts job: {e}")
 
         # Update brain with failure status
         duration = time.time() - start_time
-        brain.update_plant_alert_check(duration, STATUS.FAILED)
-        Table.BRAIN.update(str(brain.id), brain)
+        brain.update_plant_alert_check(duration, STATUS.FAILED, token)
+        _save_brain(brain, "plant_alert_check", lease)
+        raise
 
 
-@scheduler.task("interval", id="detect_plant_care_events_job", hours=1)
-def detect_plant_care_events() -> None:
-    """
-    Hourly job to detect care events by comparing plant timestamps against last recorded events.
-    Creates new care events when timestamps indicate care has occurred.
+def _create_due_alerts() -> Dict[str, int]:
     """
-    logger.info("Running detect_plant_care_events job...")
+    Create the missing alerts of every plant whose care is overdue.
 
-    # Check if 1 hour has passed since last run
-    brain = Brain.get_brain()
-    if brain.plant_care_event_check_last_run:
-        hours_since_last = (
-            datetime.now(timezone.utc) - brain.plant_care_event_check_last_run
-        ).total_seconds() / 3600
-        if hours_since_last < 1:
-            logger.info(
-                f"Skipping care event detection - only {hours_since_last*60:.1f} minutes since last run"
+    Alerts are upserted on the unique (model_id, alert_type) index, so a
+    plant's open alert of one care never hides a missing one of another,
+    and reruns or concurrent runs never duplicate them.
+
+    Returns:
+        Overdue plant cares scanned and alerts written
+    """
+    now = datetime.now()
+    stats = {"items_scanned": 0, "items_written": 0}
+
+    for due_field, alert_type in DUE_ALERTS.items():
+        due_ids = [
+            plant.id
+            for plant in Table.PLANT.get_many(
+                {"banished": False, due_field: {"$lt": now}}, fields=["id"]
             )
-            return
+        ]
+        stats["items_scanned"] += len(due_ids)
+        if not due_ids:
+            continue
+
+        report = Table.ALERT.bulk_insert_missing(
+            [Alert(model_id=plant_id, alert_type=alert_type) for plant_id in due_ids],
+            ("model_id", "alert_type"),
+        )
+        for item in report["results"]:
+            if not item["ok"] and not _is_duplicate(item):
+                logger.warning(
+                    f"Could not create {alert_type.value} alert: {item['error']}"
+                )
+        if report["upserted"]:
+            stats["items_written"] += report["upserted"]
+            logger.info(f"Created {report['upserted']} {alert_type.value} alerts")
 
-    start_time = time.time()
+    return stats
 
-    try:
-        # Get all active plants
-        plants: List[Plant] = Table.PLANT.get_many({"banished": False})
-        events_created = 0
-        last_run_time = brain.plant_care_event_check_last_run
-
-        for plant in plants:
-            # Check each care type
-            care_checks = [
-                (CareEventType.WATER, plant.watered_on),
-                (CareEventType.FERTILIZE, plant.fertilized_on),
-                (CareEventType.REPOT, plant.potted_on),
-                (CareEventType.CLEANSE, plant.cleansed_on),
-            ]
-
-            for event_type, plant_timestamp in care_checks:
-                if plant_timestamp is None:
-                    continue
 
-                # Only create event if plant timestamp is after last run time
-                should_create_event = (
-                    last_run_time is None or plant_timestamp > last_run_time
-                )
+@queue.handler("recompute_alerts", concurrency=1, visibility_timeout=600)
+def recompute_alerts(payload: Dict[str, Any]) -> Dict[str, int]:
+    """Queued, on demand version of `manage_plant_alerts`."""
+    return _create_due_alerts()
 
-                if should_create_event:
-                    # Check if we already have an event for this timestamp to avoid duplicates
-                    existing_events = Table.PLANT_CARE_EVENT.get_many(
-                        {
-                            "plant_id": plant.id,
-                            "event_type": event_type.value,
-                            "performed_on": plant_timestamp,
-                        }
-                    )
 
-                    if not existing_events:
-                        new_event = PlantCareEvent(
-                            plant_id=plant.id,
-                            event_type=event_type,
-                            performed_on=plant_timestamp,
-                            notes=f"Detected from plant {event_type.value.lower()} timestamp",
-                        )
+def _outbox_pending() -> bool:
+    """Whether any care events wait in the outbox."""
+    return Table.CARE_EVENT_OUTBOX.count() > 0
+
 
-                        Table.PLANT_CARE_EVENT.create(new_event)
-                        events_created += 1
-                        logger.info(
-                            f"Created {event_type.value} event for plant {plant.id} at {plant_timestamp}"
-                        )
+@scheduler.task("interval", id="drain_care_event_outbox_job", seconds=30)
+@leased("drain_care_event_outbox", when=_outbox_pending)
+def drain_care_event_outbox(lease: Optional[Lease] = None) -> Dict[str, int]:
+    """
+    Deliver the care events that plant updates left in the outbox. Runs
+    with an empty outbox are skipped before taking the lease, so idle runs
+    write nothing.
 
+    Events are moved a batch at a time: one bulk insert into the care event
+    collection, then one bulk delete of what was delivered. Events that were
+    already recorded count as delivered. A batch with failures stops the
+    drain so those events are retried on the next run.
+
+    Returns:
+        Drain stats: events read, events delivered and batches
+    """
+    stats = {"items_scanned": 0, "items_written": 0, "batches": 0}
+    while True:
+        events, next_cursor = Table.CARE_EVENT_OUTBOX.get_page(limit=MAX_PAGE_SIZE)
+        if not events:
+            break
+
+        report = Table.PLANT_CARE_EVENT.bulk_create(events)
+        delivered = [
+            result["id"]
+            for result in report["results"]
+            if result["ok"] or _is_duplicate(result)
+        ]
+        Table.CARE_EVENT_OUTBOX.bulk_delete(delivered)
+        stats["batches"] += 1
+        stats["items_scanned"] += len(events)
+        stats["items_written"] += len(delivered)
+
+        if len(delivered) < len(events):
+            logger.warning(
+                f"Could not deliver {len(events) - len(delivered)} care events, "
+                "retrying on the next drain"
+            )
+            break
+        if next_cursor is None:
+            break
+
+    if stats["items_written"]:
         logger.info(
-            f"Care event detection completed. Created {events_created} new events."
+            f"Delivered {stats['items_written']} care events in {stats['batches']} batches"
+        )
+    return stats
+
+
+@scheduler.task("cron", id="detect_plant_care_events_job", hour=3)
+@leased("detect_plant_care_events")
+def detect_plant_care_events(lease: Optional[Lease] = None) -> Dict[str, Any]:
+    """
+    Daily reconciliation of care events against plant care timestamps.
+
+    Plant updates record their care events through the outbox; this is the
+    safety net for events that never made it there. Only plants whose
+    `updated_on` moved since the last run are scanned, and only API writes
+    and new plants set it, so edits made directly in the database that
+    leave `updated_on` alone are not caught.
+    """
+    logger.info("Running detect_plant_care_events job...")
+
+    brain = Brain.get_brain()
+    start_time = time.time()
+    token = lease.token if lease else None
+    started_on = datetime.now()
+
+    try:
+        stats = _record_care_events(brain.plant_care_event_check_last_run)
+        logger.info(
+            f"Care event detection completed. Scanned {stats['items_scanned']} "
+            f"changed plants in {stats['batches']} batches, created "
+            f"{stats['items_written']} new events, skipped "
+            f"{stats['duplicates']} already recorded."
         )
 
         # Update brain with successful completion
         duration = time.time() - start_time
-        brain.update_plant_care_event_check(duration, STATUS.SUCCESS)
-        Table.BRAIN.update(str(brain.id), brain)
+        brain.update_plant_care_event_check(duration, STATUS.SUCCESS, started_on, token)
+        _save_brain(brain, "plant_care_event_check", lease)
+        return stats
 
     except Exception as e:
         logger.exception(f"An error occurred during care event detection: {e}")
 
-        # Update brain with failure status
+        # Update brain with failure status, keeping the previous watermark
         duration = time.time() - start_time
-        brain.update_plant_care_event_check(duration, STATUS.FAILED)
-        Table.BRAIN.update(str(brain.id), brain)
-
-
-def _has_alert_type(
-    plants_with_alerts: Dict[str, Alert], plant_id: str, alert_type: AlertTypes
-) -> bool:
-    """Check if plant already has an alert of the specified type."""
-    return (
-        plant_id in plants_with_alerts
-        and plants_with_alerts[plant_id].alert_type == alert_type
-    )
+        brain.update_plant_care_event_check(
+            duration,
+            STATUS.FAILED,
+            brain.plant_care_event_check_last_run,
+            token,
+        )
+        _save_brain(brain, "plant_care_event_check", lease)
+        raise
+
+
+def _record_care_events(since: Optional[datetime]) -> Dict[str, int]:
+    """
+    Record a care event for every care timestamp of plants changed since the
+    given time.
+
+    Changed plants are found through the `updated_on` index and read a page
+    at a time. Each page is written with one unordered bulk insert; the
+    unique (plant_id, event_type, performed_on) index rejects events that
+    were already recorded, so no existence queries are needed.
+
+    Returns:
+        Run stats: plants scanned, events written, batches and duplicates
+    """
+    query: Dict[str, Any] = {"banished": False}
+    if since is not None:
+        query["updated_on"] = {"$gte": since}
+
+    stats = {"items_scanned": 0, "items_written": 0, "batches": 0, "duplicates": 0}
+    cursor = None
+    while True:
+        plants, cursor = Table.PLANT.get_page(
+            query,
+            limit=MAX_PAGE_SIZE,
+            after=cursor,
+            sort_key="updated_on",
+            fields=list(CARE_EVENTS),
+        )
+        events = [
+            PlantCareEvent(
+                plant_id=plant.id,
+                event_type=event_type,
+                performed_on=getattr(plant, field),
+                notes=f"Detected from plant {event_type.value.lower()} timestamp",
+            )
+            for plant in plants
+            for field, event_type in CARE_EVENTS.items()
+            if getattr(plant, field) is not None
+        ]
+        if events:
+            report = Table.PLANT_CARE_EVENT.bulk_create(events)
+            stats["items_written"] += report["inserted"]
+            for item in report["results"]:
+                if item["ok"]:
+                    continue
+                if _is_duplicate(item):
+                    stats["duplicates"] += 1
+                else:
+                    logger.warning(
+                        f"Could not record care event for plant: {item['error']}"
+                    )
+
+        stats["items_scanned"] += len(plants)
+        stats["batches"] += 1
+        if cursor is None:
+            return stats
+
+
+def _is_duplicate(result: Dict[str, Any]) -> bool:
+    """Whether a bulk write result failed on a unique index."""
+    return "E11000" in (result["error"] or "")
 
 
 def init_scheduler(app: Flask) -> None:
@@ -26,16 +26,13 @@ if [ $attempt -eq $max_attempts ]; then
     exit 1
 fi
  
-# Navigate to app directory and start Flask
-echo "==== STARTING FLASK APPLICATION ===="
 cd /app/app
  
-exec gunicorn \
-    --bind 0.0.0.0:5000 \
-    --workers 2 \
-    --threads 2 \
-    --timeout 120 \
-    --log-level warning \
-    --access-logfile - \
-    --error-logfile - \
-    app:app
\ No newline at end of file
+# Start the background worker, or by default the Flask application
+if [ "${1:-web}" = "worker" ]; then
+    echo "==== STARTING BACKGROUND WORKER ===="
+    exec python3 worker.py
+fi
+ 
+echo "==== STARTING FLASK APPLICATION ===="
+exec gunicorn --config gunicorn.conf.py 'app:create_app()'
\ No newline at end of file
@@ -0,0 +1,34 @@
+"""
+Gunicorn configuration, loading the app with `app:create_app()`.
+
+The app is preloaded in the master, so the imported code is shared
+copy-on-write by every worker; `create_app` does no I/O. The one-time boot
+work (install, index reconciliation) then runs once in the master from
+`on_starting`, after the app is loaded and before any worker forks.
+Per-worker state is set up in `post_fork`. Scheduled jobs run in the
+separate worker process (`worker.py`), never in the webserver.
+"""
+
+bind = "0.0.0.0:5000"
+workers = 2
+threads = 2
+timeout = 120
+loglevel = "warning"
+accesslog = "-"
+errorlog = "-"
+
+preload_app = True
+
+
+def on_starting(_server):
+    """Boot the deployment once, before any worker forks."""
+    from app import boot
+
+    boot()
+
+
+def post_fork(_server, _worker):
+    """Give every freshly forked worker its own database clients."""
+    from app import init_worker
+
+    init_worker()
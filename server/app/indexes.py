@@ -0,0 +1,58 @@
+"""
+Reconciles the MongoDB indexes declared on `Table` with the live database.
+
+Runs at startup, and can be run on demand:
+    python indexes.py [--drop-extra]
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.db import reconcile_indexes
+from shared.logger import setup_logger
+
+# Create a logger for this specific module
+logger = setup_logger(__name__, logging.DEBUG)
+
+
+def ensure_indexes(drop_extra: bool = False) -> bool:
+    """
+    Create missing indexes and report extra or changed ones.
+
+    Returns:
+        bool: True if every declared index is in place.
+    """
+    logger.info("Reconciling indexes")
+    healthy = True
+
+    for table_name, report in reconcile_indexes(drop_extra).items():
+        for name in report["created"]:
+            logger.info(f"Created index {table_name}.{name}")
+        for name in report["dropped"]:
+            logger.info(f"Dropped index {table_name}.{name}")
+        for name in report["extra"]:
+            if name not in report["dropped"]:
+                logger.warning(f"Index {table_name}.{name} is not declared on Table")
+        for name in report["changed"]:
+            logger.warning(f"Index {table_name}.{name} differs from its declaration")
+        for name in report["failed"]:
+            logger.error(f"Index {table_name}.{name} could not be created")
+        healthy = healthy and not report["changed"] and not report["failed"]
+
+    logger.info("Index reconciliation complete")
+    return healthy
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--drop-extra",
+        action="store_true",
+        help="drop indexes that are not declared on Table",
+    )
+    args = parser.parse_args()
+    sys.exit(0 if ensure_indexes(args.drop_extra) else 1)
@@ -1,9 +1,17 @@
 """
 Process dedicated to installing static data (e.g. genuses, species, etc).
 Could eventually see this moving to cloud.
+
+Every installed file is recorded in `Table.INSTALL_RECORD` with a hash of its
+contents, so restarting the app only reloads files that actually changed.
 """
-from typing import List, Tuple
+import hashlib
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
 from models import FlexibleModel
+from models.app import InstallRecord
 from shared.db import Table
 from shared.logger import setup_logger
 import logging
@@ -11,43 +19,186 @@ import logging
 # Create a logger for this specific module
 logger = setup_logger(__name__, logging.DEBUG)
 
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
+INSTALL_BATCH_SIZE = 500
+
+# Bump to force every file to reload, e.g. when how rows are written changes.
+INSTALL_VERSION = 1
+
+# (path relative to DATA_DIR, table, field identifying an existing row).
+# Ordered so referenced rows are written before the rows that reference them.
+INSTALLABLES: List[Tuple[str, Table, str]] = [
+    ("installable/soils/soils.csv", Table.SOIL, "name"),
+    ("installable/plants/genus_types.csv", Table.GENUS_TYPE, "_id"),
+    ("installable/plants/genera.csv", Table.GENUS, "_id"),
+    ("installable/plants/species.csv", Table.SPECIES, "_id"),
+    ("installable/plants/monstera.csv", Table.SPECIES, "_id"),
+    ("installable/plants/philos.csv", Table.SPECIES, "_id"),
+]
+
+
+def checksum(model_path: str) -> str:
+    """Hash the contents of a data file along with the installer version."""
+    digest = hashlib.sha256(f"v{INSTALL_VERSION}:".encode())
+    with open(model_path, "rb") as file:
+        for chunk in iter(lambda: file.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
 
-def create_model(model_path: str, table: Table):
-    """Create the provided model from the data path."""
+def _installed_checksum(file: str) -> Optional[str]:
+    """Checksum recorded for the file by the last successful install."""
+    records = Table.INSTALL_RECORD.get_many({"file": file}, limit=1)
+    return records[0].checksum if records else None
+
+
+def create_model(model_path: str, table: Table, key: str = "_id") -> int:
+    """
+    Create the provided model from the data path in batched bulk upserts.
+
+    Args:
+        model_path: CSV file to load
+        table: Table the rows belong to
+        key: Field identifying a row that was installed before
+
+    Returns:
+        Number of rows inserted or modified
+
+    Raises:
+        RuntimeError: If any row failed to write
+    """
     logger.info(f"Beginning to create model {table.table_name}")
 
     # Load models from CSV and insert them
     models: List[FlexibleModel] = table.model_class.from_csv(model_path)
-
-    if models:
-        for doc in models:
-            table.upsert(str(doc.id), doc)
-        logger.info(
-            f"Successfully upserted {len(models)} documents for {table.table_name}"
-        )
-    else:
+    if not models:
         logger.error(f"No documents to create for {table.table_name}")
+        return 0
+
+    written = 0
+    for start in range(0, len(models), INSTALL_BATCH_SIZE):
+        report = table.bulk_upsert(models[start : start + INSTALL_BATCH_SIZE], key)
+        failed = [item for item in report["results"] if not item["ok"]]
+        if failed:
+            raise RuntimeError(
+                f"Failed to write {len(failed)} rows from {model_path}: "
+                f"{failed[0]['error']}"
+            )
+        written += report["upserted"] + report["modified"]
+
+    logger.info(
+        f"Successfully upserted {len(models)} documents for {table.table_name} "
+        f"({written} written)"
+    )
+    return written
 
 
-def create_all_models():
-    """Create all of our packaged models on installation."""
+def create_all_models() -> Dict[str, Any]:
+    """
+    Create all of our packaged models on installation, skipping files whose
+    contents match the install manifest.
+
+    Returns:
+        Summary with per-file status, rows written and time taken
+    """
     logger.info("Beginning to upsert models.")
+    started = time.perf_counter()
+    summary: Dict[str, Any] = {
+        "files": {},
+        "installed": 0,
+        "skipped": 0,
+        "rows_written": 0,
+    }
+
+    for file, table, key in INSTALLABLES:
+        model_path = os.path.join(DATA_DIR, file)
+        file_started = time.perf_counter()
+        file_checksum = checksum(model_path)
 
-    models_to_create: List[Tuple[str, Table]] = [
-        ("../data/installable/soils/soils.csv", Table.SOIL),
-        ("../data/installable/plants/genus_types.csv", Table.GENUS_TYPE),
-        ("../data/installable/plants/genera.csv", Table.GENUS),
-        ("../data/installable/plants/species.csv", Table.SPECIES),
-    ]
+        if _installed_checksum(file) == file_checksum:
+            summary["skipped"] += 1
+            summary["files"][file] = {"status": "skipped", "rows_written": 0}
+            continue
 
-    for model_path, table in models_to_create:
-        create_model(model_path, table)
+        written = create_model(model_path, table, key)
+        # Only recorded once every row is written, so a failed file retries.
+        Table.INSTALL_RECORD.bulk_upsert(
+            [
+                InstallRecord(
+                    file=file,
+                    table_name=table.table_name,
+                    checksum=file_checksum,
+                    rows=written,
+                    installed_on=datetime.now(),
+                )
+            ],
+            "file",
+        )
+        summary["installed"] += 1
+        summary["rows_written"] += written
+        summary["files"][file] = {
+            "status": "installed",
+            "rows_written": written,
+            "seconds": round(time.perf_counter() - file_started, 3),
+        }
 
-    logger.info("All models have been created.")
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    logger.info(
+        f"All models have been created: {summary['installed']} files installed, "
+        f"{summary['skipped']} unchanged, {summary['rows_written']} rows written "
+        f"in {summary['seconds']}s"
+    )
+    return summary
 
 
-def install():
+def install() -> Dict[str, Any]:
     """Initialize the database with required data"""
     logger.info("Installation starting")
-    create_all_models()
+    summary = create_all_models()
     logger.info("Installation complete")
+    return summary
+
+
+def remove_duplicate_soils() -> int:
+    """
+    Delete all but the oldest soil of every name, pointing mixes that used a
+    deleted soil at the kept one.
+
+    Earlier installs inserted soils.csv again on every boot, and the unique
+    soil name index cannot be built over the copies.
+
+    Returns:
+        Number of soils deleted
+    """
+    groups = Table.SOIL.aggregate(
+        [
+            {"$sort": {"created_on": 1, "_id": 1}},
+            {
+                "$group": {
+                    "_id": "$name",
+                    "ids": {"$push": "$_id"},
+                    "count": {"$sum": 1},
+                }
+            },
+            {"$match": {"count": {"$gt": 1}}},
+        ]
+    )
+    kept_by_duplicate = {
+        id: group["ids"][0] for group in groups for id in group["ids"][1:]
+    }
+    if not kept_by_duplicate:
+        return 0
+
+    mixes = Table.MIX.get_many(
+        {"soil_parts.soil_id": {"$in": list(kept_by_duplicate)}}
+    )
+    changes = {}
+    for mix in mixes:
+        for part in mix.soil_parts:
+            part.soil_id = kept_by_duplicate.get(part.soil_id, part.soil_id)
+        changes[mix.id] = {"soil_parts": [part.to_dict() for part in mix.soil_parts]}
+    if changes:
+        Table.MIX.bulk_set(changes)
+        logger.info(f"Pointed {len(changes)} mixes at deduplicated soils")
+
+    return Table.SOIL.bulk_delete([str(id) for id in kept_by_duplicate])["deleted"]
@@ -1,7 +1,14 @@
-from flask import Blueprint, request, jsonify
-from typing import List, Callable, Type
-from shared.db import Table
+import hashlib
+from contextlib import nullcontext
+from dataclasses import dataclass
+from datetime import datetime
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from typing import Any, Dict, List, Callable, Optional, Type
+from shared.db import Table, DEFAULT_PAGE_SIZE, table_versions, transaction
+from bson import ObjectId
 from shared.logger import logger
+from shared.response_cache import cached
+from shared.serialization import dumps, wants_msgpack
 from models import FlexibleModel
 from pydantic import ValidationError
 
@@ -19,13 +26,41 @@ READ_ONLY_FIELDS = {"id", "created_at", "updated_at", "created_on", "updated_on"
 # Internal fields that should not be exposed to clients.
 INTERNAL_FIELDS = {"container_id", "is_local", "url"}
 
+# Maximum number of items accepted by a single bulk request.
+MAX_BULK_SIZE = 1000
+
+
+@dataclass
+class Expansion:
+    """A referenced document that `?expand=` embeds in read responses."""
+
+    # Field of the read document holding the referenced id
+    field: str
+    table: "Table"
+    # Fields of the referenced document to embed
+    fields: List[str]
+
 
 class GenericCRUD:
-    def __init__(self, table: "Table"):
+    def __init__(
+        self,
+        table: "Table",
+        trusted_reads: bool = False,
+        outbox: Optional["Table"] = None,
+        expansions: Optional[Dict[str, Expansion]] = None,
+    ):
         # The specific model class (e.g., User, Product) is now derived
         # directly from the `table` object.
         self.table: "Table" = table
         self.model_class: Type[FlexibleModel] = table.model_class
+        # Trusted reads skip pydantic and serialize raw documents directly.
+        # Only enable for collections written exclusively through our models.
+        self.trusted_reads: bool = trusted_reads
+        # Entries from `_outbox_entries` are written to this table in the
+        # same transaction as the update that produced them.
+        self.outbox: Optional["Table"] = outbox
+        # References a read may embed with `?expand=name,...`
+        self.expansions: Dict[str, Expansion] = expansions or {}
 
     def _filter_request_data(self, data: dict) -> dict:
         """Removes read-only and internal fields from incoming request data."""
@@ -45,35 +80,257 @@ class GenericCRUD:
             sanitized.append(error_copy)
         return sanitized
 
+    def _requested_fields(self) -> Optional[List[str]]:
+        """Parses and validates the `?fields=a,b,c` projection parameter."""
+        fields = request.args.get("fields")
+        if not fields:
+            return None
+        fields = [field.strip() for field in fields.split(",") if field.strip()]
+        self.table.check_fields(fields)
+        return fields
+
+    def _requested_limit(self) -> int:
+        """Parses the `?limit=` page size; its range is checked by the Table."""
+        limit = request.args.get("limit")
+        if limit is None:
+            return DEFAULT_PAGE_SIZE
+        try:
+            return int(limit)
+        except ValueError:
+            raise ValueError(f"limit must be an integer, got '{limit}'")
+
+    def _requested_sort(self) -> str:
+        """Parses the `?sort=` key, which must lead one of the table's indexes."""
+        sort_key = request.args.get("sort", "_id")
+        if sort_key.lstrip("-") not in self.table.sort_keys:
+            raise ValueError(
+                f"Cannot sort on '{sort_key.lstrip('-')}', "
+                f"expected any of {', '.join(self.table.sort_keys)}"
+            )
+        return sort_key
+
+    def _requested_expansions(self) -> List[str]:
+        """Parses and validates the `?expand=a,b` parameter."""
+        names = [
+            name.strip()
+            for name in request.args.get("expand", "").split(",")
+            if name.strip()
+        ]
+        unknown = [name for name in names if name not in self.expansions]
+        if unknown:
+            raise ValueError(
+                f"Cannot expand {', '.join(unknown)}, "
+                f"expected any of {', '.join(sorted(self.expansions))}"
+            )
+        return names
+
+    def _expand(self, docs: List[Dict[str, Any]], names: List[str]) -> None:
+        """
+        Embeds the requested references in serialized documents, in place.
+
+        Each reference costs one `$in` query for the ids the documents
+        actually use, projected down to the expansion's fields. Missing
+        references are embedded as None.
+        """
+        for name in names:
+            expansion = self.expansions[name]
+            ids = {
+                ObjectId(str(doc[expansion.field]))
+                for doc in docs
+                if ObjectId.is_valid(str(doc.get(expansion.field)))
+            }
+            referenced = {}
+            if ids:
+                referenced = {
+                    str(item.id): item.model_dump()
+                    for item in expansion.table.get_many(
+                        {"_id": {"$in": list(ids)}}, fields=expansion.fields
+                    )
+                }
+            for doc in docs:
+                doc[name] = referenced.get(str(doc.get(expansion.field)))
+
+    def _etag(self, expand: List[str]) -> str:
+        """
+        Weak ETag of a read, from the versions of every table it reads.
+
+        Versions are read before the documents, so a write landing in between
+        can only make the ETag older than the response, never newer.
+        """
+        tables = [self.table] + [self.expansions[name].table for name in expand]
+        # Every URL and body format of a read is a different entity
+        token = "|".join(
+            table_versions(tables) + [request.full_path, str(wants_msgpack())]
+        )
+        return hashlib.blake2b(token.encode(), digest_size=12).hexdigest()
+
+    def _not_modified(self, etag: str) -> Optional[Response]:
+        """A 304 response when the client already holds this version."""
+        if not request.if_none_match.contains_weak(etag):
+            return None
+        return self._conditional(Response(status=304), etag)
+
+    def _conditional(self, response: Response, etag: str) -> Response:
+        """Tags a read response, asking clients to revalidate before reuse."""
+        response.set_etag(etag, weak=True)
+        response.cache_control.no_cache = True
+        response.vary.add("Accept")
+        return response
+
+    def _before_write(self, items: List[FlexibleModel]) -> None:
+        """Hook to derive fields of items about to be created or updated."""
+
+    def _after_write(self, items: List[FlexibleModel]) -> None:
+        """Hook to propagate items that were just updated to dependent data."""
+
+    def _outbox_entries(
+        self, before: FlexibleModel, after: FlexibleModel
+    ) -> List[FlexibleModel]:
+        """Hook for the outbox entries emitted by updating `before` to `after`."""
+        return []
+
+    def _patched(self, item: FlexibleModel, data: dict) -> FlexibleModel:
+        """Validated copy of `item` with the request data applied."""
+        return self.model_class.model_validate(
+            {**item.model_dump(by_alias=True), **data, "updated_on": datetime.now()}
+        )
+
     def get(self, id: str):
-        """Fetches a single document by its ID."""
+        """
+        Fetches a single document by its ID.
+
+        Answers `If-None-Match` with 304 while the table is unchanged, see
+        `_etag`.
+        """
         try:
-            item = self.table.get_one(id)
+            fields = self._requested_fields()
+            expand = self._requested_expansions()
+            etag = self._etag(expand)
+            not_modified = self._not_modified(etag)
+            if not_modified:
+                return not_modified
+            if self.trusted_reads:
+                item = self.table.get_one_trusted(id, fields=fields)
+            else:
+                item = self.table.get_one(id, fields=fields)
             if item is None:
                 logger.warning(f"{self.model_class.__name__} with id '{id}' not found.")
                 return jsonify({"error": "Not found"}), 404
 
-            # The item from the DB is already a Pydantic model instance.
-            # We serialize it directly to a JSON response.
-            return jsonify(item.model_dump(mode="json"))
+            if self.trusted_reads:
+                self._expand([item], expand)
+                return self._conditional(jsonify(item), etag)
+
+            # The item from the DB is already a Pydantic model instance,
+            # serialized by the app's JSON provider.
+            if not expand:
+                return self._conditional(jsonify(item), etag)
+            data = item.model_dump()
+            self._expand([data], expand)
+            return self._conditional(jsonify(data), etag)
 
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         except Exception as e:
             logger.error(f"Error in get({id}): {str(e)}")
             return jsonify({"error": "An internal error occurred"}), 500
 
     def get_many(self):
-        """Fetches multiple documents."""
+        """
+        Fetches one page of documents.
+
+        Supports `?limit=&after=&sort=` keyset pagination, `?fields=`
+        projection and `?expand=` of the crud's expansions. When either `limit` or `after` is given the response is
+        `{"items": [...], "next_cursor": ...}`, otherwise the first page is
+        returned as a bare list for older clients.
+        The next cursor is always sent in the `X-Next-Cursor` header.
+        `If-None-Match` is answered with 304 while the table is unchanged,
+        see `_etag`.
+        """
         try:
-            items = self.table.get_many()
-            # Serialize the list of model instances directly.
-            return jsonify([item.model_dump(mode="json") for item in items])
-
+            paged = "limit" in request.args or "after" in request.args
+            limit = self._requested_limit()
+            after = request.args.get("after")
+            sort_key = self._requested_sort()
+            expand = self._requested_expansions()
+            etag = self._etag(expand)
+            not_modified = self._not_modified(etag)
+            if not_modified:
+                return not_modified
+
+            if self.trusted_reads:
+                data, next_cursor = self.table.get_page_trusted(
+                    limit=limit,
+                    after=after,
+                    sort_key=sort_key,
+                    fields=self._requested_fields(),
+                )
+            else:
+                data, next_cursor = self.table.get_page(
+                    limit=limit,
+                    after=after,
+                    sort_key=sort_key,
+                    fields=self._requested_fields(),
+                )
+                # Models are serialized by the app's JSON provider, unless
+                # references have to be embedded in them first.
+                if expand:
+                    data = [item.model_dump() for item in data]
+            self._expand(data, expand)
+
+            if paged:
+                data = {"items": data, "next_cursor": next_cursor}
+            response = jsonify(data)
+            if next_cursor:
+                response.headers["X-Next-Cursor"] = next_cursor
+            return self._conditional(response, etag)
+
+        except ValueError as e:
+            logger.error(f"Invalid paging request: {str(e)}")
+            return jsonify({"error": str(e)}), 400
         except Exception as e:
             logger.error(f"Error in get_many: {str(e)}")
             return jsonify({"error": "An internal error occurred"}), 500
 
+    def export(self):
+        """
+        Streams every document as newline delimited JSON.
+
+        Supports `?fields=` projection, and `?history=true` to export the
+        history database instead. Documents are written a cursor batch at a
+        time, so memory stays flat and the first lines go out right away.
+        """
+        try:
+            fields = self._requested_fields()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        history = request.args.get("history", "false").lower() == "true"
+        table_name = self.table.table_name
+
+        def lines():
+            exported = 0
+            try:
+                for batch in self.table.iter_batches(fields=fields, history=history):
+                    yield b"".join(dumps(doc) + b"\n" for doc in batch)
+                    exported += len(batch)
+            except Exception as e:
+                # Headers are already sent, the client sees a cut off stream
+                logger.error(f"Export of {table_name} failed after {exported}: {e}")
+                raise
+            logger.info(f"Exported {exported} {table_name} documents")
+
+        return Response(
+            stream_with_context(lines()),
+            mimetype="application/x-ndjson",
+            headers={
+                "Content-Disposition": f'attachment; filename="{table_name}.ndjson"'
+            },
+        )
+
     def create(self):
-        """Creates a new document from request data."""
+        """Creates a new document from request data, or many from an array."""
+        if isinstance(request.get_json(silent=True), list):
+            return self.create_many()
         try:
             # Use the model's built-in `from_request` classmethod.
             # This handles getting JSON/form data and initial parsing.
@@ -86,11 +343,12 @@ class GenericCRUD:
             # Re-create the model instance from the filtered data to ensure
             # no protected fields are passed to the database layer.
             item_to_create = self.model_class.from_dict(item_dict)
+            self._before_write([item_to_create])
 
             inserted_id = self.table.create(item_to_create)
             item_to_create.id = inserted_id
 
-            return jsonify(item_to_create.model_dump(mode="json")), 201
+            return jsonify(item_to_create), 201
 
         except ValidationError as e:
             logger.error(f"Validation error during create: {e.errors()}")
@@ -99,6 +357,129 @@ class GenericCRUD:
             logger.error(f"Error in create: {str(e)}")
             return jsonify({"error": "An internal error occurred"}), 500
 
+    def _bulk_response(self, report: dict, rejected: dict):
+        """Merges pre-write rejections into a bulk report and responds."""
+        for index, (id, error) in rejected.items():
+            report["results"].insert(
+                index, {"index": index, "id": id, "ok": False, "error": error}
+            )
+        for index, item in enumerate(report["results"]):
+            item["index"] = index
+        status = 200 if all(item["ok"] for item in report["results"]) else 207
+        return jsonify(report), status
+
+    def _bulk_body(self) -> list:
+        """Returns the JSON array body of a bulk request."""
+        data = request.get_json(silent=True)
+        if not isinstance(data, list):
+            raise ValueError("Expected a JSON array body")
+        if len(data) > MAX_BULK_SIZE:
+            raise ValueError(f"At most {MAX_BULK_SIZE} items per request")
+        return data
+
+    def create_many(self):
+        """Creates every document of a JSON array in one bulk write."""
+        try:
+            items, rejected = [], {}
+            for index, data in enumerate(self._bulk_body()):
+                try:
+                    items.append(
+                        self.model_class.from_dict(self._filter_request_data(data))
+                    )
+                except (ValidationError, AttributeError) as e:
+                    rejected[index] = (None, str(e))
+
+            self._before_write(items)
+            return self._bulk_response(self.table.bulk_create(items), rejected)
+
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            logger.error(f"Error in create_many: {str(e)}")
+            return jsonify({"error": "An internal error occurred"}), 500
+
+    def update_many(self):
+        """Applies a JSON array of `{"id": ..., <fields>}` patches in one bulk write."""
+        try:
+            patches = [
+                patch if isinstance(patch, dict) else {} for patch in self._bulk_body()
+            ]
+            ids = [str(patch.get("id")) for patch in patches]
+
+            # One round trip for every document being patched.
+            object_ids = [ObjectId(id) for id in ids if ObjectId.is_valid(id)]
+            existing = {
+                str(item.id): item
+                for item in self.table.get_many({"_id": {"$in": object_ids}})
+            }
+
+            items, rejected, entries = [], {}, {}
+            for index, (id, patch) in enumerate(zip(ids, patches)):
+                if id not in existing:
+                    rejected[index] = (id, "Not found")
+                    continue
+                try:
+                    update = self._filter_request_data(patch)
+                    items.append(self._patched(existing[id], update))
+                except ValidationError as e:
+                    rejected[index] = (id, str(e))
+
+            self._before_write(items)
+            if self.outbox:
+                entries = {
+                    str(item.id): self._outbox_entries(existing[str(item.id)], item)
+                    for item in items
+                }
+            with transaction() if any(entries.values()) else nullcontext() as session:
+                report = self.table.bulk_update(items, session)
+                # Only updates that were applied emit entries and run hooks
+                applied = [
+                    result["id"] for result in report["results"] if result["ok"]
+                ]
+                emitted = [entry for id in applied for entry in entries.get(id, [])]
+                if emitted:
+                    self.outbox.bulk_create(emitted, session)
+            applied_ids = set(applied)
+            self._after_write([item for item in items if str(item.id) in applied_ids])
+            return self._bulk_response(report, rejected)
+
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            logger.error(f"Error in update_many: {str(e)}")
+            return jsonify({"error": "An internal error occurred"}), 500
+
+    def delete_many(self):
+        """Deletes every document whose id is in the JSON array body."""
+        try:
+            ids = [
+                str(item.get("id") if isinstance(item, dict) else item)
+                for item in self._bulk_body()
+            ]
+
+            # One round trip to report ids that match nothing, like DELETE does
+            object_ids = [ObjectId(id) for id in ids if ObjectId.is_valid(id)]
+            existing = {
+                str(item.id)
+                for item in self.table.get_many(
+                    {"_id": {"$in": object_ids}}, fields=["id"]
+                )
+            }
+
+            found, rejected = [], {}
+            for index, id in enumerate(ids):
+                if id in existing:
+                    found.append(id)
+                else:
+                    rejected[index] = (id, "Not found")
+            return self._bulk_response(self.table.bulk_delete(found), rejected)
+
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            logger.error(f"Error in delete_many: {str(e)}")
+            return jsonify({"error": "An internal error occurred"}), 500
+
     def update(self, id: str):
         """Updates an existing document."""
         try:
@@ -106,21 +487,29 @@ class GenericCRUD:
             if not update_data:
                 return jsonify({"error": "No JSON data provided"}), 400
 
-            db_item = self.table.get_one(id)
+            # Written back whole, so read from the database, not the cache
+            db_item = self.table.get_one(id, cached=False)
             if not db_item:
                 return jsonify({"error": "Not found"}), 404
 
             # Filter the incoming update data to remove protected fields.
             filtered_data = self._filter_request_data(update_data)
 
-            # Use `model_copy` with `update` to create a new, validated instance
-            # with the changes applied. This is a safe way to update.
-            updated_item = db_item.model_copy(update=filtered_data)
+            # Create a new, validated instance with the changes applied.
+            updated_item = self._patched(db_item, filtered_data)
+            self._before_write([updated_item])
 
-            if not self.table.update(id, updated_item):
-                return jsonify({"error": "Update failed"}), 400
+            entries = (
+                self._outbox_entries(db_item, updated_item) if self.outbox else []
+            )
+            with transaction() if entries else nullcontext() as session:
+                if not self.table.update(id, updated_item, session):
+                    return jsonify({"error": "Update failed"}), 400
+                if entries:
+                    self.outbox.bulk_create(entries, session)
+            self._after_write([updated_item])
 
-            return jsonify(updated_item.model_dump(mode="json"))
+            return jsonify(updated_item)
 
         except ValidationError as e:
             logger.error(f"Validation error during update: {e.errors()}")
@@ -158,7 +547,7 @@ class GenericCRUD:
 
     def deprecate(self, id: str):
         try:
-            item = self.table.get_one(id)
+            item = self.table.get_one(id, cached=False)
             if not item:
                 return jsonify({"error": "Not found"}), 404
 
@@ -188,9 +577,29 @@ class APIBuilder:
             "PATCH",
             "DELETE",
             "DELETE_MANY",
+            "PATCH_MANY",
             "BANISH",
         ],
+        cache_ttl_seconds: Optional[float] = None,
     ):
+        """
+        Registers the crud's routes for the given methods.
+
+        With `cache_ttl_seconds`, GET and GET_MANY responses are served from
+        a response cache named after the resource, evicted by writes to the
+        crud's table or any table it expands. See `shared.response_cache`.
+        """
+        cache = (
+            cached(
+                resource_name,
+                [crud.table]
+                + [expansion.table for expansion in crud.expansions.values()],
+                cache_ttl_seconds,
+            )
+            if cache_ttl_seconds is not None
+            else None
+        )
+
         def create_wrapper(operation):
             if operation in ["get", "update", "delete", "banish", "deprecate"]:
 
@@ -203,6 +612,8 @@ class APIBuilder:
                     return getattr(crud, operation)()
 
             wrapper.__name__ = f"{resource_name}_{operation}_wrapper"
+            if cache is not None and operation in ["get", "get_many"]:
+                return cache(wrapper)
             return wrapper
 
         if "GET" in methods:
@@ -213,6 +624,10 @@ class APIBuilder:
             blueprint.route(f"/{resource_name}/", methods=["GET"])(
                 create_wrapper("get_many")
             )
+        if "EXPORT" in methods:
+            blueprint.route(f"/{resource_name}/export.ndjson", methods=["GET"])(
+                create_wrapper("export")
+            )
         if "POST" in methods:
             blueprint.route(f"/{resource_name}/", methods=["POST"])(
                 create_wrapper("create")
@@ -237,6 +652,10 @@ class APIBuilder:
             blueprint.route(f"/{resource_name}/", methods=["DELETE"])(
                 create_wrapper("delete_many")
             )
+        if "PATCH_MANY" in methods:
+            blueprint.route(f"/{resource_name}/", methods=["PATCH"])(
+                create_wrapper("update_many")
+            )
 
     @staticmethod
     def register_custom_route(blueprint: Blueprint, route: str, methods: List[str]):
@@ -1,7 +1,15 @@
-from flask import Blueprint
+from flask import Blueprint, jsonify
+from shared import queue
 from shared.db import Table
 from routes import GenericCRUD, APIBuilder
 
 bp = Blueprint("alerts", __name__)
 alert_crud = GenericCRUD(Table.ALERT)
 APIBuilder.register_blueprint(bp, "alerts", alert_crud, ["GET", "GET_MANY", "BANISH"])
+
+
+@APIBuilder.register_custom_route(bp, "/alerts/recompute/", methods=["POST"])
+def recompute():
+    """Queue a recomputation of care alerts instead of waiting for the nightly job."""
+    job_id = queue.enqueue("recompute_alerts", priority=1)
+    return jsonify({"id": str(job_id)}), 202
@@ -1,7 +1,9 @@
 from flask import Blueprint, jsonify, request
-from shared.db import Table
+from shared.db import Table, cache_stats
 from shared.logger import logger
+from shared.response_cache import cached, response_cache_stats
 from datetime import datetime
+from typing import Any, Dict, List
 
 # import nbformat
 # from nbconvert import HTMLExporter
@@ -17,37 +19,97 @@ def health():
     return jsonify({"status": "healthy"})
 
 
+def _tagged(kind: str, value: Any) -> Dict[str, Any]:
+    """Project every document down to a (kind, value) pair for `_meta_pipeline`."""
+    return {"$project": {"_id": 0, "kind": {"$literal": kind}, "value": value}}
+
+
+def _meta_pipeline(month: str, start_of_month: datetime) -> List[Dict[str, Any]]:
+    """
+    One pipeline, run on the todo table, computing every meta number.
+
+    Each collection contributes (kind, value) pairs through `$unionWith`
+    and a single `$group` sums them per kind.
+    """
+    return [
+        _tagged("task_count", {"$size": {"$ifNull": ["$tasks", []]}}),
+        {
+            "$unionWith": {
+                "coll": Table.EXPENSE.table_name,
+                "pipeline": [
+                    {"$match": {"purchased_on": {"$gte": start_of_month}}},
+                    _tagged("total_spent", "$cost"),
+                ],
+            }
+        },
+        {
+            "$unionWith": {
+                "coll": Table.BUDGET.table_name,
+                "pipeline": [
+                    {"$match": {"month": month, "deprecated": False}},
+                    {"$limit": 1},
+                    _tagged("current_budget", "$budget"),
+                ],
+            }
+        },
+        {
+            "$unionWith": {
+                "coll": Table.ALERT.table_name,
+                "pipeline": [_tagged("alert_count", {"$literal": 1})],
+            }
+        },
+        {
+            "$unionWith": {
+                "coll": Table.PLANT.table_name,
+                "pipeline": [_tagged("total_plants", {"$literal": 1})],
+            }
+        },
+        {"$group": {"_id": "$kind", "total": {"$sum": "$value"}}},
+    ]
+
+
 @bp.route("/meta/", methods=["GET"])
+@cached("meta", [Table.TODO, Table.EXPENSE, Table.BUDGET, Table.ALERT, Table.PLANT])
 def get_meta():
     """Get meta data of the application."""
     logger.info("Received request to query the meta")
 
-    # Calculate remaining budget for the current month
     now = datetime.now()
-    current_month_str = now.strftime("%Y-%m")
-    budget_doc = Table.BUDGET.get_many({"month": current_month_str, "deprecated": False})
-    current_budget = budget_doc[0].budget if budget_doc else 0
-
     start_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    expenses = Table.EXPENSE.get_many({"purchased_on": {"$gte": start_of_month}})
-    total_spent = sum(expense.cost for expense in expenses)
-    remaining_budget = current_budget - total_spent
-
-    # Calculate total tasks
-    todos = Table.TODO.get_many()
-    task_count = sum(len(todo.tasks) for todo in todos)
+    totals = {
+        row["_id"]: row["total"]
+        for row in Table.TODO.aggregate(
+            _meta_pipeline(now.strftime("%Y-%m"), start_of_month)
+        )
+    }
 
     meta = {
-        "alert_count": Table.ALERT.count(),
-        "task_count": task_count,
-        "remaining_budget": remaining_budget,
-        "total_plants": Table.PLANT.count(),
+        "alert_count": totals.get("alert_count", 0),
+        "task_count": totals.get("task_count", 0),
+        # Remaining budget for the current month
+        "remaining_budget": totals.get("current_budget", 0)
+        - totals.get("total_spent", 0),
+        "total_plants": totals.get("total_plants", 0),
     }
 
     logger.info("Successfully generated meta data.")
     return jsonify(meta)
 
 
+@bp.route("/cache/", methods=["GET"])
+def get_cache():
+    """Get hit/miss counters of the in-process table caches."""
+    logger.info("Received request to query the cache stats")
+    return jsonify(cache_stats())
+
+
+@bp.route("/cache/responses/", methods=["GET"])
+def get_response_cache():
+    """Get hit/miss counters of the cached routes."""
+    logger.info("Received request to query the response cache stats")
+    return jsonify(response_cache_stats())
+
+
 # @bp.route("/notebook/", methods=["GET"])
 # def get_notebook():
 #     """Get the jupyter notebook for this."""
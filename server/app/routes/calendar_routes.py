@@ -0,0 +1,32 @@
+from datetime import date, timedelta
+from flask import Blueprint, jsonify, request
+from shared.forecast import calendar, MAX_CALENDAR_DAYS
+from shared.logger import logger
+
+bp = Blueprint("calendar", __name__, url_prefix="/calendar")
+
+
+@bp.route("/", methods=["GET"])
+def get_calendar():
+    """
+    Projected care, due todos and recorded care events per day.
+
+    Query params `from` and `to` are ISO dates, both included; they default
+    to today and the 30 days after `from`.
+    """
+    logger.info("Received request to query the care calendar")
+    try:
+        start = date.fromisoformat(request.args.get("from", date.today().isoformat()))
+        end = (
+            date.fromisoformat(request.args["to"])
+            if "to" in request.args
+            else start + timedelta(days=30)
+        )
+    except ValueError as e:
+        return jsonify({"error": f"Invalid date: {e}"}), 400
+    if end < start:
+        return jsonify({"error": "'to' is before 'from'"}), 400
+    if (end - start).days >= MAX_CALENDAR_DAYS:
+        return jsonify({"error": f"At most {MAX_CALENDAR_DAYS} days per request"}), 400
+
+    return jsonify(calendar(start, end))
@@ -11,7 +11,7 @@ APIBuilder.register_blueprint(
     expense_bp,
     "expense",
     expense_crud,
-    ["GET", "GET_MANY", "POST", "DELETE", "PATCH"],
+    ["GET", "GET_MANY", "POST", "DELETE", "PATCH", "EXPORT"],
 )
 
 
@@ -33,7 +33,7 @@ def get_expenses_by_month(month_str: str):
         # Query for expenses within the month
         query = {"purchased_on": {"$gte": start_of_month, "$lt": next_month}}
         expenses = Table.EXPENSE.get_many(query)
-        return jsonify([expense.model_dump(mode="json") for expense in expenses])
+        return jsonify(expenses)
     except ValueError:
         return jsonify({"error": "Invalid month format. Use YYYY-MM."}), 400
 
@@ -0,0 +1,14 @@
+from flask import Blueprint, jsonify, request
+from shared.job_history import job_summaries
+from shared.logger import logger
+
+bp = Blueprint("jobs", __name__, url_prefix="/jobs")
+
+
+@bp.route("/", methods=["GET"])
+def get_jobs():
+    """Recent runs and p50/p95 durations of every scheduled and queued job."""
+    logger.info("Received request to query the job history")
+    recent = request.args.get("recent", 10, type=int)
+    summaries = job_summaries(recent=max(1, min(recent, 100)))
+    return jsonify(summaries)
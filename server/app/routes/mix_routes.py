@@ -1,5 +1,5 @@
 from flask import Blueprint
-from shared.db import Table
+from shared.db import Table, REFERENCE_CACHE
 from routes import GenericCRUD, APIBuilder
 
 mixes_bp = Blueprint("mixes", __name__)
@@ -9,7 +9,11 @@ APIBuilder.register_blueprint(
 )
 
 soils_bp = Blueprint("soils", __name__)
-soils_crud = GenericCRUD(Table.SOIL)
+soils_crud = GenericCRUD(Table.SOIL, trusted_reads=True)
 APIBuilder.register_blueprint(
-    soils_bp, "soils", soils_crud, methods=["GET", "GET_MANY"]
+    soils_bp,
+    "soils",
+    soils_crud,
+    methods=["GET", "GET_MANY"],
+    cache_ttl_seconds=REFERENCE_CACHE.ttl_seconds,
 )
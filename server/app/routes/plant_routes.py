@@ -1,25 +1,95 @@
+from typing import List
 from flask import Blueprint, request, jsonify
-from models.plant import Plant, PlantGenusType, PlantGenus, PlantSpecies
-from shared.db import Table, Query
+from models.plant import (
+    Plant,
+    PlantGenusType,
+    PlantGenus,
+    PlantSpecies,
+    CarePlan,
+    PlantCareEvent,
+    CARE_EVENTS,
+)
+from shared.alerts import resolve_alerts
+from shared.care import schedule_plants, reschedule_care_plan
+from shared.db import Table, Query, REFERENCE_CACHE
 from shared.logger import logger
-from routes import GenericCRUD, APIBuilder
+from routes import GenericCRUD, APIBuilder, Expansion
+
+
+class PlantCRUD(GenericCRUD):
+    """
+    Keeps the due dates of written plants current, records a care event for
+    every care timestamp an update changes and resolves the alerts of care
+    that is no longer due.
+    """
+
+    def _before_write(self, items: List[Plant]) -> None:
+        schedule_plants(items)
+
+    def _after_write(self, items: List[Plant]) -> None:
+        resolved = resolve_alerts(items)
+        if resolved:
+            logger.info(f"Resolved {resolved} alerts of updated plants")
+
+    def _outbox_entries(self, before: Plant, after: Plant) -> List[PlantCareEvent]:
+        return [
+            PlantCareEvent(
+                plant_id=after.id,
+                event_type=event_type,
+                performed_on=getattr(after, field),
+                notes=f"Recorded from plant {event_type.value.lower()} update",
+            )
+            for field, event_type in CARE_EVENTS.items()
+            if getattr(after, field) is not None
+            and getattr(after, field) != getattr(before, field)
+        ]
+
+
+class CarePlanCRUD(GenericCRUD):
+    """Reschedules the plants following an updated care plan."""
+
+    def _after_write(self, items: List[CarePlan]) -> None:
+        for care_plan in items:
+            reschedule_care_plan(care_plan)
+
 
 bp = Blueprint("plants", __name__)
-plant_crud = GenericCRUD(Table.PLANT)
+plant_crud = PlantCRUD(
+    Table.PLANT,
+    trusted_reads=True,
+    outbox=Table.CARE_EVENT_OUTBOX,
+    expansions={
+        "species": Expansion("species_id", Table.SPECIES, ["name"]),
+        "system": Expansion("system_id", Table.SYSTEM, ["name"]),
+        "mix": Expansion("mix_id", Table.MIX, ["name"]),
+        "care_plan": Expansion(
+            "care_plan_id",
+            Table.CARE_PLAN,
+            ["name", "watering", "fertilizing", "cleaning", "potting"],
+        ),
+    },
+)
 APIBuilder.register_blueprint(
-    bp, "plants", plant_crud, ["GET", "GET_MANY", "POST", "PATCH", "BANISH"]
+    bp,
+    "plants",
+    plant_crud,
+    ["GET", "GET_MANY", "POST", "PATCH", "PATCH_MANY", "BANISH", "EXPORT"],
 )
 
 genus_types_bp = Blueprint("genus_types", __name__)
-genus_types_crud = GenericCRUD(Table.GENUS_TYPE)
+genus_types_crud = GenericCRUD(Table.GENUS_TYPE, trusted_reads=True)
 APIBuilder.register_blueprint(
     genus_types_bp, "genus_types", genus_types_crud, methods=["GET", "GET_MANY"]
 )
 
 species_bp = Blueprint("species", __name__)
-species_crud = GenericCRUD(Table.SPECIES)
+species_crud = GenericCRUD(Table.SPECIES, trusted_reads=True)
 APIBuilder.register_blueprint(
-    species_bp, "species", species_crud, methods=["GET", "GET_MANY"]
+    species_bp,
+    "species",
+    species_crud,
+    methods=["GET", "GET_MANY"],
+    cache_ttl_seconds=REFERENCE_CACHE.ttl_seconds,
 )
 
 
@@ -63,16 +133,29 @@ def create_all():
 
 
 genus_bp = Blueprint("genera", __name__)
-genus_crud = GenericCRUD(Table.GENUS)
+genus_crud = GenericCRUD(Table.GENUS, trusted_reads=True)
 APIBuilder.register_blueprint(
-    genus_bp, "genera", genus_crud, methods=["GET", "GET_MANY"]
+    genus_bp,
+    "genera",
+    genus_crud,
+    methods=["GET", "GET_MANY"],
+    cache_ttl_seconds=REFERENCE_CACHE.ttl_seconds,
 )
 
 care_plan_bp = Blueprint("care_plans", __name__)
-care_plan_crud = GenericCRUD(Table.CARE_PLAN)
+care_plan_crud = CarePlanCRUD(Table.CARE_PLAN)
 APIBuilder.register_blueprint(
     care_plan_bp,
     "care_plans",
     care_plan_crud,
     methods=["GET", "GET_MANY", "POST", "PATCH", "BANISH"],
 )
+
+care_events_bp = Blueprint("care_events", __name__)
+care_events_crud = GenericCRUD(Table.PLANT_CARE_EVENT, trusted_reads=True)
+APIBuilder.register_blueprint(
+    care_events_bp,
+    "care_events",
+    care_events_crud,
+    methods=["GET", "GET_MANY", "EXPORT"],
+)
@@ -0,0 +1,31 @@
+from flask import Blueprint, jsonify, request
+from shared import queue
+from shared.db import Table
+from shared.logger import logger
+
+bp = Blueprint("queue", __name__, url_prefix="/queue")
+
+
+@bp.route("/", methods=["POST"])
+def enqueue():
+    """Queue a job for the worker, body `{"name", "payload", "priority"}`."""
+    data = request.get_json(silent=True) or {}
+    logger.info(f"Received request to queue job {data.get('name')}")
+    try:
+        job_id = queue.enqueue(
+            data.get("name"),
+            payload=data.get("payload"),
+            priority=int(data.get("priority", 0)),
+        )
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"id": str(job_id)}), 202
+
+
+@bp.route("/<id>/", methods=["GET"])
+def get_job(id: str):
+    """Status of a queued job."""
+    job = Table.QUEUED_JOB.get_one(id)
+    if job is None:
+        return jsonify({"error": "Not found"}), 404
+    return jsonify(job.model_dump(mode="json"))
@@ -1,22 +1,95 @@
+from typing import Any, Dict, List
 from flask import Blueprint, jsonify
 from shared.db import Table
 from shared.logger import logger
+from shared.response_cache import cached
 
 bp = Blueprint("stats", __name__, url_prefix="/stats")
 
 
+def _stats_pipeline() -> List[Dict[str, Any]]:
+    """
+    One pipeline, run on the plant table, counting plants and systems.
+
+    Results are grouped by (kind, banished) with document counts and the
+    summed plant cost.
+    """
+    return [
+        {
+            "$project": {
+                "_id": 0,
+                "kind": {"$literal": "plant"},
+                "banished": {"$ifNull": ["$banished", False]},
+                "cost": {"$ifNull": ["$cost", 0]},
+            }
+        },
+        {
+            "$unionWith": {
+                "coll": Table.SYSTEM.table_name,
+                "pipeline": [
+                    {"$match": {"banished": False}},
+                    {
+                        "$project": {
+                            "_id": 0,
+                            "kind": {"$literal": "system"},
+                            "banished": {"$literal": False},
+                            "cost": {"$literal": 0},
+                        }
+                    },
+                ],
+            }
+        },
+        {
+            "$group": {
+                "_id": {"kind": "$kind", "banished": "$banished"},
+                "count": {"$sum": 1},
+                "cost": {"$sum": "$cost"},
+            }
+        },
+    ]
+
+
+def _banished_pipeline() -> List[Dict[str, Any]]:
+    """Count and summed cost of the plants in the history collection."""
+    return [
+        {
+            "$group": {
+                "_id": None,
+                "count": {"$sum": 1},
+                "cost": {"$sum": {"$ifNull": ["$cost", 0]}},
+            }
+        }
+    ]
+
+
 @bp.route("/", methods=["GET"])
+@cached("stats", [Table.PLANT, Table.SYSTEM])
 def stats():
     """Return stats for everything."""
     logger.info("Received request to query the stats")
 
+    groups = {
+        (row["_id"]["kind"], row["_id"]["banished"]): row
+        for row in Table.PLANT.aggregate(_stats_pipeline())
+    }
+    empty = {"count": 0, "cost": 0}
+    active_plants = groups.get(("plant", False), empty)
+    # Banishing moves plants to the history database; legacy ones may still
+    # be flagged in place
+    banished_plants = groups.get(("plant", True), empty)
+    for row in Table.PLANT.aggregate(_banished_pipeline(), history=True):
+        banished_plants = {
+            "count": banished_plants["count"] + row["count"],
+            "cost": banished_plants["cost"] + row["cost"],
+        }
+
     stats = {
-        "total_plants": Table.PLANT.count({}),
-        "total_active_plants": Table.PLANT.count({"banished": False}),
-        "total_banished_plants": Table.PLANT.count({"banished": True}),
-        "total_active_systems": Table.SYSTEM.count({"banished": False}),
-        "total_cost": 0,
-        "total_active_cost": 0,
+        "total_plants": active_plants["count"] + banished_plants["count"],
+        "total_active_plants": active_plants["count"],
+        "total_banished_plants": banished_plants["count"],
+        "total_active_systems": groups.get(("system", False), empty)["count"],
+        "total_cost": active_plants["cost"] + banished_plants["cost"],
+        "total_active_cost": active_plants["cost"],
     }
 
     logger.info("Successfully generated statistical data.")
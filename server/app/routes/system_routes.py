@@ -18,7 +18,7 @@ def get_systems_plants(id):
     """Get system's plants."""
     logger.info("Received request to get a system's plants")
     plants = Table.PLANT.get_many({"system_id": id})
-    return jsonify([plant.model_dump(mode="json") for plant in plants])
+    return jsonify(plants)
 
 
 @APIBuilder.register_custom_route(
@@ -28,7 +28,7 @@ def get_systems_alerts(id):
     """Get system's alerts."""
     logger.info("Received request to get a system's alerts")
     alerts = Table.ALERT.get_many({"model_id": ObjectId(id)})
-    return jsonify([alert.model_dump(mode="json") for alert in alerts])
+    return jsonify(alerts)
 
 
 @APIBuilder.register_custom_route(
@@ -38,7 +38,7 @@ def get_systems_lights(id):
     """Get system's lights."""
     logger.info("Received request to get a system's lights")
     lights = Table.LIGHT.get_many({"system_id": ObjectId(id)})
-    return jsonify([light.model_dump(mode="json") for light in lights])
+    return jsonify(lights)
 
 
 light_bp = Blueprint("lights", __name__)
@@ -0,0 +1,99 @@
+"""
+Background worker, run as its own process next to the webserver.
+
+Runs the scheduled jobs, the only process that does, and consumes the
+MongoDB job queue, so heavy work never competes with request threads. Start with `python worker.py`.
+"""
+
+import logging
+import os
+import signal
+import sys
+import threading
+from typing import List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared import queue
+from shared.lease import default_owner
+from shared.logger import setup_logger
+
+# Importing the app registers every scheduled job and queue handler. The
+# webserver boots the deployment (install, indexes), this process does not.
+from app import configure_database, create_app
+from background.background import init_scheduler
+
+logger = setup_logger(__name__, logging.DEBUG)
+
+# Jobs run at once by this worker
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "2"))
+# Seconds an idle thread waits before looking for work again
+WORKER_POLL_SECONDS = float(os.getenv("WORKER_POLL_SECONDS", "1"))
+
+
+class Worker:
+    """Threads claiming and running queued jobs until stopped."""
+
+    def __init__(self, concurrency: int = WORKER_CONCURRENCY):
+        self.concurrency = concurrency
+        self.name = default_owner()
+        self.stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def _consume(self):
+        """Run jobs one after another, sleeping while the queue is empty."""
+        while not self.stopping.is_set():
+            try:
+                job = queue.claim(self.name)
+                if job is None:
+                    self.stopping.wait(WORKER_POLL_SECONDS)
+                    continue
+                logger.info(
+                    f"Running job {job.name} ({job.id}), attempt {job.attempts}"
+                )
+                queue.run(job)
+            except Exception as e:
+                logger.exception(f"Worker loop error: {e}")
+                self.stopping.wait(WORKER_POLL_SECONDS)
+
+    def start(self):
+        """Start the consumer threads."""
+        for index in range(self.concurrency):
+            thread = threading.Thread(
+                target=self._consume, name=f"worker-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        logger.info(
+            f"Worker {self.name} consuming {sorted(queue.HANDLERS)} "
+            f"with {self.concurrency} threads"
+        )
+
+    def stop(self):
+        """Let running jobs finish, then stop."""
+        self.stopping.set()
+        for thread in self._threads:
+            thread.join()
+
+
+def main():
+    configure_database()
+    init_scheduler(create_app())
+
+    worker = Worker()
+    signal.signal(signal.SIGTERM, lambda *_: worker.stopping.set())
+    signal.signal(signal.SIGINT, lambda *_: worker.stopping.set())
+    worker.start()
+
+    # Periodically fail jobs abandoned on their last attempt
+    while not worker.stopping.wait(60):
+        failed = queue.fail_abandoned()
+        if failed:
+            logger.warning(f"Marked {failed} abandoned jobs failed")
+
+    logger.info("Worker stopping")
+    worker.stop()
+
+
+if __name__ == "__main__":
+    main()
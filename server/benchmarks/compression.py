@@ -0,0 +1,33 @@
+"""
+Compare compressed sizes and compression times of the plant list body, as
+JSON and as MessagePack.
+
+Usage (from the server directory):
+    python -m benchmarks.compression [count]
+"""
+
+import sys
+
+from benchmarks.serialization import best_of, make_models
+from shared.compression import ENCODINGS, compress
+from shared.serialization import dump_models, packb
+
+
+def main(count: int = 10_000) -> None:
+    plants = make_models(count)
+
+    print(f"{count} plants")
+    print(f"  {'':14} {'bytes':>10} {'ratio':>8} {'time':>10}")
+    for name, body in [("json", dump_models(plants)), ("msgpack", packb(plants))]:
+        print(f"  {name:14} {len(body):10d}")
+        for encoding in ENCODINGS:
+            compressed = compress(body, encoding)
+            elapsed = best_of(lambda: compress(body, encoding))
+            print(
+                f"  {name + '+' + encoding:14} {len(compressed):10d} "
+                f"{len(body) / len(compressed):7.1f}x {elapsed * 1000:8.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
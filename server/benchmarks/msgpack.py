@@ -0,0 +1,36 @@
+"""
+Compare JSON and MessagePack bodies of the plant list: size, encode time on
+the server and decode time on a Python client.
+
+Usage (from the server directory):
+    python -m benchmarks.msgpack [count]
+"""
+
+import sys
+import zlib
+
+import orjson
+
+from benchmarks.serialization import best_of, make_models
+from shared.serialization import dump_models, packb, unpackb
+
+
+def main(count: int = 10_000) -> None:
+    plants = make_models(count)
+    as_json, as_msgpack = dump_models(plants), packb(plants)
+
+    print(f"{count} plants")
+    print(f"  {'':10} {'bytes':>10} {'deflated':>10} {'encode':>10} {'decode':>10}")
+    for name, body, encode, decode in [
+        ("json", as_json, lambda: dump_models(plants), lambda: orjson.loads(as_json)),
+        ("msgpack", as_msgpack, lambda: packb(plants), lambda: unpackb(as_msgpack)),
+    ]:
+        print(
+            f"  {name:10} {len(body):10d} {len(zlib.compress(body)):10d} "
+            f"{best_of(encode) * 1000:8.1f}ms {best_of(decode) * 1000:8.1f}ms"
+        )
+    print(f"  size ratio: {len(as_msgpack) / len(as_json):.2f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
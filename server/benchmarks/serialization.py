@@ -0,0 +1,58 @@
+"""
+Benchmark list endpoint serialization: Flask's stdlib JSON encoder over
+`model_dump(mode="json")` dicts against the orjson provider.
+
+Both paths start from validated models (as `Table.get_page` returns them)
+and end with a response body, so only serialization is measured.
+
+Usage (from the server directory):
+    python -m benchmarks.serialization [count]
+"""
+
+import sys
+import time
+from typing import Callable, List
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from benchmarks.trusted_read import make_documents
+from models.plant import Plant
+from shared.serialization import OrjsonProvider
+
+
+def make_models(count: int) -> List[Plant]:
+    return [Plant.model_validate(doc) for doc in make_documents(count)]
+
+
+def best_of(func: Callable[[], bytes], runs: int = 5) -> float:
+    """Best wall time of several runs, in seconds."""
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(count: int = 10_000) -> None:
+    plants = make_models(count)
+    app = Flask(__name__)
+    stdlib, fast = DefaultJSONProvider(app), OrjsonProvider(app)
+
+    with app.app_context():
+        before = best_of(
+            lambda: stdlib.response(
+                [plant.model_dump(mode="json") for plant in plants]
+            ).get_data()
+        )
+        after = best_of(lambda: fast.response(plants).get_data())
+
+    print(f"{count} plants")
+    print(f"  stdlib jsonify: {before * 1000:8.1f} ms")
+    print(f"  orjson:         {after * 1000:8.1f} ms")
+    print(f"  speedup:        {before / after:8.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
@@ -0,0 +1,78 @@
+"""
+Benchmark the trusted read path against pydantic validation + dump.
+
+Both paths start from the same raw documents (as pymongo would return them)
+and end with a JSON body, so the MongoDB fetch cost is excluded and only
+conversion plus encoding is measured.
+
+Usage (from the server directory):
+    python -m benchmarks.trusted_read [count]
+"""
+
+import copy
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+from bson import ObjectId
+
+from models.plant import Plant, PHASES
+from shared.db import trusted_read
+from shared.serialization import dumps
+
+
+def make_documents(count: int) -> List[Dict[str, Any]]:
+    """Build raw plant documents the way `Table.create` stores them."""
+    now = datetime.now()
+    return [
+        Plant(
+            phase=PHASES.ADULT,
+            cost=i % 50,
+            size=i % 12,
+            watered_on=now - timedelta(days=i % 7),
+            species_id=ObjectId(),
+            care_plan_id=ObjectId(),
+            system_id=str(ObjectId()),
+        ).to_dict()
+        for i in range(count)
+    ]
+
+
+def validated(docs: List[Dict[str, Any]]) -> bytes:
+    """The default read path: model_validate, model_dump, then encode."""
+    data = [Plant.model_validate(doc).model_dump(mode="json") for doc in docs]
+    return json.dumps(data).encode("utf-8")
+
+
+def trusted(docs: List[Dict[str, Any]]) -> bytes:
+    """The trusted read path."""
+    return dumps([trusted_read(doc) for doc in docs])
+
+
+def best_of(func: Callable, docs: List[Dict[str, Any]], runs: int = 5) -> float:
+    """Best wall time of several runs, in seconds."""
+    best = float("inf")
+    for _ in range(runs):
+        # trusted_read works in place, so every run gets fresh documents.
+        batch = copy.deepcopy(docs)
+        start = time.perf_counter()
+        func(batch)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(count: int = 10_000) -> None:
+    docs = make_documents(count)
+    validated_time = best_of(validated, docs)
+    trusted_time = best_of(trusted, docs)
+
+    print(f"{count} plants")
+    print(f"  validated: {validated_time * 1000:8.1f} ms")
+    print(f"  trusted:   {trusted_time * 1000:8.1f} ms")
+    print(f"  speedup:   {validated_time / trusted_time:8.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
@@ -1,11 +1,12 @@
 # models/__init__.py
-from typing import List, Any, Dict, Annotated, Optional
+from typing import List, Any, Dict, Annotated, Optional, Iterable, Type
+from functools import lru_cache
 import numpy as np
 import csv
 from enum import Enum
 from bson import ObjectId
 from datetime import datetime
-from pydantic import BaseModel, Field, ConfigDict, BeforeValidator
+from pydantic import BaseModel, Field, ConfigDict, BeforeValidator, create_model
 
 # --- Custom Type for BSON ObjectId ---
 
@@ -76,6 +77,16 @@ class FlexibleModel(BaseModel):
         self.banished_on = None
         self.banished_cause = None
 
+    @classmethod
+    def partial(cls, fields: Iterable[str]) -> Type[BaseModel]:
+        """
+        Creates a model class holding only the provided fields (plus `id`).
+
+        Every field is optional so documents fetched with a MongoDB projection
+        validate cleanly. Classes are cached per field set.
+        """
+        return _partial_model(cls, frozenset(fields))
+
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "FlexibleModel":
         """Creates a model instance from a dictionary."""
@@ -137,3 +148,27 @@ class FlexibleModel(BaseModel):
                 return obj
 
         return convert_enums(data)
+
+
+@lru_cache(maxsize=256)
+def _partial_model(
+    model_class: Type[FlexibleModel], fields: frozenset
+) -> Type[BaseModel]:
+    """Build (and cache) the partial variant of a model for a field set."""
+    definitions: Dict[str, Any] = {}
+    for name in fields | {"id"}:
+        field = model_class.model_fields.get(name)
+        if field is None:
+            # Extra fields are allowed on every model, keep them untyped.
+            definitions[name] = (Optional[Any], None)
+            continue
+        annotation = Optional[field.annotation]
+        if field.metadata:
+            annotation = Annotated[(annotation, *field.metadata)]
+        definitions[name] = (annotation, Field(default=None, alias=field.alias))
+
+    return create_model(
+        f"Partial{model_class.__name__}",
+        __config__=model_class.model_config,
+        **definitions,
+    )
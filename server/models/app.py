@@ -1,5 +1,6 @@
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, Optional
+from pydantic import Field
 from models import FlexibleModel
 from enum import Enum
 
@@ -16,10 +17,12 @@ class Brain(FlexibleModel):
     plant_alert_check_last_run: Optional[datetime] = None
     plant_alert_check_duration_seconds: Optional[float] = None
     plant_alert_check_status: STATUS = STATUS.NEVER_RAN
+    plant_alert_check_token: Optional[int] = None
 
     plant_care_event_check_last_run: Optional[datetime] = None
     plant_care_event_check_duration_seconds: Optional[float] = None
     plant_care_event_check_status: STATUS = STATUS.NEVER_RAN
+    plant_care_event_check_token: Optional[int] = None
 
     @classmethod
     def get_brain(cls) -> "Brain":
@@ -36,19 +39,97 @@ class Brain(FlexibleModel):
             return brain
 
     def update_plant_alert_check(
-        self, duration_seconds: Optional[float] = None, status: STATUS = STATUS.SUCCESS
+        self,
+        duration_seconds: Optional[float] = None,
+        status: STATUS = STATUS.SUCCESS,
+        token: Optional[int] = None,
     ):
         """Update plant alert check tracking."""
         self.plant_alert_check_last_run = datetime.now()
         self.plant_alert_check_duration_seconds = duration_seconds
         self.plant_alert_check_status = status
+        self.plant_alert_check_token = token
         self.updated_on = datetime.now()
 
     def update_plant_care_event_check(
-        self, duration_seconds: Optional[float] = None, status: STATUS = STATUS.SUCCESS
+        self,
+        duration_seconds: Optional[float] = None,
+        status: STATUS = STATUS.SUCCESS,
+        ran_on: Optional[datetime] = None,
+        token: Optional[int] = None,
     ):
-        """Update plant care event check tracking."""
-        self.plant_care_event_check_last_run = datetime.now()
+        """
+        Update plant care event check tracking.
+
+        `ran_on` should be when the check started, so plants changed while it
+        ran are picked up by the next check.
+        """
+        self.plant_care_event_check_last_run = ran_on or datetime.now()
         self.plant_care_event_check_duration_seconds = duration_seconds
         self.plant_care_event_check_status = status
+        self.plant_care_event_check_token = token
         self.updated_on = datetime.now()
+
+
+class JobLease(FlexibleModel):
+    """Lease giving one process the right to run a scheduled job."""
+
+    name: str
+    owner: Optional[str] = None
+    # Incremented on every acquisition, so later holders have larger tokens.
+    token: int = 0
+    expires_on: Optional[datetime] = None
+
+
+class JobRun(FlexibleModel):
+    """History record of one run of a scheduled or queued job."""
+
+    job: str
+    status: STATUS = STATUS.SUCCESS
+    started_on: datetime = Field(default_factory=datetime.now)
+    finished_on: Optional[datetime] = None
+    duration_seconds: Optional[float] = None
+    items_scanned: int = 0
+    items_written: int = 0
+    round_trips: int = 0
+    error: Optional[str] = None
+    # Everything else the job reported
+    stats: Dict[str, Any] = Field(default_factory=dict)
+
+
+class JOB_STATUS(Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class QueuedJob(FlexibleModel):
+    """Unit of work waiting in, or taken from, the job queue."""
+
+    name: str
+    payload: Dict[str, Any] = Field(default_factory=dict)
+    # Higher priorities are claimed first
+    priority: int = 0
+    status: JOB_STATUS = JOB_STATUS.QUEUED
+
+    # When the job may next be claimed. Claiming pushes it out by the
+    # visibility timeout, so a job whose worker died becomes claimable again.
+    run_after: datetime = Field(default_factory=datetime.now)
+    attempts: int = 0
+    attempts_left: int = 3
+
+    worker: Optional[str] = None
+    error: Optional[str] = None
+    result: Optional[Any] = None
+    finished_on: Optional[datetime] = None
+
+
+class InstallRecord(FlexibleModel):
+    """Manifest entry for a bundled data file that has been installed."""
+
+    file: str
+    table_name: str
+    checksum: str
+    rows: int = 0
+    installed_on: Optional[datetime] = None
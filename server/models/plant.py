@@ -2,7 +2,7 @@
 Module defining models for plants.
 """
 
-from datetime import datetime
+from datetime import datetime, timedelta
 from enum import Enum
 from typing import Optional, Dict, Any
 from pydantic import Field
@@ -17,6 +17,22 @@ class PHASES(Enum):
     SEED = "Seed"
 
 
+# (last done field, CarePlan interval in days, next due field) per kind of care.
+CARE_SCHEDULE = (
+    ("watered_on", "watering", "next_water_on"),
+    ("fertilized_on", "fertilizing", "next_fertilize_on"),
+    ("potted_on", "potting", "next_repot_on"),
+    ("cleansed_on", "cleaning", "next_cleanse_on"),
+)
+
+
+def next_due(done_on: Optional[datetime], days: Optional[float]) -> Optional[datetime]:
+    """When care is next due, None if it was never done or is not scheduled."""
+    if done_on is None or not days:
+        return None
+    return done_on + timedelta(days=float(days))
+
+
 class Plant(FlexibleModel):
     """Plant model."""
 
@@ -41,9 +57,21 @@ class Plant(FlexibleModel):
     mix_id: Optional[ObjectIdPydantic] = None
     description: Optional[str] = None
 
+    # Due dates derived from the care info and care plan, see `schedule`
+    next_water_on: Optional[datetime] = None
+    next_fertilize_on: Optional[datetime] = None
+    next_repot_on: Optional[datetime] = None
+    next_cleanse_on: Optional[datetime] = None
+
     def __repr__(self) -> str:
         return f"{self.id}"
 
+    def schedule(self, care_plan: Optional["CarePlan"]) -> None:
+        """Recompute the next due dates from the given care plan."""
+        for done_field, interval_field, due_field in CARE_SCHEDULE:
+            days = getattr(care_plan, interval_field) if care_plan else None
+            setattr(self, due_field, next_due(getattr(self, done_field), days))
+
 
 class CarePlan(FlexibleModel):
     """Care plan model."""
@@ -87,6 +115,15 @@ class CareEventType(Enum):
     TRANSPLANT = "Transplant"
 
 
+# Plant care timestamp and the care event it records.
+CARE_EVENTS: Dict[str, CareEventType] = {
+    "watered_on": CareEventType.WATER,
+    "fertilized_on": CareEventType.FERTILIZE,
+    "potted_on": CareEventType.REPOT,
+    "cleansed_on": CareEventType.CLEANSE,
+}
+
+
 class PlantCareEvent(FlexibleModel):
     """Individual care event for a plant."""
 
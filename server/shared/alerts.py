@@ -0,0 +1,76 @@
+"""
+Keeps the alert collection down to the open issues: one alert per plant and
+care, resolved as soon as the care is recorded.
+"""
+
+from datetime import datetime
+from typing import Dict, List
+
+from models.alert import AlertTypes
+from models.plant import Plant
+from shared.db import Table
+
+# Alert raised once the plant's due date field has passed
+DUE_ALERTS: Dict[str, AlertTypes] = {
+    "next_water_on": AlertTypes.WATER,
+    "next_fertilize_on": AlertTypes.FERTILIZE,
+    "next_repot_on": AlertTypes.REPOT,
+    "next_cleanse_on": AlertTypes.CLEANSE,
+}
+
+
+def remove_duplicate_alerts() -> int:
+    """
+    Delete all but the oldest alert of every (model_id, alert_type) pair.
+
+    Alerts created before the unique index existed could pile up, and the
+    index cannot be built over them.
+
+    Returns:
+        Number of alerts deleted
+    """
+    groups = Table.ALERT.aggregate(
+        [
+            {"$sort": {"created_on": 1}},
+            {
+                "$group": {
+                    "_id": {"model_id": "$model_id", "alert_type": "$alert_type"},
+                    "ids": {"$push": "$_id"},
+                    "count": {"$sum": 1},
+                }
+            },
+            {"$match": {"count": {"$gt": 1}}},
+        ]
+    )
+    duplicates = [str(id) for group in groups for id in group["ids"][1:]]
+    if not duplicates:
+        return 0
+    return Table.ALERT.bulk_delete(duplicates)["deleted"]
+
+
+def resolve_alerts(plants: List[Plant]) -> int:
+    """
+    Resolve the open alerts of care the plants are no longer due for.
+
+    Meant for plants that were just written with their due dates scheduled:
+    recording a care moves its due date into the future. Resolved alerts
+    move to the history database.
+
+    Returns:
+        Number of alerts resolved
+    """
+    now = datetime.now()
+    conditions = []
+    for plant in plants:
+        cared_for = [
+            alert_type.value
+            for due_field, alert_type in DUE_ALERTS.items()
+            if getattr(plant, due_field) is None or getattr(plant, due_field) >= now
+        ]
+        if cared_for:
+            conditions.append({"model_id": plant.id, "alert_type": {"$in": cared_for}})
+    if not conditions:
+        return 0
+
+    resolved = Table.ALERT.get_many({"$or": conditions})
+    return Table.ALERT.bulk_banish(resolved, cause="Care recorded")
@@ -0,0 +1,108 @@
+"""
+In-process caching primitives.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+# Returned by `TTLCache.get` on a miss, since None can be a cached value.
+MISS = object()
+
+
+class CachePolicy:
+    """How long entries live and how many of them a cache may hold."""
+
+    def __init__(self, ttl_seconds: float = 300, max_entries: int = 1024):
+        """
+        Initialize a cache policy.
+
+        Args:
+            ttl_seconds: Seconds an entry stays valid after it is stored
+            max_entries: Entries kept before the least recently used is evicted
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+
+class TTLCache:
+    """
+    A thread safe LRU cache whose entries also expire after a TTL.
+
+    Each gunicorn worker holds its own instance, so writes made by another
+    worker are only picked up once the TTL runs out, unless callers validate
+    entries themselves like the Table caches do against table versions.
+    """
+
+    def __init__(self, policy: CachePolicy):
+        self.policy = policy
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Bumped by every invalidation, see `set`
+        self.generation = 0
+
+    def get(self, key: Hashable) -> Any:
+        """Get a cached value, or MISS if absent or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return MISS
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        ttl_seconds: Optional[float] = None,
+        generation: Optional[int] = None,
+    ):
+        """
+        Store a value, evicting the least recently used entry if full.
+
+        Read-through callers pass the `generation` they saw before reading
+        the value, so a value read before an invalidation that raced it is
+        dropped instead of being served until it expires.
+        """
+        ttl = self.policy.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.policy.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *keys: Hashable):
+        """Drop the given keys."""
+        with self._lock:
+            self.generation += 1
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,77 @@
+"""
+Keeps the precomputed `next_*_on` due dates of plants in line with their
+care info and care plans, so the alert job can range query for due plants.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+
+from models.plant import Plant, CarePlan, CARE_SCHEDULE, next_due
+from shared.db import Table
+
+DONE_FIELDS = [done_field for done_field, _, _ in CARE_SCHEDULE]
+
+
+def _care_plan(care_plan_id: Optional[ObjectId]) -> Optional[CarePlan]:
+    """Care plan by id, read from the database since due dates are written from it."""
+    if care_plan_id is None:
+        return None
+    return Table.CARE_PLAN.get_one(str(care_plan_id), cached=False)
+
+
+def schedule_plants(plants: List[Plant]) -> None:
+    """Recompute the due dates of plants about to be written."""
+    care_plans: Dict[Optional[ObjectId], Optional[CarePlan]] = {}
+    for plant in plants:
+        if plant.care_plan_id not in care_plans:
+            care_plans[plant.care_plan_id] = _care_plan(plant.care_plan_id)
+        plant.schedule(care_plans[plant.care_plan_id])
+
+
+def _due_dates(plant: Any, care_plan: Optional[CarePlan]) -> Dict[str, Any]:
+    """Due date fields for a plant fetched with only its care timestamps."""
+    return {
+        due_field: next_due(
+            getattr(plant, done_field),
+            getattr(care_plan, interval_field) if care_plan else None,
+        )
+        for done_field, interval_field, due_field in CARE_SCHEDULE
+    }
+
+
+def reschedule_care_plan(care_plan: CarePlan) -> int:
+    """
+    Recompute the due dates of every active plant on a care plan.
+
+    Only the care timestamps are read and only the due dates are written,
+    so concurrent edits to other plant fields are left alone.
+
+    Returns:
+        Number of plants whose due dates changed
+    """
+    plants = Table.PLANT.get_many(
+        {"care_plan_id": care_plan.id, "banished": False}, fields=DONE_FIELDS
+    )
+    changes = {plant.id: _due_dates(plant, care_plan) for plant in plants}
+    return Table.PLANT.bulk_set(changes)["modified"] if changes else 0
+
+
+def backfill_schedules() -> int:
+    """
+    Schedule active plants that were written before due dates existed.
+
+    Returns:
+        Number of plants scheduled
+    """
+    plants = Table.PLANT.get_many(
+        {"banished": False, "next_water_on": {"$exists": False}},
+        fields=DONE_FIELDS + ["care_plan_id"],
+    )
+    changes = {}
+    care_plans: Dict[Optional[ObjectId], Optional[CarePlan]] = {}
+    for plant in plants:
+        if plant.care_plan_id not in care_plans:
+            care_plans[plant.care_plan_id] = _care_plan(plant.care_plan_id)
+        changes[plant.id] = _due_dates(plant, care_plans[plant.care_plan_id])
+    return Table.PLANT.bulk_set(changes)["modified"] if changes else 0
@@ -0,0 +1,130 @@
+"""
+Response compression negotiated from `Accept-Encoding`: zstd when the client
+takes it, gzip otherwise.
+
+Whole bodies at least `COMPRESSION_MIN_BYTES` long are compressed in one go.
+Streamed bodies (NDJSON exports) are compressed chunk by chunk and flushed
+after every chunk, so clients still get each chunk as soon as it is written.
+Already compressed streams, like MJPEG camera feeds, are left alone.
+"""
+
+import gzip
+import os
+import zlib
+from typing import Iterable, Iterator, Optional
+
+import zstandard
+from flask import Flask, Response, request
+
+ZSTD = "zstd"
+GZIP = "gzip"
+# Preferred in this order when the client weighs them equally
+ENCODINGS = [ZSTD, GZIP]
+
+# Smaller bodies are not worth the CPU or the encoding overhead
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+
+# Text like bodies; images, video and multipart camera feeds are left out
+COMPRESSIBLE = {
+    "application/json",
+    "application/msgpack",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+}
+
+
+def negotiate() -> Optional[str]:
+    """
+    The encoding the current request accepts, if any.
+
+    Returns:
+        `"zstd"`, `"gzip"` or None when the client takes neither
+    """
+    accepted = request.accept_encodings
+    best = max(ENCODINGS, key=accepted.quality)
+    return best if accepted.quality(best) > 0 else None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a whole body."""
+    if encoding == ZSTD:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    return gzip.compress(body, GZIP_LEVEL, mtime=0)
+
+
+def compress_stream(chunks: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+    """
+    Compress a streamed body, flushing after every chunk.
+
+    Flushing costs a few bytes per chunk but never holds data back, so a
+    chunk reaches the client as soon as the route yields it.
+    """
+    if encoding == ZSTD:
+        compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+        flush_chunk = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        flush_end = zstandard.COMPRESSOBJ_FLUSH_FINISH
+    else:
+        # wbits 31 wraps the deflate stream in a gzip header and trailer
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+        flush_chunk, flush_end = zlib.Z_SYNC_FLUSH, zlib.Z_FINISH
+
+    try:
+        for chunk in chunks:
+            if chunk:
+                yield compressor.compress(chunk) + compressor.flush(flush_chunk)
+        yield compressor.flush(flush_end)
+    finally:
+        # Lets stream_with_context and cursors clean up on disconnects too
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
+
+def _compressible(response: Response) -> bool:
+    mimetype = response.mimetype or ""
+    return (
+        mimetype in COMPRESSIBLE or mimetype.startswith("text/")
+    ) and not response.direct_passthrough
+
+
+def compress_response(response: Response) -> Response:
+    """
+    Compress a response for the current request when it is worth it.
+
+    Skipped for requests without a supported `Accept-Encoding`, bodies
+    already encoded, bodiless statuses, incompressible content types and
+    whole bodies under `COMPRESSION_MIN_BYTES`.
+    """
+    if not _compressible(response):
+        return response
+    response.vary.add("Accept-Encoding")
+    if (
+        request.method == "HEAD"
+        or response.status_code < 200
+        or response.status_code in (204, 304)
+        or "Content-Encoding" in response.headers
+    ):
+        return response
+    encoding = negotiate()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoding)
+        response.headers.pop("Content-Length", None)
+    else:
+        body = response.get_data()
+        if len(body) < COMPRESSION_MIN_BYTES:
+            return response
+        response.set_data(compress(body, encoding))
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def init_compression(app: Flask) -> None:
+    """Compress the app's responses, see `compress_response`."""
+    app.after_request(compress_response)
@@ -3,11 +3,18 @@ This is the main source for anything db related.
 """
 
 import os
+import base64
+import bisect
+import random
 import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
 from enum import Enum
-from typing import Dict, Any, Optional, List, Type, Union
+from typing import Dict, Any, Callable, Iterator, Optional, List, Tuple, Type, Union
 
 from models import FlexibleModel
+from shared.cache import CachePolicy, TTLCache, MISS
 from models.alert import Alert
 from models.mix import Mix, Soil
 from models.plant import (
@@ -17,22 +24,85 @@ from models.plant import (
     PlantSpecies,
     CarePlan,
     PlantCareEvent,
+    CARE_SCHEDULE,
 )
 from models.system import System, Light
 from models.todo import Todo, Goal
 from models.expense import Expense, Budget
 from models.chat import Chat
-from models.app import Brain
+from models.app import Brain, JobLease, JobRun, QueuedJob, InstallRecord
 from models.inventory import InventoryItem, InventoryType
 
-from bson import ObjectId
+from pydantic import BaseModel, ValidationError
+from bson import ObjectId, json_util
 from bson.errors import InvalidId
-from pymongo import MongoClient
+from pymongo import (
+    MongoClient,
+    ASCENDING,
+    DESCENDING,
+    InsertOne,
+    UpdateOne,
+    ReplaceOne,
+    DeleteOne,
+    IndexModel,
+    ReturnDocument,
+)
+from pymongo import monitoring
+from pymongo.client_session import ClientSession
+from pymongo.errors import BulkWriteError, OperationFailure
 from pymongo.database import Database
 
 # Logger for debugging
 logger = logging.getLogger(__name__)
 
+# Page sizes used by keyset pagination
+DEFAULT_PAGE_SIZE = 300
+MAX_PAGE_SIZE = 1000
+# Documents fetched per cursor round trip when streaming a whole collection
+STREAM_BATCH_SIZE = 1000
+
+# Days scheduled and queued job runs are kept in JOB_RUN
+JOB_RUN_RETENTION_DAYS = float(os.getenv("JOB_RUN_RETENTION_DAYS", "7"))
+
+# Fraction of trusted reads that are still validated against their model
+TRUSTED_READ_SAMPLE_RATE = float(os.getenv("TRUSTED_READ_SAMPLE_RATE", "0.01"))
+
+
+class RoundTripCounter(monitoring.CommandListener):
+    """
+    Counts the commands sent to MongoDB by the current thread, while a
+    `counting()` block is active in it.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    @contextmanager
+    def counting(self) -> Iterator[Dict[str, int]]:
+        """Yield a dict whose `round_trips` grows with every command sent."""
+        counts = {"round_trips": 0}
+        previous = getattr(self._local, "counts", None)
+        self._local.counts = counts
+        try:
+            yield counts
+        finally:
+            self._local.counts = previous
+
+    def started(self, event):
+        counts = getattr(self._local, "counts", None)
+        if counts is not None:
+            counts["round_trips"] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+# Attached to every client, see `RoundTripCounter.counting`
+ROUND_TRIPS = RoundTripCounter()
+
 
 class DatabaseConfig:
     """Manages database configuration with fallback to environment variables."""
@@ -70,13 +140,16 @@ class DatabaseConfig:
         self._client_hist: Optional[MongoClient] = None
         self._db: Optional[Database] = None
         self._hist: Optional[Database] = None
+        self._supports_transactions: Optional[bool] = None
 
     @property
     def client(self) -> MongoClient:
         """Get or create the primary MongoDB client."""
         if self._client is None:
             logger.info(f"Connecting to MongoDB at {self.mongodb_url}")
-            self._client = MongoClient(self.mongodb_url)
+            self._client = MongoClient(
+                self.mongodb_url, event_listeners=[ROUND_TRIPS]
+            )
         return self._client
 
     @property
@@ -84,7 +157,9 @@ class DatabaseConfig:
         """Get or create the history MongoDB client."""
         if self._client_hist is None:
             logger.info(f"Connecting to MongoDB history at {self.mongodb_url_hist}")
-            self._client_hist = MongoClient(self.mongodb_url_hist)
+            self._client_hist = MongoClient(
+                self.mongodb_url_hist, event_listeners=[ROUND_TRIPS]
+            )
         return self._client_hist
 
     @property
@@ -101,6 +176,34 @@ class DatabaseConfig:
             self._hist = self.client_hist[self.hist_db_name]
         return self._hist
 
+    @property
+    def supports_transactions(self) -> bool:
+        """Whether the primary server can run multi-document transactions."""
+        if self._supports_transactions is None:
+            try:
+                hello = self.client.admin.command("hello")
+                # Replica set members report a set name, mongos reports isdbgrid
+                self._supports_transactions = bool(
+                    hello.get("setName") or hello.get("msg") == "isdbgrid"
+                )
+            except Exception as e:
+                logger.warning(f"Could not determine transaction support: {e}")
+                self._supports_transactions = False
+        return self._supports_transactions
+
+    def reset_after_fork(self):
+        """
+        Forget clients inherited from a parent process.
+
+        MongoClient is not fork safe, so a forked child must open its own
+        clients. The inherited ones are dropped without closing them, since
+        closing would also end the parent's sessions.
+        """
+        self._client = None
+        self._client_hist = None
+        self._db = None
+        self._hist = None
+
     def close_connections(self):
         """Close all database connections."""
         if self._client:
@@ -117,6 +220,23 @@ class DatabaseConfig:
 _db_config: Optional[DatabaseConfig] = None
 
 
+@contextmanager
+def transaction() -> Iterator[Optional[ClientSession]]:
+    """
+    Run the enclosed writes in one transaction when the server supports it.
+
+    Yields the session to pass to every Table write in the block, or None on
+    a standalone server, where the writes are applied one after another.
+    """
+    config = get_db_config()
+    if not config.supports_transactions:
+        yield None
+        return
+    with config.client.start_session() as session:
+        with session.start_transaction():
+            yield session
+
+
 def initialize_database(
     mongodb_url: Optional[str] = None,
     mongodb_url_hist: Optional[str] = None,
@@ -192,30 +312,207 @@ def __getattr__(name: str):
     raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
 
 
+# Partial filter for indexes that only cover live (non banished) documents
+ACTIVE = {"banished": False}
+
+# Cache policy for small, rarely written reference collections
+REFERENCE_CACHE = CachePolicy(
+    ttl_seconds=float(os.getenv("REFERENCE_CACHE_TTL_SECONDS", "300")),
+    max_entries=2048,
+)
+
+# Cache key of the full, _id sorted list of a collection
+_ALL = "all"
+
+# Collection holding the write counter of every table, see `Table.version`
+VERSION_COLLECTION = "table_version"
+
+# Called with the table after every write through it, see `add_write_listener`
+_WRITE_LISTENERS: List[Callable[["Table"], None]] = []
+
+
 class Table(Enum):
-    PLANT = ("plant", Plant)
+    """
+    Every collection, its model and its secondary indexes.
+
+    Indexes are declared here and applied by `reconcile_indexes`, so the
+    data layer is the single source of truth for them. Tables with a cache
+    policy keep an in-process read-through cache of their documents, which
+    every write through the Table invalidates. Entries are only served while
+    the table's version is the one they were read at, so writes made by
+    other processes are seen at once too. Only give a cache policy to flat
+    collections without embedded models.
+
+    Writes that change a table bump its version, see `Table.version`.
+    Internal bookkeeping tables that are written constantly and never
+    served from a cache opt out with `versioned=False`.
+    """
+
+    PLANT = (
+        "plant",
+        Plant,
+        (
+            IndexModel([("system_id", ASCENDING)]),
+            IndexModel(
+                [("care_plan_id", ASCENDING)],
+                name="active_care_plan_id",
+                partialFilterExpression=ACTIVE,
+            ),
+        )
+        + tuple(
+            IndexModel(
+                [(due_field, ASCENDING)],
+                name=f"active_{due_field}",
+                partialFilterExpression=ACTIVE,
+            )
+            for _, _, due_field in CARE_SCHEDULE
+        )
+        + (
+            IndexModel(
+                [("updated_on", ASCENDING), ("_id", ASCENDING)],
+                name="active_updated_on",
+                partialFilterExpression=ACTIVE,
+            ),
+        ),
+    )
     SYSTEM = ("system", System)
-    GENUS_TYPE = ("genus_type", PlantGenusType)
-    GENUS = ("genus", PlantGenus)
-    SPECIES = ("species", PlantSpecies)
-    SOIL = ("soil", Soil)
-    TODO = ("todo", Todo)
-    ALERT = ("alert", Alert)
+    GENUS_TYPE = ("genus_type", PlantGenusType, (), REFERENCE_CACHE)
+    GENUS = (
+        "genus",
+        PlantGenus,
+        (IndexModel([("genus_type_id", ASCENDING)]),),
+        REFERENCE_CACHE,
+    )
+    SPECIES = (
+        "species",
+        PlantSpecies,
+        (IndexModel([("genus_id", ASCENDING)]),),
+        REFERENCE_CACHE,
+    )
+    SOIL = (
+        "soil",
+        Soil,
+        # Installed soils are keyed by name
+        (IndexModel([("name", ASCENDING)], unique=True),),
+        REFERENCE_CACHE,
+    )
+    TODO = ("todo", Todo, (IndexModel([("due_on", ASCENDING)]),))
+    ALERT = (
+        "alert",
+        Alert,
+        # One open alert per plant and care; also serves model_id lookups
+        (
+            IndexModel(
+                [("model_id", ASCENDING), ("alert_type", ASCENDING)], unique=True
+            ),
+        ),
+    )
     MIX = ("mix", Mix)
-    LIGHT = ("light", Light)
-    EXPENSE = ("expense", Expense)
-    BUDGET = ("budget", Budget)
+    LIGHT = ("light", Light, (IndexModel([("system_id", ASCENDING)]),))
+    EXPENSE = ("expense", Expense, (IndexModel([("purchased_on", ASCENDING)]),))
+    BUDGET = (
+        "budget",
+        Budget,
+        (IndexModel([("month", ASCENDING), ("deprecated", ASCENDING)]),),
+    )
     CHAT = ("chat", Chat)
-    CARE_PLAN = ("care_plan", CarePlan)
+    CARE_PLAN = ("care_plan", CarePlan, (), REFERENCE_CACHE)
     GOAL = ("goal", Goal)
-    PLANT_CARE_EVENT = ("plant_care_event", PlantCareEvent)
+    PLANT_CARE_EVENT = (
+        "plant_care_event",
+        PlantCareEvent,
+        (
+            IndexModel(
+                [
+                    ("plant_id", ASCENDING),
+                    ("event_type", ASCENDING),
+                    ("performed_on", ASCENDING),
+                ],
+                unique=True,
+            ),
+            # Calendar range queries over every plant
+            IndexModel([("performed_on", ASCENDING)]),
+        ),
+    )
+    # Care events recorded with their plant write, waiting to be delivered
+    # to PLANT_CARE_EVENT. See `drain_care_event_outbox`.
+    CARE_EVENT_OUTBOX = ("care_event_outbox", PlantCareEvent, (), None, False)
     BRAIN = ("brain", Brain)
-    INVENTORY_ITEM = ("inventory_item", InventoryItem)
+    QUEUED_JOB = (
+        "queued_job",
+        QueuedJob,
+        (
+            IndexModel(
+                [
+                    ("status", ASCENDING),
+                    ("priority", DESCENDING),
+                    ("run_after", ASCENDING),
+                ]
+            ),
+            IndexModel([("name", ASCENDING), ("status", ASCENDING)]),
+            # Finished jobs are kept for a week
+            IndexModel([("finished_on", ASCENDING)], expireAfterSeconds=7 * 24 * 3600),
+        ),
+        None,
+        False,
+    )
+    JOB_RUN = (
+        "job_run",
+        JobRun,
+        (
+            IndexModel([("job", ASCENDING), ("started_on", DESCENDING)]),
+            IndexModel(
+                [("started_on", ASCENDING)],
+                expireAfterSeconds=int(JOB_RUN_RETENTION_DAYS * 24 * 3600),
+            ),
+        ),
+        None,
+        False,
+    )
+    JOB_LEASE = (
+        "job_lease",
+        JobLease,
+        (IndexModel([("name", ASCENDING)], unique=True),),
+        None,
+        False,
+    )
+    INVENTORY_ITEM = (
+        "inventory_item",
+        InventoryItem,
+        (IndexModel([("inventory_type_id", ASCENDING)]),),
+    )
     INVENTORY_TYPE = ("inventory_type", InventoryType)
+    INSTALL_RECORD = (
+        "install_record",
+        InstallRecord,
+        (IndexModel([("file", ASCENDING)], unique=True),),
+    )
 
-    def __init__(self, table_name: str, model_class: Type[FlexibleModel]) -> None:
+    def __init__(
+        self,
+        table_name: str,
+        model_class: Type[FlexibleModel],
+        indexes: Tuple[IndexModel, ...] = (),
+        cache_policy: Optional[CachePolicy] = None,
+        versioned: bool = True,
+    ) -> None:
         self.table_name = table_name
         self.model_class = model_class
+        self.indexes = indexes
+        self.versioned = versioned
+        self.cache: Optional[TTLCache] = None
+        if cache_policy is not None:
+            self.cache = TTLCache(cache_policy)
+
+    @property
+    def sort_keys(self) -> List[str]:
+        """Fields pages can be sorted on cheaply: _id and every index's first key."""
+        keys = ["_id"]
+        for index in self.indexes:
+            field = next(iter(index.document["key"]))
+            if field not in keys:
+                keys.append(field)
+        return keys
 
     def _get_db(self) -> Database:
         """Get the current primary database."""
@@ -228,47 +525,483 @@ class Table(Enum):
     def count(self, filter: Dict = {}) -> int:
         return self._get_db()[self.table_name].count_documents(filter)
 
+    def aggregate(
+        self, pipeline: List[Dict[str, Any]], history: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Run an aggregation pipeline on this table and return the raw results.
+
+        With `history`, the pipeline runs on the table's history collection.
+        """
+        db = self._get_hist_db() if history else self._get_db()
+        return list(db[self.table_name].aggregate(pipeline))
+
+    def reconcile_indexes(self, drop_extra: bool = False) -> Dict[str, List[str]]:
+        """
+        Bring the collection's indexes in line with the declared ones.
+
+        Missing indexes are created. Indexes that exist but are not declared
+        are reported, and only dropped when `drop_extra` is set. An index
+        whose name matches but whose definition differs is reported as
+        changed and left alone.
+
+        Returns:
+            Dict of index names under "created", "extra", "dropped",
+            "changed" and "failed".
+        """
+        collection = self._get_db()[self.table_name]
+        existing = collection.index_information()
+        report: Dict[str, List[str]] = {
+            "created": [],
+            "extra": [],
+            "dropped": [],
+            "changed": [],
+            "failed": [],
+        }
+
+        declared = {index.document["name"]: index for index in self.indexes}
+        for name, index in declared.items():
+            if name in existing:
+                if not _same_index(index.document, existing[name]):
+                    report["changed"].append(name)
+                continue
+            try:
+                collection.create_indexes([index])
+                report["created"].append(name)
+            except OperationFailure as e:
+                logger.error(f"Could not create index {self.table_name}.{name}: {e}")
+                report["failed"].append(name)
+
+        for name in existing:
+            if name == "_id_" or name in declared:
+                continue
+            report["extra"].append(name)
+            if drop_extra:
+                collection.drop_index(name)
+                report["dropped"].append(name)
+
+        return report
+
+    def _invalidate(
+        self,
+        id: Optional[Any] = None,
+        session: Optional[ClientSession] = None,
+        changed: bool = True,
+    ) -> None:
+        """
+        Record a write: bump the table's version, notify the write listeners
+        and evict cached entries, everything if no id is given.
+
+        Writes in a transaction bump the version in it too, so the version
+        never moves before the write is visible.
+
+        Args:
+            id: Id of the only document written
+            session: Session of the write's transaction
+            changed: Whether the write changed anything; writes that matched
+                nothing or left every document as it was record nothing
+        """
+        if not changed:
+            return
+        if self.versioned:
+            self._get_db()[VERSION_COLLECTION].update_one(
+                {"_id": self.table_name},
+                {"$inc": {"version": 1}, "$setOnInsert": {"epoch": ObjectId()}},
+                upsert=True,
+                session=session,
+            )
+        for listener in _WRITE_LISTENERS:
+            listener(self)
+        if self.cache is None:
+            return
+        if id is None:
+            self.cache.clear()
+        else:
+            self.cache.invalidate(("id", str(id)), _ALL)
+
+    def version(self) -> str:
+        """
+        Opaque token that changes with every write through this table.
+
+        Versions are counters shared by every process, starting over with a
+        new epoch if their document is ever lost. Writes that bypass the
+        Table do not move them, and tables that are not versioned stay at
+        "0". See `table_versions` to read several.
+        """
+        return table_versions([self])[0]
+
+    def _cache_read(self, key: Any, load: Callable[[], Any]) -> Any:
+        """
+        Read a value through the cache, loading it on a miss.
+
+        Entries are stored with the table's version and served only while it
+        is unchanged, which costs one version lookup per read. The version is
+        read before loading, so a write racing the load leaves an entry that
+        is never served rather than a stale one. Missing documents (None) are
+        not cached.
+        """
+        version = self.version()
+        generation = self.cache.generation
+        entry = self.cache.get(key)
+        if entry is not MISS and entry[0] == version:
+            return entry[1]
+        value = load()
+        if value is not None:
+            self.cache.set(key, (version, value), generation=generation)
+        return value
+
+    def _cached_all(self) -> List[Dict[str, Any]]:
+        """The whole collection sorted by _id, read through the cache."""
+        return self._cache_read(
+            _ALL,
+            lambda: list(
+                self._get_db()[self.table_name].find({}).sort("_id", ASCENDING)
+            ),
+        )
+
     def create(self, data: FlexibleModel) -> ObjectId:
         result = self._get_db()[self.table_name].insert_one(data.to_dict())
+        self._invalidate(result.inserted_id)
         return result.inserted_id
 
-    def get_one(self, id: str) -> Optional[FlexibleModel]:
+    def check_fields(self, fields: List[str]) -> None:
+        """
+        Make sure every requested field is one of the model's.
+
+        Raises:
+            ValueError: If any field is unknown
+        """
+        unknown = [
+            field
+            for field in fields
+            if field != "_id" and field not in self.model_class.model_fields
+        ]
+        if unknown:
+            raise ValueError(
+                f"Unknown fields {', '.join(unknown)}, "
+                f"expected any of {', '.join(self.model_class.model_fields)}"
+            )
+
+    def _projection(self, fields: Optional[List[str]]) -> Optional[Dict[str, int]]:
+        """Translate API field names into a MongoDB projection."""
+        if not fields:
+            return None
+        self.check_fields(fields)
+        return {("_id" if field == "id" else field): 1 for field in fields}
+
+    def _model_for(self, fields: Optional[List[str]]) -> Type[BaseModel]:
+        """Model used to validate documents fetched with the given fields."""
+        if not fields:
+            return self.model_class
+        self.check_fields(fields)
+        return self.model_class.partial(f for f in fields if f not in ("id", "_id"))
+
+    def _find_one(
+        self, id: str, fields: Optional[List[str]] = None, cached: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        """Fetch the raw document for an id, None if missing or invalid."""
+        projection = self._projection(fields)
         try:
-            doc = self._get_db()[self.table_name].find_one({"_id": ObjectId(id)})
-            if doc is None:
-                return None
-            return self.model_class.model_validate(doc)
-        except (ValueError, TypeError, InvalidId) as e:
+            object_id = ObjectId(id)
+        except (TypeError, InvalidId) as e:
             # Invalid ObjectId format
             logger.debug(f"Invalid ObjectId format '{id}': {e}")
             return None
 
+        def load() -> Optional[Dict[str, Any]]:
+            return self._get_db()[self.table_name].find_one(
+                {"_id": object_id}, projection
+            )
+
+        if self.cache is None or fields or not cached:
+            return load()
+        doc = self._cache_read(("id", str(id)), load)
+        # Callers may modify the document, never hand out the cached one.
+        return dict(doc) if doc is not None else None
+
+    def get_one(
+        self, id: str, fields: Optional[List[str]] = None, cached: bool = True
+    ) -> Optional[FlexibleModel]:
+        """
+        Get a document by id, optionally projected down to `fields`.
+
+        Pass `cached=False` for reads that feed a write, so the write never
+        builds on a cached copy.
+        """
+        doc = self._find_one(id, fields, cached)
+        if doc is None:
+            return None
+        try:
+            return self._model_for(fields).model_validate(doc)
+        except (ValueError, TypeError) as e:
+            logger.debug(f"Invalid document '{id}': {e}")
+            return None
+
+    def get_one_trusted(
+        self, id: str, fields: Optional[List[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Get a document by id as a raw dict without building a model.
+
+        Only use for data written through our own models, see `trusted_read`.
+        """
+        doc = self._find_one(id, fields)
+        if doc is None:
+            return None
+        return self._trusted_read(doc, fields)
+
     def get_many(
-        self, query: Dict[str, Any] = {}, limit: int = 300
+        self,
+        query: Dict[str, Any] = {},
+        limit: int = 0,
+        fields: Optional[List[str]] = None,
     ) -> List[FlexibleModel]:
+        """Get every document matching the query. A limit of 0 means no limit."""
+        model = self._model_for(fields)
+        if self.cache is not None and not query and not limit and not fields:
+            return [model.model_validate(dict(doc)) for doc in self._cached_all()]
+
         ret = []
-        for item in self._get_db()[self.table_name].find(query).limit(limit):
-            ret.append(self.model_class.model_validate(item))
+        cursor = self._get_db()[self.table_name].find(query, self._projection(fields))
+        for item in cursor.limit(limit):
+            ret.append(model.model_validate(item))
         return ret
 
-    def update(self, id: str, data: FlexibleModel) -> bool:
-        set_data = data.to_dict()
-        del set_data["_id"]
+    def _find_page(
+        self,
+        query: Dict[str, Any],
+        limit: int,
+        after: Optional[str],
+        sort_key: str,
+        fields: Optional[List[str]],
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Fetch the raw documents of one keyset page, see `get_page`."""
+        if limit < 1 or limit > MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+        descending = sort_key.startswith("-")
+        field = sort_key.lstrip("-")
+        direction = DESCENDING if descending else ASCENDING
+
+        if self.cache is not None and not query and not fields and field == "_id":
+            docs = self._cached_page(limit, after, descending)
+        else:
+            if after is not None:
+                query = {"$and": [query, _keyset_query(field, descending, after)]}
+
+            # The sort key has to come back with the page to build the cursor.
+            projection = self._projection(fields)
+            if projection is not None:
+                projection[field] = 1
+
+            docs = list(
+                self._get_db()[self.table_name]
+                .find(query, projection)
+                .sort([(field, direction), ("_id", direction)])
+                .limit(limit + 1)
+            )
+
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = encode_cursor(docs[-1], field)
+
+        if fields and field != "_id" and field not in fields:
+            for doc in docs:
+                doc.pop(field, None)
+
+        return docs, next_cursor
+
+    def _cached_page(
+        self, limit: int, after: Optional[str], descending: bool
+    ) -> List[Dict[str, Any]]:
+        """Slice up to limit + 1 documents after the cursor out of the cache."""
+        docs = self._cached_all()
+
+        last_id = None
+        if after is not None:
+            last_id = decode_cursor(after)[0]
+            if not isinstance(last_id, ObjectId):
+                raise ValueError(f"Cursor '{after}' was not issued for '_id'")
+
+        if descending:
+            end = len(docs)
+            if last_id is not None:
+                end = bisect.bisect_left(docs, last_id, key=lambda doc: doc["_id"])
+            page = docs[max(0, end - limit - 1) : end][::-1]
+        else:
+            start = 0
+            if last_id is not None:
+                start = bisect.bisect_right(docs, last_id, key=lambda doc: doc["_id"])
+            page = docs[start : start + limit + 1]
+
+        # Callers may modify the documents, never hand out the cached ones.
+        return [dict(doc) for doc in page]
+
+    def get_page(
+        self,
+        query: Dict[str, Any] = {},
+        limit: int = DEFAULT_PAGE_SIZE,
+        after: Optional[str] = None,
+        sort_key: str = "_id",
+        fields: Optional[List[str]] = None,
+    ) -> Tuple[List[FlexibleModel], Optional[str]]:
+        """
+        Get one page of documents using keyset pagination.
+
+        Documents are ordered by (sort_key, _id) so the order is stable even
+        when the sort key has duplicates or nulls. A leading '-' on the sort
+        key sorts descending. When the sort key leads an index (see
+        `sort_keys`), every page costs the same index range scan no matter
+        how deep into the collection it is; other keys sort in memory.
+
+        Args:
+            query: MongoDB filter applied before paging
+            limit: Maximum number of documents in the page
+            after: Opaque cursor returned by the previous page
+            sort_key: Field to page on, defaults to _id
+            fields: Optional subset of fields to fetch and return
+
+        Returns:
+            Tuple of the page's models and the cursor for the next page, or
+            None when this is the last page.
+
+        Raises:
+            ValueError: If the cursor or limit is invalid.
+        """
+        docs, next_cursor = self._find_page(query, limit, after, sort_key, fields)
+        model = self._model_for(fields)
+        return [model.model_validate(doc) for doc in docs], next_cursor
+
+    def get_page_trusted(
+        self,
+        query: Dict[str, Any] = {},
+        limit: int = DEFAULT_PAGE_SIZE,
+        after: Optional[str] = None,
+        sort_key: str = "_id",
+        fields: Optional[List[str]] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Same as `get_page` but returns raw dicts, see `trusted_read`."""
+        docs, next_cursor = self._find_page(query, limit, after, sort_key, fields)
+        return [self._trusted_read(doc, fields) for doc in docs], next_cursor
+
+    def iter_batches(
+        self,
+        query: Dict[str, Any] = {},
+        fields: Optional[List[str]] = None,
+        batch_size: int = STREAM_BATCH_SIZE,
+        history: bool = False,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Stream every matching document in _id order, a batch at a time.
+
+        Batches follow the server side cursor's batches, so only one of them
+        is held in memory no matter how large the collection is. Documents
+        are trusted reads, see `trusted_read`.
+
+        Args:
+            query: MongoDB filter
+            fields: Optional subset of fields to fetch
+            batch_size: Documents per cursor round trip and per batch
+            history: Read the history database instead
+        """
+        db = self._get_hist_db() if history else self._get_db()
+        cursor = (
+            db[self.table_name]
+            .find(query, self._projection(fields), batch_size=batch_size)
+            .sort("_id", ASCENDING)
+        )
+        with cursor:
+            batch = []
+            for doc in cursor:
+                batch.append(self._trusted_read(doc, fields))
+                if len(batch) == batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+
+    def _trusted_read(
+        self, doc: Dict[str, Any], fields: Optional[List[str]]
+    ) -> Dict[str, Any]:
+        """
+        Convert a raw document for a trusted read.
+
+        A sample of documents (TRUSTED_READ_SAMPLE_RATE) is still validated
+        against the model so schema drift shows up in the logs.
+        """
+        if TRUSTED_READ_SAMPLE_RATE and random.random() < TRUSTED_READ_SAMPLE_RATE:
+            try:
+                self._model_for(fields).model_validate(doc)
+            except ValidationError as e:
+                logger.warning(
+                    f"Schema drift in {self.table_name} document {doc.get('_id')}: {e}"
+                )
+        return trusted_read(doc)
+
+    def update(
+        self, id: str, data: FlexibleModel, session: Optional[ClientSession] = None
+    ) -> bool:
         result = self._get_db()[self.table_name].update_one(
-            {"_id": ObjectId(id)}, {"$set": set_data}
+            {"_id": ObjectId(id)}, {"$set": _set_data(data)}, session=session
         )
+        self._invalidate(id, session, changed=result.modified_count > 0)
         return result.modified_count > 0
 
+    def update_fields(
+        self, id: str, fields: Dict[str, Any], condition: Dict[str, Any] = {}
+    ) -> bool:
+        """
+        Set only the given fields of a document.
+
+        Args:
+            id: Document id
+            fields: Field values to set
+            condition: Extra filter the document must also match
+
+        Returns:
+            Whether a document matched
+        """
+        result = self._get_db()[self.table_name].update_one(
+            {"_id": ObjectId(id), **condition}, {"$set": fields}
+        )
+        self._invalidate(id, changed=result.modified_count > 0)
+        return result.matched_count > 0
+
+    def update_where(self, query: Dict[str, Any], fields: Dict[str, Any]) -> int:
+        """Set the given fields on every matching document, returns the count."""
+        result = self._get_db()[self.table_name].update_many(query, {"$set": fields})
+        self._invalidate(changed=result.modified_count > 0)
+        return result.modified_count
+
+    def find_one_and_update(
+        self,
+        query: Dict[str, Any],
+        update: Dict[str, Any],
+        upsert: bool = False,
+        sort: Optional[List[Tuple[str, int]]] = None,
+    ) -> Optional[FlexibleModel]:
+        """Atomically update the first matching document and return it updated."""
+        doc = self._get_db()[self.table_name].find_one_and_update(
+            query,
+            update,
+            upsert=upsert,
+            sort=sort,
+            return_document=ReturnDocument.AFTER,
+        )
+        self._invalidate(changed=doc is not None)
+        return self.model_class.model_validate(doc) if doc else None
+
     def upsert(self, id: str, data: FlexibleModel) -> bool:
-        set_data = data.to_dict()
-        del set_data["_id"]
         result = self._get_db()[self.table_name].update_one(
-            {"_id": ObjectId(id)}, {"$set": set_data}, upsert=True
+            {"_id": ObjectId(id)}, {"$set": _set_data(data)}, upsert=True
         )
-        return result.modified_count > 0 or result.upserted_id is not None
+        changed = result.modified_count > 0 or result.upserted_id is not None
+        self._invalidate(id, changed=changed)
+        return changed
 
     def deprecate(self, id: str) -> bool:
-        item = self.get_one(id)
+        item = self.get_one(id, cached=False)
         if not item:
             return False
 
@@ -280,8 +1013,6 @@ class Table(Enum):
         if hasattr(item, "deprecate") and callable(getattr(item, "deprecate")):
             item.deprecate()
         else:
-            from datetime import datetime
-
             item.deprecated = True
             item.deprecated_on = datetime.now()
 
@@ -289,10 +1020,11 @@ class Table(Enum):
 
     def delete(self, id: str) -> bool:
         result = self._get_db()[self.table_name].delete_one({"_id": ObjectId(id)})
+        self._invalidate(id, changed=result.deleted_count > 0)
         return result.deleted_count > 0
 
     def banish(self, id: str) -> bool:
-        banishable = self.get_one(id)
+        banishable = self.get_one(id, cached=False)
         if not banishable:
             return False
 
@@ -305,6 +1037,338 @@ class Table(Enum):
         result = self._get_hist_db()[self.table_name].insert_one(banishable.to_dict())
         return result.inserted_id is not None
 
+    def bulk_banish(
+        self, items: List[FlexibleModel], cause: Optional[str] = None
+    ) -> int:
+        """
+        Move many documents to the history database in two bulk writes.
+
+        The history copies are written first and replace any earlier copy, so
+        a move interrupted before the delete is simply redone next time.
+
+        Args:
+            items: Documents to banish
+            cause: Recorded as their `banished_cause`
+
+        Returns:
+            Number of documents removed from this table
+        """
+        if not items:
+            return 0
+        for item in items:
+            item.banish(cause)
+        self._get_hist_db()[self.table_name].bulk_write(
+            [
+                ReplaceOne({"_id": item.id}, item.to_dict(), upsert=True)
+                for item in items
+            ],
+            ordered=False,
+        )
+        result = self._get_db()[self.table_name].delete_many(
+            {"_id": {"$in": [item.id for item in items]}}
+        )
+        self._invalidate(changed=result.deleted_count > 0)
+        return result.deleted_count
+
+    def bulk_create(
+        self, items: List[FlexibleModel], session: Optional[ClientSession] = None
+    ) -> Dict[str, Any]:
+        """Insert many documents in unordered batches, see `_bulk_write`."""
+        requests = [InsertOne(item.to_dict()) for item in items]
+        return self._bulk_write([item.id for item in items], requests, session)
+
+    def bulk_upsert(
+        self, items: List[FlexibleModel], key: str = "_id"
+    ) -> Dict[str, Any]:
+        """
+        Upsert many documents, see `_bulk_write`.
+
+        Args:
+            items: Models to upsert
+            key: Field identifying an existing document. When it is not `_id`
+                the model's id is only used if the document gets inserted.
+        """
+        requests = []
+        for item in items:
+            data = _set_data(item)
+            if key == "_id":
+                requests.append(
+                    UpdateOne({"_id": item.id}, {"$set": data}, upsert=True)
+                )
+            else:
+                requests.append(
+                    UpdateOne(
+                        {key: data[key]},
+                        {"$set": data, "$setOnInsert": {"_id": item.id}},
+                        upsert=True,
+                    )
+                )
+        return self._bulk_write([item.id for item in items], requests)
+
+    def bulk_insert_missing(
+        self, items: List[FlexibleModel], keys: Tuple[str, ...]
+    ) -> Dict[str, Any]:
+        """
+        Insert the documents that do not exist yet, see `_bulk_write`.
+
+        Existing documents with the same `keys` values are left untouched, so
+        the report's `upserted` count is the number of new documents. Back
+        the keys with a unique index, otherwise concurrent callers can still
+        both insert.
+
+        Args:
+            items: Models to insert when missing
+            keys: Fields identifying an existing document
+        """
+        requests = []
+        for item in items:
+            data = item.to_dict()
+            requests.append(
+                UpdateOne(
+                    {key: data[key] for key in keys},
+                    {"$setOnInsert": data},
+                    upsert=True,
+                )
+            )
+        return self._bulk_write([item.id for item in items], requests)
+
+    def bulk_set(self, changes: Dict[ObjectId, Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Set only the given fields on many documents, see `_bulk_write`.
+
+        Args:
+            changes: Fields to set keyed by document id
+        """
+        requests = [
+            UpdateOne({"_id": id}, {"$set": data}) for id, data in changes.items()
+        ]
+        return self._bulk_write(list(changes), requests)
+
+    def bulk_update(
+        self, items: List[FlexibleModel], session: Optional[ClientSession] = None
+    ) -> Dict[str, Any]:
+        """Update many existing documents by their id, see `_bulk_write`."""
+        requests = [
+            UpdateOne({"_id": item.id}, {"$set": _set_data(item)}) for item in items
+        ]
+        return self._bulk_write([item.id for item in items], requests, session)
+
+    def bulk_delete(self, ids: List[str]) -> Dict[str, Any]:
+        """Delete many documents by id, see `_bulk_write`."""
+        object_ids: List[Optional[ObjectId]] = []
+        for id in ids:
+            try:
+                object_ids.append(ObjectId(id))
+            except (InvalidId, TypeError):
+                object_ids.append(None)
+        requests = [
+            DeleteOne({"_id": object_id}) if object_id else None
+            for object_id in object_ids
+        ]
+        report = self._bulk_write(object_ids, requests)
+        for item, id in zip(report["results"], ids):
+            if item["id"] is None:
+                item["id"] = str(id)
+        return report
+
+    def _bulk_write(
+        self,
+        ids: List[Optional[ObjectId]],
+        requests: List[Optional[Any]],
+        session: Optional[ClientSession] = None,
+    ) -> Dict[str, Any]:
+        """
+        Send write requests as unordered bulk writes and report per item.
+
+        pymongo splits the requests into as few round trips as the server
+        allows. Unordered batches keep going past failed items, which are
+        reported with their error instead of aborting the whole batch. A
+        request of None marks an item that was rejected before sending.
+
+        Returns:
+            Dict with the aggregate counts and a `results` list holding
+            `{"index", "id", "ok", "error"}` for every item in input order.
+        """
+        results = [
+            {
+                "index": index,
+                "id": str(id) if id is not None else None,
+                "ok": request is not None,
+                "error": None if request is not None else "Invalid id",
+            }
+            for index, (id, request) in enumerate(zip(ids, requests))
+        ]
+        report = {
+            "inserted": 0,
+            "matched": 0,
+            "modified": 0,
+            "upserted": 0,
+            "deleted": 0,
+            "results": results,
+        }
+
+        # Map each sent request back to the item it came from.
+        positions = [
+            index for index, request in enumerate(requests) if request is not None
+        ]
+        to_send = [requests[index] for index in positions]
+        if not to_send:
+            return report
+
+        try:
+            result = self._get_db()[self.table_name].bulk_write(
+                to_send, ordered=False, session=session
+            )
+            details = result.bulk_api_result
+        except BulkWriteError as e:
+            details = e.details
+            for error in details.get("writeErrors", []):
+                item = results[positions[error["index"]]]
+                item["ok"] = False
+                item["error"] = error.get("errmsg")
+        except Exception:
+            # Some requests may have been applied before the failure
+            self._invalidate(session=session)
+            raise
+
+        self._invalidate(
+            session=session,
+            changed=any(
+                details.get(count, 0)
+                for count in ("nInserted", "nModified", "nUpserted", "nRemoved")
+            ),
+        )
+        report["inserted"] = details.get("nInserted", 0)
+        report["matched"] = details.get("nMatched", 0)
+        report["modified"] = details.get("nModified", 0)
+        report["upserted"] = details.get("nUpserted", 0)
+        report["deleted"] = details.get("nRemoved", 0)
+        return report
+
+
+def table_versions(tables: List[Table]) -> List[str]:
+    """
+    Versions of several tables in one round trip, see `Table.version`.
+
+    Returns:
+        One version per table, in order. Tables never written are at "0".
+    """
+    names = [table.table_name for table in tables]
+    docs = {
+        doc["_id"]: f"{doc['epoch']}.{doc['version']}"
+        for doc in get_db_config().db[VERSION_COLLECTION].find({"_id": {"$in": names}})
+    }
+    return [docs.get(name, "0") for name in names]
+
+
+def add_write_listener(listener: Callable[[Table], None]) -> None:
+    """
+    Call `listener` with the table after every write through a Table, so
+    caches derived from its documents can be evicted in this process.
+    """
+    _WRITE_LISTENERS.append(listener)
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Hit/miss counters of every cached table."""
+    return {
+        table.table_name: table.cache.stats() for table in Table if table.cache
+    }
+
+
+def _same_index(declared: Dict[str, Any], existing: Dict[str, Any]) -> bool:
+    """Compare a declared IndexModel document with index_information()."""
+    return (
+        list(declared["key"].items()) == [tuple(key) for key in existing["key"]]
+        and declared.get("unique", False) == existing.get("unique", False)
+        and declared.get("partialFilterExpression")
+        == existing.get("partialFilterExpression")
+        and declared.get("expireAfterSeconds") == existing.get("expireAfterSeconds")
+    )
+
+
+def reconcile_indexes(drop_extra: bool = False) -> Dict[str, Dict[str, List[str]]]:
+    """Reconcile the declared indexes of every table, see `Table.reconcile_indexes`."""
+    return {table.table_name: table.reconcile_indexes(drop_extra) for table in Table}
+
+
+def _set_data(data: FlexibleModel) -> Dict[str, Any]:
+    """The `$set` document for a model, everything but its _id."""
+    set_data = data.to_dict()
+    del set_data["_id"]
+    return set_data
+
+
+def trusted_read(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Prepare a raw MongoDB document for a trusted read, in place.
+
+    `_id` keys (including those of embedded models) are renamed to `id` to
+    match `model_dump`. Values are left as BSON types; `shared.serialization`
+    writes ObjectIds as strings and datetimes as ISO strings, and enums are
+    already stored as their values.
+    """
+    if "_id" in doc:
+        doc["id"] = doc.pop("_id")
+    for value in doc.values():
+        if type(value) is list:
+            for item in value:
+                if type(item) is dict:
+                    trusted_read(item)
+        elif type(value) is dict:
+            trusted_read(value)
+    return doc
+
+
+def encode_cursor(doc: Dict[str, Any], field: str = "_id") -> str:
+    """Encode the position of a document as an opaque pagination cursor."""
+    if field == "_id":
+        position = [doc["_id"]]
+    else:
+        position = [doc.get(field), doc["_id"]]
+    raw = json_util.dumps(position).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """Decode a pagination cursor back into its (value, _id) position."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii"))
+        position = json_util.loads(raw)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor '{cursor}'") from e
+    if not isinstance(position, list) or not position:
+        raise ValueError(f"Invalid cursor '{cursor}'")
+    return position
+
+
+def _keyset_query(field: str, descending: bool, cursor: str) -> Dict[str, Any]:
+    """
+    Build the filter selecting documents strictly after the cursor.
+
+    Null and missing values sort before every other value, but comparison
+    operators never match across types. They are handled explicitly: after
+    a null boundary come every non null value (ascending) or nothing but the
+    rest of the null group (descending), and after any other boundary of a
+    descending sort comes the whole null group.
+    """
+    position = decode_cursor(cursor)
+    op = "$lt" if descending else "$gt"
+    if field == "_id":
+        return {"_id": {op: position[0]}}
+    if len(position) != 2:
+        raise ValueError(f"Cursor '{cursor}' was not issued for '{field}'")
+    value, last_id = position
+    same_value = {field: value, "_id": {op: last_id}}
+    if value is None:
+        if descending:
+            return same_value
+        return {"$or": [{field: {"$ne": None}}, same_value]}
+    after = [{field: {op: value}}, same_value]
+    if descending:
+        after.append({field: None})
+    return {"$or": after}
+
 
 class Query:
     """A fluent builder for creating MongoDB query dictionaries."""
@@ -0,0 +1,192 @@
+"""
+Care calendar: projected plant care, todos and recorded care events between
+two dates, bucketed per day.
+"""
+
+import os
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from models.plant import CARE_EVENTS, CARE_SCHEDULE, CarePlan, Plant
+from shared.cache import CachePolicy, TTLCache, MISS
+from shared.db import Table, add_write_listener
+
+# Longest span one calendar request may cover
+MAX_CALENDAR_DAYS = 366
+
+# Calendars computed today, by range
+CALENDAR_CACHE = TTLCache(
+    CachePolicy(
+        ttl_seconds=float(os.getenv("CALENDAR_CACHE_TTL_SECONDS", "60")),
+        max_entries=64,
+    )
+)
+
+# Tables calendars are computed from
+_SOURCES = {Table.PLANT, Table.CARE_PLAN, Table.TODO, Table.PLANT_CARE_EVENT}
+
+# (due date field, care plan interval field, care name) of every projected care
+_PROJECTED = [
+    (due_field, interval_field, CARE_EVENTS[done_field].value)
+    for done_field, interval_field, due_field in CARE_SCHEDULE
+]
+
+
+def calendar(start: date, end: date) -> Dict[str, Any]:
+    """
+    The care calendar from `start` to `end`, both included.
+
+    Cached per day and range for at most `CALENDAR_CACHE_TTL_SECONDS`.
+    Writes through the tables it reads evict the cache in the writing
+    process; other processes see them once the entry expires.
+
+    Returns:
+        Dict with the range and a `days` dict keyed by ISO date, holding the
+        day's projected `care`, due `todos` and recorded care `events`. Days
+        with nothing on them are left out.
+    """
+    key = (date.today(), start, end)
+    cached = CALENDAR_CACHE.get(key)
+    if cached is not MISS:
+        return cached
+    # A write evicting the cache while we read must keep this result out of it
+    generation = CALENDAR_CACHE.generation
+
+    days: Dict[str, Dict[str, List[Dict[str, Any]]]] = defaultdict(
+        lambda: {"care": [], "todos": [], "events": []}
+    )
+    for entry in project_care(_plants(), _care_plans(), start, end):
+        days[entry.pop("date")]["care"].append(entry)
+
+    after = datetime.combine(start, time.min)
+    before = datetime.combine(end + timedelta(days=1), time.min)
+    for todo in Table.TODO.get_many(
+        {"due_on": {"$gte": after, "$lt": before}}, fields=["name", "due_on"]
+    ):
+        days[todo.due_on.date().isoformat()]["todos"].append(
+            {"id": str(todo.id), "name": todo.name, "due_on": todo.due_on.isoformat()}
+        )
+    for event in Table.PLANT_CARE_EVENT.get_many(
+        {"performed_on": {"$gte": after, "$lt": before}},
+        fields=["plant_id", "event_type", "performed_on"],
+    ):
+        days[event.performed_on.date().isoformat()]["events"].append(
+            {
+                "id": str(event.id),
+                "plant_id": str(event.plant_id),
+                "event_type": event.event_type.value,
+                "performed_on": event.performed_on.isoformat(),
+            }
+        )
+
+    result = {
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "days": dict(sorted(days.items())),
+    }
+    CALENDAR_CACHE.set(
+        key, result, ttl_seconds=_seconds_until_tomorrow(), generation=generation
+    )
+    return result
+
+
+def project_care(
+    plants: List[Plant], care_plans: Dict[Any, CarePlan], start: date, end: date
+) -> List[Dict[str, Any]]:
+    """
+    Every care the plants are due for from `start` to `end`, both included.
+
+    Each care recurs every care plan interval from its next due date,
+    assuming it is done on the day it is due. Overdue care is due today.
+    Past days get no projections, recorded events cover those. The date
+    math runs on NumPy arrays over every (plant, care) pair at once.
+
+    Args:
+        plants: Plants with their care plan and next due dates
+        care_plans: Care plans by id
+        start: First day of the range
+        end: Last day of the range
+
+    Returns:
+        `{"date", "plant_id", "care", "overdue"}` dicts sorted by date
+    """
+    plant_ids, cares, due_dates, intervals = [], [], [], []
+    for plant in plants:
+        care_plan = care_plans.get(plant.care_plan_id)
+        if care_plan is None:
+            continue
+        for due_field, interval_field, care in _PROJECTED:
+            due_on = getattr(plant, due_field)
+            interval = getattr(care_plan, interval_field)
+            if due_on is None or not interval or interval <= 0:
+                continue
+            plant_ids.append(str(plant.id))
+            cares.append(care)
+            due_dates.append(due_on.date())
+            intervals.append(interval)
+    if not plant_ids:
+        return []
+
+    today = np.datetime64(date.today(), "D")
+    first_day = max(np.datetime64(start, "D"), today)
+    last_day = np.datetime64(end, "D")
+    due = np.array(due_dates, dtype="datetime64[D]")
+    every = np.array(intervals, dtype=np.int64)
+
+    # Overdue care is moved to today, then repeats every interval
+    anchor = np.maximum(due, today)
+    days_to_first = np.maximum((first_day - anchor).astype(np.int64), 0)
+    days_to_last = (last_day - anchor).astype(np.int64)
+    first = -(-days_to_first // every)
+    last = np.floor_divide(days_to_last, every)
+    counts = np.where(days_to_last >= 0, np.maximum(last - first + 1, 0), 0)
+
+    # One row per occurrence: which pair it belongs to and its repetition
+    pair = np.repeat(np.arange(len(counts)), counts)
+    starts = np.cumsum(counts) - counts
+    repetition = first[pair] + np.arange(counts.sum()) - starts[pair]
+    dates = anchor[pair] + (repetition * every[pair]).astype("timedelta64[D]")
+    overdue = (repetition == 0) & (due[pair] < today)
+
+    order = np.argsort(dates, kind="stable")
+    return [
+        {
+            "date": str(dates[index]),
+            "plant_id": plant_ids[pair[index]],
+            "care": cares[pair[index]],
+            "overdue": bool(overdue[index]),
+        }
+        for index in order
+    ]
+
+
+def _plants() -> List[Plant]:
+    """Live plants with just the fields projections need."""
+    return Table.PLANT.get_many(
+        {"banished": False},
+        fields=["care_plan_id"] + [due_field for due_field, _, _ in _PROJECTED],
+    )
+
+
+def _care_plans() -> Dict[Any, CarePlan]:
+    """Every care plan by id, served from the reference cache."""
+    return {care_plan.id: care_plan for care_plan in Table.CARE_PLAN.get_many()}
+
+
+def _seconds_until_tomorrow(now: Optional[datetime] = None) -> float:
+    """Cache entries never outlive the day they were computed on."""
+    now = now or datetime.now()
+    tomorrow = datetime.combine(now.date() + timedelta(days=1), time.min)
+    return min(CALENDAR_CACHE.policy.ttl_seconds, (tomorrow - now).total_seconds())
+
+
+def _evict_calendars(table: Table) -> None:
+    """Drop cached calendars once a table they are computed from is written."""
+    if table in _SOURCES:
+        CALENDAR_CACHE.clear()
+
+
+add_write_listener(_evict_calendars)
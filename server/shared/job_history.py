@@ -0,0 +1,105 @@
+"""
+History of scheduled and queued job runs, kept in `Table.JOB_RUN` for
+`JOB_RUN_RETENTION_DAYS`.
+"""
+
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from models.app import JobRun, STATUS
+from shared.db import Table, ROUND_TRIPS, MAX_PAGE_SIZE
+from shared.logger import logger
+
+
+def record_run(job: str, run: Callable[[], Any]) -> Any:
+    """
+    Run a job and store a history record of the run.
+
+    Jobs report what they did by returning a stats dict; its `items_scanned`
+    and `items_written` counts get their own fields, the rest is kept in
+    `stats`. Exceptions are recorded and re-raised.
+
+    Args:
+        job: Job name the run is recorded under
+        run: Runs the job
+
+    Returns:
+        Whatever the job returned
+    """
+    record = JobRun(job=job)
+    started = time.perf_counter()
+    with ROUND_TRIPS.counting() as counts:
+        try:
+            result = run()
+        except Exception as e:
+            record.status = STATUS.FAILED
+            record.error = f"{type(e).__name__}: {e}"
+            raise
+        else:
+            if isinstance(result, dict):
+                stats = dict(result)
+                record.items_scanned = stats.pop("items_scanned", 0)
+                record.items_written = stats.pop("items_written", 0)
+                record.stats = stats
+            return result
+        finally:
+            record.finished_on = datetime.now()
+            record.duration_seconds = time.perf_counter() - started
+            record.round_trips = counts["round_trips"]
+            try:
+                Table.JOB_RUN.create(record)
+            except Exception as e:
+                logger.warning(f"Could not record run of {job}: {e}")
+
+
+def job_summaries(recent: int = 10) -> List[Dict[str, Any]]:
+    """
+    Recent runs and duration percentiles of every job with recorded runs.
+
+    Percentiles cover each job's latest `MAX_PAGE_SIZE` runs.
+
+    Args:
+        recent: Runs listed per job, newest first
+
+    Returns:
+        One summary per job with run and failure counts, p50/p95 durations
+        and its most recent runs
+    """
+    names = sorted(
+        doc["_id"] for doc in Table.JOB_RUN.aggregate([{"$group": {"_id": "$job"}}])
+    )
+    summaries = []
+    for name in names:
+        runs, _ = Table.JOB_RUN.get_page(
+            {"job": name},
+            limit=MAX_PAGE_SIZE,
+            sort_key="-started_on",
+            fields=["duration_seconds", "status"],
+        )
+        durations = [
+            run.duration_seconds for run in runs if run.duration_seconds is not None
+        ]
+        latest, _ = Table.JOB_RUN.get_page_trusted(
+            {"job": name}, limit=recent, sort_key="-started_on"
+        )
+        summaries.append(
+            {
+                "job": name,
+                "runs": len(runs),
+                "failures": sum(1 for run in runs if run.status == STATUS.FAILED),
+                "p50_seconds": _percentile(durations, 50),
+                "p95_seconds": _percentile(durations, 95),
+                "recent": latest,
+            }
+        )
+    return summaries
+
+
+def _percentile(values: List[float], percentile: float) -> Optional[float]:
+    """Percentile of the values, None without any."""
+    if not values:
+        return None
+    return float(np.percentile(values, percentile))
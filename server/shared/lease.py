@@ -0,0 +1,122 @@
+"""
+Leases stored in MongoDB, so a scheduled job runs in one process at a time
+no matter how many schedulers are started.
+"""
+
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from shared.db import Table
+from shared.logger import logger
+
+
+def default_owner() -> str:
+    """Identify this process to other lease holders."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class Lease:
+    """
+    A named lease held for `ttl_seconds` and renewed by a heartbeat thread.
+
+    Every acquisition increments the lease's token. Writes that must not
+    be made by a holder that has since lost the lease (e.g. after a long
+    pause) should be fenced on it: only applied when no larger token has
+    been recorded.
+    """
+
+    def __init__(self, name: str, ttl_seconds: float = 60, owner: Optional[str] = None):
+        """
+        Initialize a lease.
+
+        Args:
+            name: Lease name, one per job
+            ttl_seconds: Seconds the lease stays held without a heartbeat
+            owner: Holder id, defaults to host, pid and a random suffix
+        """
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.owner = owner or default_owner()
+        self.token: Optional[int] = None
+        self.lost = False
+        self._stop = threading.Event()
+        self._heartbeat: Optional[threading.Thread] = None
+
+    def _expires_on(self) -> datetime:
+        return datetime.now() + timedelta(seconds=self.ttl_seconds)
+
+    def acquire(self) -> bool:
+        """
+        Take the lease if it is free, expired or already ours.
+
+        Returns:
+            Whether the lease is now held, with a new token
+        """
+        try:
+            lease = Table.JOB_LEASE.find_one_and_update(
+                {
+                    "name": self.name,
+                    "$or": [
+                        {"expires_on": {"$lte": datetime.now()}},
+                        {"owner": self.owner},
+                    ],
+                },
+                {
+                    "$set": {"owner": self.owner, "expires_on": self._expires_on()},
+                    "$inc": {"token": 1},
+                },
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # Held by someone else, so the upsert collided with their lease
+            return False
+
+        self.token = lease.token
+        self.lost = False
+        self._stop.clear()
+        self._heartbeat = threading.Thread(
+            target=self._beat, name=f"lease-{self.name}", daemon=True
+        )
+        self._heartbeat.start()
+        return True
+
+    def renew(self) -> bool:
+        """Extend the lease, False if it has been taken over."""
+        return (
+            Table.JOB_LEASE.find_one_and_update(
+                {"name": self.name, "owner": self.owner, "token": self.token},
+                {"$set": {"expires_on": self._expires_on()}},
+            )
+            is not None
+        )
+
+    def release(self):
+        """Stop the heartbeat and let the next holder in immediately."""
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+            self._heartbeat = None
+        if self.token is not None and not self.lost:
+            Table.JOB_LEASE.find_one_and_update(
+                {"name": self.name, "owner": self.owner, "token": self.token},
+                {"$set": {"expires_on": datetime.now()}},
+            )
+
+    def _beat(self):
+        """Renew the lease every third of its TTL until released."""
+        while not self._stop.wait(self.ttl_seconds / 3):
+            try:
+                renewed = self.renew()
+            except Exception as e:
+                logger.warning(f"Could not renew lease {self.name}: {e}")
+                continue
+            if not renewed:
+                logger.warning(f"Lost lease {self.name} (token {self.token})")
+                self.lost = True
+                return
@@ -0,0 +1,254 @@
+"""
+A durable job queue stored in MongoDB.
+
+Web routes enqueue named jobs; the worker process (`app/worker.py`) claims
+and runs them with the handler registered under that name.
+"""
+
+import threading
+import traceback
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+
+from models.app import QueuedJob, JOB_STATUS
+from shared.db import Table
+from shared.job_history import record_run
+from shared.logger import logger
+
+
+@dataclass
+class JobHandler:
+    """How jobs of one name are run."""
+
+    name: str
+    run: Callable[[Dict[str, Any]], Any]
+    # Jobs of this name running at once across all workers, None for no limit
+    concurrency: Optional[int] = None
+    # Seconds a claimed job is hidden from other workers, extended by a
+    # heartbeat while it runs
+    visibility_timeout: float = 300
+    max_attempts: int = 3
+    # Seconds before the first retry, doubled on every further attempt
+    retry_delay: float = 30
+
+
+HANDLERS: Dict[str, JobHandler] = {}
+
+
+def handler(name: str, **options: Any) -> Callable:
+    """Register the decorated function as the handler for jobs named `name`."""
+
+    def decorator(run: Callable[[Dict[str, Any]], Any]) -> Callable:
+        HANDLERS[name] = JobHandler(name, run, **options)
+        return run
+
+    return decorator
+
+
+def enqueue(
+    name: str,
+    payload: Optional[Dict[str, Any]] = None,
+    priority: int = 0,
+    delay_seconds: float = 0,
+) -> ObjectId:
+    """
+    Add a job to the queue.
+
+    Args:
+        name: Registered handler name
+        payload: Arguments passed to the handler
+        priority: Higher priorities are claimed first
+        delay_seconds: Seconds before the job may be claimed
+
+    Returns:
+        The queued job's id
+
+    Raises:
+        ValueError: If no handler is registered under the name
+    """
+    if name not in HANDLERS:
+        raise ValueError(f"Unknown job '{name}'")
+    job = QueuedJob(
+        name=name,
+        payload=payload or {},
+        priority=priority,
+        run_after=datetime.now() + timedelta(seconds=delay_seconds),
+        attempts_left=HANDLERS[name].max_attempts,
+    )
+    return Table.QUEUED_JOB.create(job)
+
+
+def _saturated() -> List[str]:
+    """Names of concurrency limited jobs already running at their limit."""
+    now = datetime.now()
+    return [
+        job_handler.name
+        for job_handler in HANDLERS.values()
+        if job_handler.concurrency is not None
+        and Table.QUEUED_JOB.count(
+            {
+                "name": job_handler.name,
+                "status": JOB_STATUS.RUNNING.value,
+                "run_after": {"$gt": now},
+            }
+        )
+        >= job_handler.concurrency
+    ]
+
+
+def claim(worker: str, names: Optional[List[str]] = None) -> Optional[QueuedJob]:
+    """
+    Take the most urgent job that is due, hiding it for its visibility timeout.
+
+    Queued jobs and running jobs whose visibility timeout ran out (their
+    worker died) are both claimable. Concurrency limits are checked before
+    claiming, so racing workers can briefly exceed them by one each.
+
+    Args:
+        worker: Id of the claiming worker
+        names: Only claim jobs with these names, defaults to every handler
+
+    Returns:
+        The claimed job, or None when nothing is due
+    """
+    now = datetime.now()
+    saturated = set(_saturated())
+    names = [name for name in (names or HANDLERS) if name not in saturated]
+    if not names:
+        return None
+
+    # Hidden for the longest timeout of the candidates, then narrowed down to
+    # its own handler's, so it is never visible between the two writes.
+    longest = max(HANDLERS[name].visibility_timeout for name in names)
+    job = Table.QUEUED_JOB.find_one_and_update(
+        {
+            "status": {"$in": [JOB_STATUS.QUEUED.value, JOB_STATUS.RUNNING.value]},
+            "name": {"$in": names},
+            "run_after": {"$lte": now},
+            "attempts_left": {"$gt": 0},
+        },
+        {
+            "$set": {
+                "status": JOB_STATUS.RUNNING.value,
+                "worker": worker,
+                "run_after": now + timedelta(seconds=longest),
+            },
+            "$inc": {"attempts": 1, "attempts_left": -1},
+        },
+        sort=[("priority", DESCENDING), ("run_after", ASCENDING)],
+    )
+    if job is None:
+        return None
+
+    visibility_timeout = HANDLERS[job.name].visibility_timeout
+    if visibility_timeout < longest:
+        job.run_after = now + timedelta(seconds=visibility_timeout)
+        Table.QUEUED_JOB.update_fields(str(job.id), {"run_after": job.run_after})
+    return job
+
+
+@contextmanager
+def _heartbeat(job: QueuedJob, condition: Dict[str, Any]) -> Iterator[None]:
+    """
+    Keep a claimed job hidden while the block runs, by pushing its
+    visibility timeout forward every third of it.
+
+    Stops on its own once the job is no longer ours, e.g. after a long pause
+    let another worker claim it.
+    """
+    visibility_timeout = HANDLERS[job.name].visibility_timeout
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(visibility_timeout / 3):
+            hidden_until = datetime.now() + timedelta(seconds=visibility_timeout)
+            try:
+                extended = Table.QUEUED_JOB.update_fields(
+                    str(job.id),
+                    {"run_after": hidden_until},
+                    {**condition, "status": JOB_STATUS.RUNNING.value},
+                )
+            except Exception as e:
+                logger.warning(f"Could not extend job {job.name} ({job.id}): {e}")
+                continue
+            if not extended:
+                logger.warning(f"Lost job {job.name} ({job.id}) to another worker")
+                return
+
+    thread = threading.Thread(target=beat, name=f"job-{job.id}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run(job: QueuedJob) -> bool:
+    """
+    Run a claimed job and record its outcome.
+
+    While the handler runs, a heartbeat keeps the job hidden from other
+    workers. Failed jobs with attempts left are queued again after an
+    exponential backoff, the others are marked failed.
+
+    Returns:
+        Whether the job succeeded
+    """
+    job_handler = HANDLERS[job.name]
+    # Only record the outcome while the job is still ours
+    condition = {"worker": job.worker, "attempts": job.attempts}
+    try:
+        with _heartbeat(job, condition):
+            result = record_run(job.name, lambda: job_handler.run(job.payload))
+    except Exception as e:
+        logger.exception(f"Job {job.name} ({job.id}) failed: {e}")
+        fields: Dict[str, Any] = {"error": traceback.format_exc(limit=5)}
+        if job.attempts_left > 0:
+            delay = job_handler.retry_delay * 2 ** (job.attempts - 1)
+            fields["status"] = JOB_STATUS.QUEUED.value
+            fields["run_after"] = datetime.now() + timedelta(seconds=delay)
+        else:
+            fields["status"] = JOB_STATUS.FAILED.value
+            fields["finished_on"] = datetime.now()
+        Table.QUEUED_JOB.update_fields(str(job.id), fields, condition)
+        return False
+
+    Table.QUEUED_JOB.update_fields(
+        str(job.id),
+        {
+            "status": JOB_STATUS.SUCCEEDED.value,
+            "result": result,
+            "error": None,
+            "finished_on": datetime.now(),
+        },
+        condition,
+    )
+    return True
+
+
+def fail_abandoned() -> int:
+    """
+    Mark failed the jobs whose worker died on their last attempt.
+
+    Returns:
+        Number of jobs marked failed
+    """
+    now = datetime.now()
+    return Table.QUEUED_JOB.update_where(
+        {
+            "status": JOB_STATUS.RUNNING.value,
+            "run_after": {"$lte": now},
+            "attempts_left": {"$lte": 0},
+        },
+        {
+            "status": JOB_STATUS.FAILED.value,
+            "error": "Visibility timeout expired on the last attempt",
+            "finished_on": now,
+        },
+    )
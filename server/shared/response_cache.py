@@ -0,0 +1,145 @@
+"""
+In-process cache of whole GET responses.
+
+Each cached route declares the tables its responses are computed from.
+Entries are stored with the versions of those tables they were computed at
+and only served while the versions are unchanged, which costs one lookup
+per hit. That way writes made by other processes, like the job worker, are
+seen at once. Views may read through the Table caches, whose entries are
+validated against the same versions, so a body is never older than the
+versions it is stored with. A write through any of the tables also evicts
+the route's entries in the writing process, to free them early.
+"""
+
+import os
+from dataclasses import dataclass
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from flask import Response, current_app, request
+
+from shared.cache import CachePolicy, TTLCache, MISS
+from shared.db import Table, add_write_listener, table_versions
+from shared.serialization import wants_msgpack
+
+# Default TTL of cached routes, in seconds
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "30"))
+
+
+@dataclass
+class CachedResponse:
+    """
+    A response body with the headers the view set on it, and the versions of
+    the route's tables it was computed at.
+    """
+
+    body: bytes
+    headers: List[Tuple[str, str]]
+    versions: List[str]
+
+
+class RouteCache:
+    """The cached responses of one route, keyed by path, query and format."""
+
+    def __init__(
+        self,
+        name: str,
+        tables: Iterable[Table],
+        ttl_seconds: Optional[float] = None,
+        max_entries: int = 256,
+    ):
+        """
+        Initialize a route cache.
+
+        Args:
+            name: Name the route's stats are reported under
+            tables: Tables the route's responses are computed from
+            ttl_seconds: Seconds a response is served, defaults to
+                `RESPONSE_CACHE_TTL_SECONDS`
+            max_entries: Distinct URLs kept before the least recently used
+                is evicted
+        """
+        self.name = name
+        self.tables = tuple(tables)
+        self.cache = TTLCache(
+            CachePolicy(
+                ttl_seconds=(
+                    RESPONSE_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+                ),
+                max_entries=max_entries,
+            )
+        )
+
+    def evict(self) -> None:
+        """Drop every cached response."""
+        self.cache.clear()
+
+    def serve(self, view: Callable[..., Any], *args: Any, **kwargs: Any) -> Response:
+        """
+        The cached response to the current request, computed by the view on
+        a miss.
+
+        Only 200 responses with a complete body are stored. Entries whose
+        tables were written since are computed again. A hit matching the
+        request's `If-None-Match` is answered with 304.
+        """
+        # JSON and MessagePack bodies of a URL are cached apart
+        key = (request.full_path, wants_msgpack())
+        # Read before computing, so a write racing the view makes the stored
+        # entry stale rather than hiding the write
+        versions = table_versions(list(self.tables))
+        entry = self.cache.get(key)
+        if entry is not MISS and entry.versions == versions:
+            response = Response(entry.body, headers=entry.headers)
+            return response.make_conditional(request)
+
+        response = current_app.make_response(view(*args, **kwargs))
+        if response.status_code != 200 or response.is_streamed:
+            return response
+        self.cache.set(
+            key, CachedResponse(response.get_data(), list(response.headers), versions)
+        )
+        return response
+
+
+# Every route cache by name
+ROUTE_CACHES: Dict[str, RouteCache] = {}
+
+
+def cached(
+    name: str, tables: Iterable[Table], ttl_seconds: Optional[float] = None
+) -> Callable:
+    """
+    Serve the decorated GET view from a `RouteCache`.
+
+    Args:
+        name: Name the route's stats are reported under
+        tables: Tables the view reads
+        ttl_seconds: Seconds a response is served, see `RouteCache`
+    """
+    route_cache = RouteCache(name, tables, ttl_seconds)
+    ROUTE_CACHES[name] = route_cache
+
+    def decorator(view: Callable) -> Callable:
+        @wraps(view)
+        def wrapper(*args: Any, **kwargs: Any) -> Response:
+            return route_cache.serve(view, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def response_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Hit/miss counters of every cached route."""
+    return {name: route.cache.stats() for name, route in ROUTE_CACHES.items()}
+
+
+def _evict_dependents(table: Table) -> None:
+    """Evict the routes computed from a table that was just written."""
+    for route_cache in list(ROUTE_CACHES.values()):
+        if table in route_cache.tables:
+            route_cache.evict()
+
+
+add_write_listener(_evict_dependents)
@@ -0,0 +1,218 @@
+"""
+Fast JSON and MessagePack serialization for models, raw MongoDB documents
+and Flask responses.
+"""
+
+import struct
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from typing import Any, List, Optional, Sequence, Type
+
+import orjson
+import ormsgpack
+from bson import ObjectId
+from flask import Request, Response, has_request_context, request
+from flask.json.provider import JSONProvider
+from pydantic import BaseModel, TypeAdapter
+from werkzeug.exceptions import BadRequest
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+
+# Numpy values come from stats and forecasts, non string keys from counters
+_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(value: Any) -> Any:
+    """Serialize the BSON types and models orjson does not know about."""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(value: Any) -> bytes:
+    """
+    Serialize a value to JSON bytes.
+
+    Datetimes are written as ISO strings, ObjectIds as strings and enums as
+    their values, matching `model_dump(mode="json")`. Models are dumped by
+    field name.
+    """
+    return orjson.dumps(value, default=_default, option=_OPTIONS)
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(model_class: Type[BaseModel]) -> TypeAdapter:
+    """Compiled serializer for lists of one model class."""
+    return TypeAdapter(List[model_class])
+
+
+def dump_models(items: Sequence[BaseModel]) -> bytes:
+    """
+    Serialize a list of models to JSON bytes, same as `dumps` but faster.
+
+    Lists of a single model class are written by pydantic's compiled
+    serializer in one call, skipping the intermediate dicts.
+    """
+    items = list(items)
+    if not items:
+        return b"[]"
+    model_class = type(items[0])
+    if any(type(item) is not model_class for item in items):
+        return dumps(items)
+    return _list_adapter(model_class).dump_json(items, fallback=_default)
+
+
+# MessagePack extension type of ObjectIds, holding their 12 bytes.
+OBJECT_ID_EXT = 1
+# Extension type of datetimes, holding microseconds since the epoch as a
+# big endian int64. ormsgpack cannot write the standard timestamp extension
+# (-1) from `default`, and its own drops fractions past half a second.
+# Clients may still send timestamp extensions, both decode to naive UTC
+# datetimes like the ones stored.
+DATETIME_EXT = 2
+_TIMESTAMP_EXT = -1
+_EPOCH = datetime(1970, 1, 1)
+_MSGPACK_OPTIONS = (
+    ormsgpack.OPT_SERIALIZE_NUMPY
+    | ormsgpack.OPT_NON_STR_KEYS
+    | ormsgpack.OPT_PASSTHROUGH_DATETIME
+)
+
+
+def _msgpack_default(value: Any) -> Any:
+    """Serialize the BSON types, datetimes and models ormsgpack leaves to us."""
+    if isinstance(value, ObjectId):
+        return ormsgpack.Ext(OBJECT_ID_EXT, value.binary)
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        microseconds = (value - _EPOCH) // timedelta(microseconds=1)
+        return ormsgpack.Ext(DATETIME_EXT, struct.pack(">q", microseconds))
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError(f"Type is not MessagePack serializable: {type(value).__name__}")
+
+
+def packb(value: Any) -> bytes:
+    """
+    Serialize a value to MessagePack.
+
+    ObjectIds and datetimes are written as extension types, dates and times
+    as ISO strings, enums as their values and models by field name.
+    """
+    option = _MSGPACK_OPTIONS
+    # ormsgpack writes models natively, but leaves out their extra fields
+    if _is_model_list(value) and not any(item.model_extra for item in value):
+        option |= ormsgpack.OPT_SERIALIZE_PYDANTIC
+    return ormsgpack.packb(value, default=_msgpack_default, option=option)
+
+
+def _timestamp(data: bytes) -> datetime:
+    """Naive UTC datetime of a MessagePack timestamp extension."""
+    if len(data) == 4:
+        (seconds,), nanoseconds = struct.unpack(">I", data), 0
+    elif len(data) == 8:
+        (value,) = struct.unpack(">Q", data)
+        seconds, nanoseconds = value & 0x3FFFFFFFF, value >> 34
+    elif len(data) == 12:
+        nanoseconds, seconds = struct.unpack(">Iq", data)
+    else:
+        raise ValueError(f"Invalid timestamp of {len(data)} bytes")
+    return _EPOCH + timedelta(seconds=seconds, microseconds=nanoseconds // 1000)
+
+
+def unpackb(data: bytes, json_compatible: bool = False) -> Any:
+    """
+    Deserialize MessagePack written by `packb`.
+
+    Args:
+        data: MessagePack bytes
+        json_compatible: Decode ObjectIds and datetimes to the strings JSON
+            responses hold, rather than to `ObjectId` and `datetime`
+
+    Raises:
+        ValueError: If the data is not valid MessagePack
+    """
+
+    def ext_hook(tag: int, ext_data: bytes) -> Any:
+        if tag == OBJECT_ID_EXT:
+            value: Any = ObjectId(ext_data)
+        elif tag == DATETIME_EXT:
+            (microseconds,) = struct.unpack(">q", ext_data)
+            value = _EPOCH + timedelta(microseconds=microseconds)
+        elif tag == _TIMESTAMP_EXT:
+            value = _timestamp(ext_data)
+        else:
+            raise ValueError(f"Unknown MessagePack extension type {tag}")
+        if json_compatible:
+            return str(value) if isinstance(value, ObjectId) else value.isoformat()
+        return value
+
+    try:
+        return ormsgpack.unpackb(data, ext_hook=ext_hook)
+    except ormsgpack.MsgpackDecodeError as e:
+        raise ValueError(f"Invalid MessagePack: {e}") from e
+
+
+def wants_msgpack() -> bool:
+    """Whether the current request prefers MessagePack over JSON responses."""
+    if not has_request_context():
+        return False
+    return request.accept_mimetypes.best_match([JSON, MSGPACK]) == MSGPACK
+
+
+def _is_model_list(value: Any) -> bool:
+    return isinstance(value, list) and bool(value) and isinstance(value[0], BaseModel)
+
+
+class OrjsonProvider(JSONProvider):
+    """
+    Flask JSON provider backed by orjson, so `jsonify` and `request.json`
+    use it. Models and model lists can be passed to `jsonify` as they are.
+
+    Responses are negotiated: requests with `Accept: application/msgpack`
+    get MessagePack instead, see `packb`. Keys are written in insertion
+    order rather than sorted.
+    """
+
+    mimetype = JSON
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return dumps(obj).decode("utf-8")
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        if wants_msgpack():
+            response = self._app.response_class(packb(obj), mimetype=MSGPACK)
+        else:
+            body = dump_models(obj) if _is_model_list(obj) else dumps(obj)
+            response = self._app.response_class(body, mimetype=self.mimetype)
+        response.vary.add("Accept")
+        return response
+
+
+class MsgpackRequest(Request):
+    """
+    Flask request that also reads `Content-Type: application/msgpack`
+    bodies, so `request.get_json` and `request.json` work for both formats.
+    """
+
+    def get_json(
+        self, force: bool = False, silent: bool = False, cache: bool = True
+    ) -> Optional[Any]:
+        if self.mimetype != MSGPACK:
+            return super().get_json(force=force, silent=silent, cache=cache)
+        try:
+            return unpackb(self.get_data(cache=cache))
+        except ValueError as e:
+            if silent:
+                return None
+            raise BadRequest(f"Failed to decode MessagePack body: {e}") from e
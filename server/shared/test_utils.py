@@ -9,6 +9,7 @@ from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure
 import time
 import shared.db
+from shared.response_cache import ROUTE_CACHES
 from testcontainers.mongodb import MongoDbContainer
 
 
@@ -92,6 +93,13 @@ class MongoTestCase(unittest.TestCase):
         for collection_name in self.db_config.hist.list_collection_names():
             self.db_config.hist.drop_collection(collection_name)
 
+        # Dropped collections bypass Table, so reset the table caches too
+        for table in shared.db.Table:
+            if table.cache is not None:
+                table.cache.clear()
+        for route_cache in ROUTE_CACHES.values():
+            route_cache.evict()
+
     def get_collection_data(self, collection_name, use_history=False):
         """
         Helper to get all data from a collection
@@ -307,6 +315,13 @@ class MongoTestCaseWithoutContainer(unittest.TestCase):
         for collection_name in self.db_config.hist.list_collection_names():
             self.db_config.hist.drop_collection(collection_name)
 
+        # Dropped collections bypass Table, so reset the table caches too
+        for table in shared.db.Table:
+            if table.cache is not None:
+                table.cache.clear()
+        for route_cache in ROUTE_CACHES.values():
+            route_cache.evict()
+
     # Include all the same helper methods from MongoTestCase
     def get_collection_data(self, collection_name, use_history=False):
         """Helper to get all data from a collection"""
@@ -0,0 +1,10 @@
+import os
+import sys
+
+# Route modules import each other as top level modules, like app.py runs them
+sys.path.append(
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+        "app",
+    )
+)
@@ -0,0 +1,240 @@
+"""
+Tests for the background jobs: due date alerts, care event detection and
+the outbox, and running jobs under a lease.
+"""
+
+from datetime import datetime, timedelta
+import unittest
+
+from shared.test_utils import MongoTestCase
+from shared.db import Table
+from shared.care import schedule_plants
+from shared.lease import Lease
+
+from app.background.background import (
+    manage_plant_alerts,
+    recompute_alerts,
+    detect_plant_care_events,
+    drain_care_event_outbox,
+    _record_care_events,
+)
+from models.alert import Alert, AlertTypes
+from models.app import Brain, STATUS
+from models.plant import Plant, CarePlan, CareEventType, PlantCareEvent, PHASES
+
+
+class TestDueDateAlerts(MongoTestCase):
+    """Alerts are raised from the precomputed plant due dates."""
+
+    def setUp(self):
+        super().setUp()
+        self.care_plan = CarePlan(
+            name="Test Care Plan", watering=7, fertilizing=14, potting=365, cleaning=10
+        )
+        Table.CARE_PLAN.create(self.care_plan)
+        # Alerts are upserted on the unique (model_id, alert_type) index
+        Table.ALERT.reconcile_indexes()
+
+    def _create_plant(self, days_since_care: int) -> Plant:
+        cared_on = datetime.now() - timedelta(days=days_since_care)
+        plant = Plant(
+            phase=PHASES.ADULT,
+            care_plan_id=self.care_plan.id,
+            watered_on=cared_on,
+            fertilized_on=cared_on,
+            potted_on=cared_on,
+            cleansed_on=cared_on,
+        )
+        schedule_plants([plant])
+        Table.PLANT.create(plant)
+        return plant
+
+    def _alert_types(self, plant: Plant) -> set:
+        return {
+            alert.alert_type for alert in Table.ALERT.get_many({"model_id": plant.id})
+        }
+
+    def test_alerts_created_for_due_plants_only(self):
+        thirsty = self._create_plant(days_since_care=12)
+        fresh = self._create_plant(days_since_care=1)
+
+        manage_plant_alerts()
+
+        self.assertEqual(
+            self._alert_types(thirsty), {AlertTypes.WATER, AlertTypes.CLEANSE}
+        )
+        self.assertEqual(self._alert_types(fresh), set())
+
+    def test_existing_alerts_not_duplicated(self):
+        plant = self._create_plant(days_since_care=20)
+        Table.ALERT.create(Alert(model_id=plant.id, alert_type=AlertTypes.WATER))
+
+        manage_plant_alerts()
+
+        self.assertEqual(Table.ALERT.count(), 3)
+        self.assertEqual(
+            self._alert_types(plant),
+            {AlertTypes.WATER, AlertTypes.FERTILIZE, AlertTypes.CLEANSE},
+        )
+
+    def test_job_runs_again_within_a_day(self):
+        # The next daily fire lands a few seconds short of 24h after the last
+        # run finished
+        brain = Brain.get_brain()
+        brain.plant_alert_check_last_run = datetime.now() - timedelta(hours=23)
+        Table.BRAIN.update(str(brain.id), brain)
+        plant = self._create_plant(days_since_care=20)
+
+        manage_plant_alerts()
+
+        self.assertEqual(Table.ALERT.count({"model_id": plant.id}), 3)
+
+    def test_reruns_only_add_missing_alerts(self):
+        plant = self._create_plant(days_since_care=20)
+
+        first = recompute_alerts({})
+        second = recompute_alerts({})
+
+        self.assertEqual(first["items_written"], 3)
+        self.assertEqual(second["items_written"], 0)
+        self.assertEqual(Table.ALERT.count({"model_id": plant.id}), 3)
+
+
+class TestCareEventDetection(MongoTestCase):
+    """Care events are recorded for plants changed since the last run."""
+
+    def setUp(self):
+        super().setUp()
+        # Duplicates are rejected by the unique index
+        Table.PLANT_CARE_EVENT.reconcile_indexes()
+
+    def _create_plant(self, updated_on: datetime) -> Plant:
+        plant = Plant(phase=PHASES.ADULT, updated_on=updated_on)
+        Table.PLANT.create(plant)
+        return plant
+
+    def test_only_changed_plants_are_scanned(self):
+        last_run = datetime.now() - timedelta(hours=1)
+        self._create_plant(updated_on=last_run - timedelta(days=1))
+        changed = self._create_plant(updated_on=datetime.now())
+
+        stats = _record_care_events(last_run)
+
+        self.assertEqual(stats["items_scanned"], 1)
+        self.assertEqual(stats["items_written"], 4)
+        events = Table.PLANT_CARE_EVENT.get_many({"plant_id": changed.id})
+        self.assertEqual(
+            {event.event_type for event in events},
+            {
+                CareEventType.WATER,
+                CareEventType.FERTILIZE,
+                CareEventType.REPOT,
+                CareEventType.CLEANSE,
+            },
+        )
+
+    def test_recorded_events_are_not_duplicated(self):
+        self._create_plant(updated_on=datetime.now())
+        _record_care_events(None)
+
+        stats = _record_care_events(None)
+
+        self.assertEqual(stats["items_written"], 0)
+        self.assertEqual(stats["duplicates"], 4)
+        self.assertEqual(Table.PLANT_CARE_EVENT.count(), 4)
+
+    def test_job_records_watermark(self):
+        self._create_plant(updated_on=datetime.now())
+        # Stored datetimes are truncated to milliseconds
+        started = datetime.now() - timedelta(milliseconds=1)
+
+        detect_plant_care_events()
+
+        brain = Brain.get_brain()
+        self.assertEqual(brain.plant_care_event_check_status, STATUS.SUCCESS)
+        self.assertGreaterEqual(brain.plant_care_event_check_last_run, started)
+        self.assertEqual(Table.PLANT_CARE_EVENT.count(), 4)
+
+
+class TestCareEventOutbox(MongoTestCase):
+    """Care events left in the outbox by plant updates are delivered."""
+
+    def setUp(self):
+        super().setUp()
+        Table.PLANT_CARE_EVENT.reconcile_indexes()
+        self.plant_id = Plant(phase=PHASES.ADULT).id
+
+    def _event(self, performed_on: datetime) -> PlantCareEvent:
+        return PlantCareEvent(
+            plant_id=self.plant_id,
+            event_type=CareEventType.WATER,
+            performed_on=performed_on,
+        )
+
+    def test_drain_delivers_and_empties_outbox(self):
+        day = datetime(2024, 1, 1)
+        Table.CARE_EVENT_OUTBOX.bulk_create(
+            [self._event(day + timedelta(days=days)) for days in range(3)]
+        )
+
+        stats = drain_care_event_outbox()
+
+        self.assertEqual(stats["items_written"], 3)
+        self.assertEqual(Table.CARE_EVENT_OUTBOX.count(), 0)
+        self.assertEqual(Table.PLANT_CARE_EVENT.count(), 3)
+
+    def test_already_recorded_events_are_delivered(self):
+        day = datetime(2024, 1, 1)
+        Table.PLANT_CARE_EVENT.create(self._event(day))
+        Table.CARE_EVENT_OUTBOX.create(self._event(day))
+
+        stats = drain_care_event_outbox()
+
+        self.assertEqual(stats["items_written"], 1)
+        self.assertEqual(Table.CARE_EVENT_OUTBOX.count(), 0)
+        self.assertEqual(Table.PLANT_CARE_EVENT.count(), 1)
+
+    def test_empty_outbox_is_skipped(self):
+        self.assertIsNone(drain_care_event_outbox())
+
+        self.assertEqual(Table.JOB_LEASE.count(), 0)
+        self.assertEqual(Table.JOB_RUN.count(), 0)
+
+
+class TestLeasedJobs(MongoTestCase):
+    """Scheduled jobs run under a lease and fence their Brain record."""
+
+    def setUp(self):
+        super().setUp()
+        Table.JOB_LEASE.reconcile_indexes()
+
+    def test_job_skipped_while_lease_held(self):
+        lease = Lease("manage_plant_alerts", owner="other worker")
+        self.assertTrue(lease.acquire())
+        self.addCleanup(lease.release)
+
+        manage_plant_alerts()
+
+        self.assertEqual(Brain.get_brain().plant_alert_check_status, STATUS.NEVER_RAN)
+
+    def test_run_records_lease_token(self):
+        manage_plant_alerts()
+
+        brain = Brain.get_brain()
+        self.assertEqual(brain.plant_alert_check_status, STATUS.SUCCESS)
+        self.assertEqual(brain.plant_alert_check_token, 1)
+
+    def test_stale_token_is_not_recorded(self):
+        brain = Brain.get_brain()
+        brain.plant_alert_check_token = 5
+        Table.BRAIN.update(str(brain.id), brain)
+
+        manage_plant_alerts()
+
+        brain = Brain.get_brain()
+        self.assertEqual(brain.plant_alert_check_status, STATUS.NEVER_RAN)
+        self.assertEqual(brain.plant_alert_check_token, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+"""
+Tests for the install manifest: bundled data files are installed once and
+reloaded only when their contents change.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from shared.test_utils import MongoTestCase
+from shared.db import Table
+from models.mix import Mix, Soil, SoilPart
+
+from app import install
+
+
+class TestInstallManifest(MongoTestCase):
+    """Installs against a copy of the bundled data so files can be edited."""
+
+    def setUp(self):
+        super().setUp()
+        self.data_dir = tempfile.mkdtemp()
+        shutil.copytree(
+            os.path.join(install.DATA_DIR, "installable"),
+            os.path.join(self.data_dir, "installable"),
+        )
+        patcher = patch.object(install, "DATA_DIR", self.data_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(shutil.rmtree, self.data_dir)
+
+    def test_first_install_writes_every_file(self):
+        summary = install.install()
+
+        self.assertEqual(summary["installed"], len(install.INSTALLABLES))
+        self.assertEqual(summary["skipped"], 0)
+        self.assertGreater(summary["rows_written"], 0)
+        self.assertEqual(Table.INSTALL_RECORD.count(), len(install.INSTALLABLES))
+        # Soils are keyed by name, so every row of the file is its own soil
+        self.assertEqual(Table.SOIL.count(), 99)
+
+    def test_unchanged_files_are_skipped(self):
+        install.install()
+        soils = Table.SOIL.count()
+
+        summary = install.install()
+
+        self.assertEqual(summary["installed"], 0)
+        self.assertEqual(summary["skipped"], len(install.INSTALLABLES))
+        self.assertEqual(summary["rows_written"], 0)
+        self.assertEqual(Table.SOIL.count(), soils)
+
+    def test_changed_file_is_reloaded(self):
+        install.install()
+        soils_csv = os.path.join(self.data_dir, "installable/soils/soils.csv")
+        with open(soils_csv, "a", encoding="utf-8") as file:
+            file.write("Pumice Fines,Sifted pumice,Soil Amendments\n")
+
+        summary = install.install()
+
+        self.assertEqual(summary["installed"], 1)
+        self.assertEqual(
+            summary["files"]["installable/soils/soils.csv"]["status"], "installed"
+        )
+        self.assertEqual(Table.SOIL.count(), 100)
+
+
+class TestRemoveDuplicateSoils(MongoTestCase):
+    """Soils installed again on every boot by earlier releases."""
+
+    def _soil(self, name, age_days):
+        soil = Soil(
+            name=name,
+            description=name,
+            group="Soil Amendments",
+            created_on=datetime.now() - timedelta(days=age_days),
+        )
+        Table.SOIL.create(soil)
+        return soil.id
+
+    def test_keeps_oldest_soil_and_repoints_mixes(self):
+        kept = self._soil("Perlite", 3)
+        copy = self._soil("Perlite", 2)
+        other = self._soil("Perlite", 1)
+        bark = self._soil("Orchid Bark", 1)
+        mix_id = Table.MIX.create(
+            Mix(
+                name="Aroid",
+                description="Chunky",
+                soil_parts=[
+                    SoilPart(soil_id=copy, parts=2),
+                    SoilPart(soil_id=bark, parts=1),
+                ],
+            )
+        )
+
+        removed = install.remove_duplicate_soils()
+
+        self.assertEqual(removed, 2)
+        self.assertEqual(Table.SOIL.count(), 2)
+        self.assertIsNotNone(Table.SOIL.get_one(str(kept)))
+        self.assertIsNone(Table.SOIL.get_one(str(other)))
+        mix = Table.MIX.get_one(str(mix_id))
+        self.assertEqual([part.soil_id for part in mix.soil_parts], [kept, bark])
+        self.assertEqual([part.parts for part in mix.soil_parts], [2, 1])
+
+    def test_nothing_to_remove(self):
+        self._soil("Perlite", 1)
+
+        self.assertEqual(install.remove_duplicate_soils(), 0)
+        self.assertEqual(Table.SOIL.count(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,262 @@
+"""
+Tests for the API routes
+"""
+
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from bson import ObjectId
+from flask import Blueprint, Flask
+
+from models.alert import Alert, AlertTypes
+from models.expense import Budget, Expense
+from models.plant import CarePlan, Plant, PHASES
+from models.system import System
+from models.todo import Todo
+from routes import APIBuilder, GenericCRUD
+from routes.app_routes import bp as app_bp
+from routes.plant_routes import bp as plant_bp, care_plan_bp
+from routes.stat_routes import bp as stat_bp
+from shared.db import Table, get_db_config
+from shared.serialization import MsgpackRequest, OrjsonProvider
+from shared.test_utils import MongoTestCase
+
+
+def make_client(*blueprints):
+    """Test client of an app serving the blueprints like `create_app` does."""
+    app = Flask(__name__)
+    app.json = OrjsonProvider(app)
+    app.request_class = MsgpackRequest
+    for blueprint in blueprints:
+        app.register_blueprint(blueprint)
+    return app.test_client()
+
+
+class TestGetMany(MongoTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = make_client(plant_bp)
+        for cost in range(3):
+            Table.PLANT.create(Plant.from_dict({"phase": PHASES.ADULT, "cost": cost}))
+
+    def test_pages_on_indexed_sort_keys(self):
+        response = self.client.get("/plants/?sort=-updated_on&limit=2")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json["items"]), 2)
+        self.assertIsNotNone(response.json["next_cursor"])
+
+    def test_unindexed_sort_keys_rejected(self):
+        response = self.client.get("/plants/?sort=-cost")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("cost", response.json["error"])
+
+    def test_invalid_limit_rejected(self):
+        for limit in ["abc", "0"]:
+            response = self.client.get(f"/plants/?limit={limit}")
+            self.assertEqual(response.status_code, 400)
+
+    def test_unknown_fields_rejected(self):
+        plant_id = str(Table.PLANT.get_many()[0].id)
+        for url in [
+            "/plants/?fields=cost,model_dump",
+            f"/plants/{plant_id}/?fields=nope",
+            "/plants/export.ndjson?fields=model_dump",
+        ]:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 400, url)
+            self.assertIn("Unknown fields", response.json["error"])
+
+    def test_known_fields_projected(self):
+        response = self.client.get("/plants/?fields=id,cost")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json[0]), {"id", "cost"})
+
+
+class TestUpdateMany(MongoTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = make_client(plant_bp)
+        self.plants = [Plant.from_dict({"phase": PHASES.ADULT}) for _ in range(2)]
+        for plant in self.plants:
+            Table.PLANT.create(plant)
+            Table.ALERT.create(Alert(model_id=plant.id, alert_type=AlertTypes.WATER))
+
+    def test_failed_patches_do_not_resolve_alerts(self):
+        bulk_update = Table.bulk_update
+
+        def fail_second(table, items, session=None):
+            report = bulk_update(table, items[:1], session)
+            report["results"].append(
+                {"index": 1, "id": str(items[1].id), "ok": False, "error": "boom"}
+            )
+            return report
+
+        with patch.object(Table, "bulk_update", autospec=True, side_effect=fail_second):
+            response = self.client.patch(
+                "/plants/",
+                json=[{"id": str(plant.id), "cost": 5} for plant in self.plants],
+            )
+
+        self.assertEqual(
+            [item["ok"] for item in response.json["results"]], [True, False]
+        )
+        open_alerts = [alert.model_id for alert in Table.ALERT.get_many({})]
+        self.assertEqual(open_alerts, [self.plants[1].id])
+
+
+class TestConditionalReads(MongoTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = make_client(care_plan_bp)
+        self.care_plan_id = Table.CARE_PLAN.create(
+            CarePlan(
+                name="Weekly", watering=7, fertilizing=14, cleaning=30, potting=365
+            )
+        )
+
+    def test_etag_and_body_agree_after_writes_elsewhere(self):
+        url = f"/care_plans/{self.care_plan_id}/"
+        etag = self.client.get(url).headers["ETag"]
+
+        # Written by another process, whose cache eviction never reaches here
+        db = get_db_config().db
+        db["care_plan"].update_one(
+            {"_id": self.care_plan_id}, {"$set": {"name": "Daily"}}
+        )
+        db["table_version"].update_one({"_id": "care_plan"}, {"$inc": {"version": 1}})
+        response = self.client.get(url, headers={"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["name"], "Daily")
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+
+class TestUpdate(MongoTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = make_client(care_plan_bp)
+        self.care_plan_id = Table.CARE_PLAN.create(
+            CarePlan(
+                name="Weekly", watering=7, fertilizing=14, cleaning=30, potting=365
+            )
+        )
+
+    def test_patch_builds_on_the_stored_document(self):
+        # Cached here, then changed behind the cache's back
+        Table.CARE_PLAN.get_one(str(self.care_plan_id))
+        get_db_config().db["care_plan"].update_one(
+            {"_id": self.care_plan_id}, {"$set": {"name": "Daily"}}
+        )
+
+        response = self.client.patch(
+            f"/care_plans/{self.care_plan_id}/", json={"watering": 3}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        stored = get_db_config().db["care_plan"].find_one({"_id": self.care_plan_id})
+        self.assertEqual((stored["name"], stored["watering"]), ("Daily", 3))
+
+
+class TestDeleteMany(MongoTestCase):
+
+    def setUp(self):
+        super().setUp()
+        blueprint = Blueprint("bulk_systems", __name__)
+        APIBuilder.register_blueprint(
+            blueprint, "systems", GenericCRUD(Table.SYSTEM), ["DELETE_MANY"]
+        )
+        self.client = make_client(blueprint)
+        self.system_id = str(Table.SYSTEM.create(System.from_dict({"name": "Shelf"})))
+
+    def test_missing_ids_reported_not_found(self):
+        missing_id = str(ObjectId())
+
+        response = self.client.delete(
+            "/systems/", json=[self.system_id, {"id": missing_id}, "abc"]
+        )
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(
+            [
+                (item["id"], item["ok"], item["error"])
+                for item in response.json["results"]
+            ],
+            [
+                (self.system_id, True, None),
+                (missing_id, False, "Not found"),
+                ("abc", False, "Not found"),
+            ],
+        )
+        self.assertEqual(response.json["deleted"], 1)
+        self.assertEqual(Table.SYSTEM.count(), 0)
+
+
+class TestMetaAndStats(MongoTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = make_client(app_bp, stat_bp)
+
+        now = datetime.now()
+        last_month = now.replace(day=1) - timedelta(days=1)
+        month = now.strftime("%Y-%m")
+        for tasks in (3, 1):
+            todo = Todo(name="Todo", due_on=now)
+            for i in range(tasks):
+                todo.add_task(f"Task {i}")
+            Table.TODO.create(todo)
+        for cost, purchased_on in ((10, now), (5.5, now), (100, last_month)):
+            Table.EXPENSE.create(
+                Expense(name="Soil", cost=cost, purchased_on=purchased_on)
+            )
+        Table.BUDGET.create(Budget(budget=200, month=month))
+        Table.BUDGET.create(Budget(budget=999, month=month, deprecated=True))
+        Table.BUDGET.create(Budget(budget=50, month=last_month.strftime("%Y-%m")))
+        plant_ids = [
+            Table.PLANT.create(Plant.from_dict({"phase": PHASES.ADULT, "cost": cost}))
+            for cost in (4, 6, 20)
+        ]
+        for alert_type in (AlertTypes.WATER, AlertTypes.REPOT):
+            Table.ALERT.create(Alert(alert_type=alert_type, model_id=plant_ids[0]))
+        Table.SYSTEM.create(System.from_dict({"name": "Shelf"}))
+        Table.PLANT.banish(str(plant_ids[2]))
+
+    def test_meta_matches_per_collection_queries(self):
+        month = datetime.now().strftime("%Y-%m")
+        start_of_month = datetime.now().replace(
+            day=1, hour=0, minute=0, second=0, microsecond=0
+        )
+        budgets = Table.BUDGET.get_many({"month": month, "deprecated": False})
+        expenses = Table.EXPENSE.get_many({"purchased_on": {"$gte": start_of_month}})
+
+        self.assertEqual(
+            self.client.get("/meta/").json,
+            {
+                "alert_count": Table.ALERT.count(),
+                "task_count": sum(len(todo.tasks) for todo in Table.TODO.get_many()),
+                "remaining_budget": budgets[0].budget
+                - sum(expense.cost for expense in expenses),
+                "total_plants": Table.PLANT.count(),
+            },
+        )
+        self.assertEqual(self.client.get("/meta/").json["remaining_budget"], 184.5)
+
+    def test_stats_count_banished_plants_in_history(self):
+        self.assertEqual(
+            self.client.get("/stats/").json,
+            {
+                "total_plants": 3,
+                "total_active_plants": Table.PLANT.count({"banished": False}),
+                "total_banished_plants": 1,
+                "total_active_systems": Table.SYSTEM.count({"banished": False}),
+                "total_cost": 30,
+                "total_active_cost": 10,
+            },
+        )
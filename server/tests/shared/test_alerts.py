@@ -0,0 +1,81 @@
+"""
+Tests for alert upkeep
+"""
+
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from models.alert import Alert, AlertTypes
+from models.plant import Plant, PHASES
+from shared.alerts import remove_duplicate_alerts, resolve_alerts
+from shared.test_utils import MongoTestCase
+from shared.db import Table
+
+
+class TestRemoveDuplicateAlerts(MongoTestCase):
+
+    def test_oldest_alert_of_each_pair_kept(self):
+        plant_id = ObjectId()
+        oldest = Alert(
+            model_id=plant_id,
+            alert_type=AlertTypes.WATER,
+            created_on=datetime.now() - timedelta(days=2),
+        )
+        Table.ALERT.bulk_create(
+            [
+                Alert(model_id=plant_id, alert_type=AlertTypes.WATER),
+                oldest,
+                Alert(model_id=plant_id, alert_type=AlertTypes.WATER),
+                Alert(model_id=plant_id, alert_type=AlertTypes.FERTILIZE),
+            ]
+        )
+
+        self.assertEqual(remove_duplicate_alerts(), 2)
+
+        remaining = Table.ALERT.get_many({})
+        self.assertEqual(len(remaining), 2)
+        self.assertIn(oldest.id, {alert.id for alert in remaining})
+        self.assertEqual(Table.ALERT.reconcile_indexes()["failed"], [])
+
+
+class TestResolveAlerts(MongoTestCase):
+
+    def _plant(self, next_water_on: datetime) -> Plant:
+        plant = Plant(
+            phase=PHASES.ADULT,
+            next_water_on=next_water_on,
+            next_fertilize_on=datetime.now() - timedelta(days=1),
+        )
+        Table.PLANT.create(plant)
+        for alert_type in (AlertTypes.WATER, AlertTypes.FERTILIZE):
+            Table.ALERT.create(Alert(model_id=plant.id, alert_type=alert_type))
+        return plant
+
+    def test_only_alerts_of_cared_for_plants_resolved(self):
+        watered = self._plant(next_water_on=datetime.now() + timedelta(days=7))
+        thirsty = self._plant(next_water_on=datetime.now() - timedelta(days=1))
+
+        self.assertEqual(resolve_alerts([watered, thirsty]), 1)
+
+        open_alerts = {
+            (alert.model_id, alert.alert_type) for alert in Table.ALERT.get_many({})
+        }
+        self.assertEqual(
+            open_alerts,
+            {
+                (watered.id, AlertTypes.FERTILIZE),
+                (thirsty.id, AlertTypes.WATER),
+                (thirsty.id, AlertTypes.FERTILIZE),
+            },
+        )
+
+    def test_resolved_alerts_moved_to_history(self):
+        plant = self._plant(next_water_on=datetime.now() + timedelta(days=7))
+
+        resolve_alerts([plant])
+
+        (moved,) = self.get_collection_data("alert", use_history=True)
+        self.assertEqual(moved["alert_type"], AlertTypes.WATER.value)
+        self.assertTrue(moved["banished"])
+        self.assertEqual(moved["banished_cause"], "Care recorded")
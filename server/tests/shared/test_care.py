@@ -0,0 +1,64 @@
+"""
+Tests for keeping plant due dates in line with care plans
+"""
+
+from datetime import datetime, timedelta
+
+from models.plant import Plant, CarePlan, PHASES, CARE_SCHEDULE
+from shared.care import schedule_plants, reschedule_care_plan, backfill_schedules
+from shared.test_utils import MongoTestCase
+from shared.db import Table
+
+
+class TestCareSchedule(MongoTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.care_plan = CarePlan(
+            name="Weekly", watering=7, fertilizing=14, cleaning=30, potting=365
+        )
+        Table.CARE_PLAN.create(self.care_plan)
+        self.watered_on = datetime(2024, 1, 1)
+
+    def _plant(self, **data) -> Plant:
+        return Plant(phase=PHASES.ADULT, watered_on=self.watered_on, **data)
+
+    def test_schedule_plants(self):
+        plant = self._plant(care_plan_id=self.care_plan.id)
+        schedule_plants([plant])
+
+        self.assertEqual(plant.next_water_on, self.watered_on + timedelta(days=7))
+        self.assertEqual(plant.next_repot_on, plant.potted_on + timedelta(days=365))
+
+    def test_schedule_without_care_plan(self):
+        plant = self._plant()
+        schedule_plants([plant])
+
+        self.assertIsNone(plant.next_water_on)
+        self.assertIsNone(plant.next_cleanse_on)
+
+    def test_reschedule_care_plan(self):
+        plant = self._plant(care_plan_id=self.care_plan.id)
+        schedule_plants([plant])
+        Table.PLANT.create(plant)
+
+        self.care_plan.watering = 3
+        Table.CARE_PLAN.update(str(self.care_plan.id), self.care_plan)
+        self.assertEqual(reschedule_care_plan(self.care_plan), 1)
+
+        stored = Table.PLANT.get_one(str(plant.id))
+        self.assertEqual(stored.next_water_on, self.watered_on + timedelta(days=3))
+
+    def test_backfill_schedules(self):
+        collection = self.get_test_db_config().db["plant"]
+        plant = self._plant(care_plan_id=self.care_plan.id)
+        data = plant.to_dict()
+        for _, _, due_field in CARE_SCHEDULE:
+            data.pop(due_field)
+        collection.insert_one(data)
+
+        self.assertEqual(backfill_schedules(), 1)
+        self.assertEqual(backfill_schedules(), 0)
+
+        stored = Table.PLANT.get_one(str(plant.id))
+        self.assertEqual(stored.next_water_on, self.watered_on + timedelta(days=7))
@@ -0,0 +1,97 @@
+"""
+Tests for response compression
+"""
+
+import gzip
+import unittest
+
+import zstandard
+from flask import Flask, Response, jsonify
+
+from shared.compression import init_compression
+
+ROWS = [{"name": f"plant {i}", "phase": "Adult"} for i in range(500)]
+
+
+class TestCompression(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        init_compression(self.app)
+
+        @self.app.route("/rows/")
+        def rows():
+            return jsonify(ROWS)
+
+        @self.app.route("/small/")
+        def small():
+            return jsonify({"ok": True})
+
+        @self.app.route("/lines/")
+        def lines():
+            chunks = (f'{{"row": {i}}}\n'.encode() for i in range(3))
+            return Response(chunks, mimetype="application/x-ndjson")
+
+        @self.app.route("/feed/")
+        def feed():
+            frames = (b"--frame\r\n" for _ in range(3))
+            return Response(frames, mimetype="multipart/x-mixed-replace")
+
+        self.client = self.app.test_client()
+
+    def test_prefers_zstd(self):
+        response = self.client.get("/rows/", headers={"Accept-Encoding": "gzip, zstd"})
+
+        self.assertEqual(response.headers["Content-Encoding"], "zstd")
+        self.assertIn("Accept-Encoding", response.headers["Vary"])
+        body = zstandard.ZstdDecompressor().decompress(response.data)
+        self.assertEqual(body, self.client.get("/rows/").data)
+        self.assertLess(len(response.data) * 5, len(body))
+
+    def test_gzip_and_client_weights(self):
+        response = self.client.get(
+            "/rows/", headers={"Accept-Encoding": "zstd;q=0.5, gzip"}
+        )
+
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.data), self.client.get("/rows/").data)
+
+    def test_uncompressed_without_accepted_encoding(self):
+        for accept in [None, "br", "zstd;q=0, gzip;q=0"]:
+            headers = {"Accept-Encoding": accept} if accept else {}
+            response = self.client.get("/rows/", headers=headers)
+            self.assertNotIn("Content-Encoding", response.headers)
+
+    def test_small_bodies_left_alone(self):
+        response = self.client.get("/small/", headers={"Accept-Encoding": "zstd"})
+
+        self.assertNotIn("Content-Encoding", response.headers)
+        self.assertEqual(response.json, {"ok": True})
+
+    def test_streams_compressed_per_chunk(self):
+        response = self.client.get("/lines/", headers={"Accept-Encoding": "gzip"})
+
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertNotIn("Content-Length", response.headers)
+        self.assertEqual(
+            gzip.decompress(response.data).splitlines(),
+            [b'{"row": 0}', b'{"row": 1}', b'{"row": 2}'],
+        )
+
+        # Every chunk is flushed on its own, none are held back
+        response = self.client.get("/lines/", headers={"Accept-Encoding": "zstd"})
+        decompressor = zstandard.ZstdDecompressor().decompressobj()
+        chunks = [decompressor.decompress(chunk) for chunk in response.response]
+        self.assertEqual(
+            chunks[:3], [b'{"row": 0}\n', b'{"row": 1}\n', b'{"row": 2}\n']
+        )
+
+    def test_mjpeg_streams_untouched(self):
+        response = self.client.get("/feed/", headers={"Accept-Encoding": "zstd"})
+
+        self.assertNotIn("Content-Encoding", response.headers)
+        self.assertEqual(response.data, b"--frame\r\n" * 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
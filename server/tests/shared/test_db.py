@@ -2,13 +2,18 @@
 Comprehensive tests for the database module
 """
 
+import json
+from unittest.mock import patch
+
 from bson import ObjectId
 
-from models.plant import Plant, PlantGenus, PlantSpecies, PHASES
+from models.app import QueuedJob
+from models.plant import Plant, PlantGenus, PlantSpecies, CarePlan, PHASES
 from models.system import System
 from models.todo import Todo
 from shared.test_utils import MongoTestCase, DatabaseTestMixin
-from shared.db import Table, Query, get_db_config
+from shared.db import Table, Query, get_db_config, table_versions
+from shared.serialization import dumps
 
 
 class TestDatabaseConfiguration(MongoTestCase):
@@ -83,6 +88,114 @@ class TestTableEnum(MongoTestCase, DatabaseTestMixin):
         limited_plants = Table.PLANT.get_many(limit=2)
         self.assertEqual(len(limited_plants), 2)
 
+    def test_get_page(self):
+        """Test keyset pagination walks every document exactly once"""
+        ids = []
+        for i in range(7):
+            plant = Plant.from_dict({"phase": PHASES.ADULT, "cost": i % 3})
+            ids.append(Table.PLANT.create(plant))
+
+        seen = []
+        cursor = None
+        while True:
+            page, cursor = Table.PLANT.get_page(limit=3, after=cursor)
+            seen.extend(plant.id for plant in page)
+            if cursor is None:
+                break
+
+        self.assertEqual(seen, sorted(ids))
+
+    def test_get_page_sort_key(self):
+        """Test keyset pagination on a non-unique sort key"""
+        for i in range(6):
+            plant = Plant.from_dict({"phase": PHASES.ADULT, "cost": i % 2})
+            Table.PLANT.create(plant)
+
+        first, cursor = Table.PLANT.get_page(limit=4, sort_key="-cost")
+        second, cursor = Table.PLANT.get_page(limit=4, after=cursor, sort_key="-cost")
+
+        self.assertIsNone(cursor)
+        costs = [plant.cost for plant in first + second]
+        self.assertEqual(costs, [1, 1, 1, 0, 0, 0])
+        self.assertEqual(len({plant.id for plant in first + second}), 6)
+
+    def test_get_page_sort_key_with_nulls(self):
+        """Test keyset pagination across null and missing sort values"""
+        # Legacy documents: one with a null cost, one without any
+        get_db_config().db["plant"].insert_many(
+            [{"cost": None}, {"cost": 2}, {}, {"cost": 1}, {"cost": 3}]
+        )
+
+        for sort_key, expected in (
+            ("cost", [None, None, 1, 2, 3]),
+            ("-cost", [3, 2, 1, None, None]),
+        ):
+            seen, cursor = [], None
+            while True:
+                page, cursor = Table.PLANT.get_page_trusted(
+                    limit=1, after=cursor, sort_key=sort_key, fields=["cost"]
+                )
+                seen.extend(page)
+                if cursor is None:
+                    break
+            self.assertEqual([doc.get("cost") for doc in seen], expected)
+            self.assertEqual(len({doc["id"] for doc in seen}), 5)
+
+    def test_sort_keys(self):
+        """Test only _id and the leading keys of indexes are cheap sort keys"""
+        self.assertEqual(Table.SYSTEM.sort_keys, ["_id"])
+        self.assertIn("updated_on", Table.PLANT.sort_keys)
+        self.assertNotIn("cost", Table.PLANT.sort_keys)
+
+    def test_get_page_invalid_cursor(self):
+        """Test that a malformed cursor is rejected"""
+        with self.assertRaises(ValueError):
+            Table.PLANT.get_page(after="not-a-cursor")
+
+    def test_field_projection(self):
+        """Test fetching only a subset of fields"""
+        plant = Plant.from_dict({"phase": PHASES.ADULT, "cost": 12.00, "size": 4})
+        plant_id = Table.PLANT.create(plant)
+
+        partial = Table.PLANT.get_one(str(plant_id), fields=["cost"])
+        self.assertEqual(partial.model_dump(mode="json"), {"id": str(plant_id), "cost": 12.0})
+
+        partials = Table.PLANT.get_many(fields=["phase", "size"])
+        self.assertEqual(partials[0].phase, PHASES.ADULT)
+        self.assertEqual(partials[0].size, 4)
+        self.assertNotIn("cost", partials[0].model_dump())
+
+    def test_trusted_reads_match_models(self):
+        """Test trusted reads serialize the same as the validated path"""
+        plant = Plant.from_dict({"phase": PHASES.ADULT, "cost": 8.00})
+        plant_id = Table.PLANT.create(plant)
+
+        expected = Table.PLANT.get_one(str(plant_id)).model_dump(mode="json")
+        trusted = json.loads(dumps(Table.PLANT.get_one_trusted(str(plant_id))))
+        self.assertEqual(trusted, expected)
+
+        page, cursor = Table.PLANT.get_page_trusted(fields=["phase"])
+        self.assertIsNone(cursor)
+        self.assertEqual(page, [{"id": plant_id, "phase": "Adult"}])
+
+    def test_iter_batches(self):
+        """Test streaming documents in _id ordered batches"""
+        plant_ids = [
+            Table.PLANT.create(Plant.from_dict({"phase": PHASES.ADULT, "cost": i}))
+            for i in range(5)
+        ]
+        Table.PLANT.banish(str(plant_ids[0]))
+
+        batches = list(Table.PLANT.iter_batches(fields=["cost"], batch_size=2))
+        self.assertEqual([len(batch) for batch in batches], [2, 2])
+        self.assertEqual(
+            [doc["id"] for batch in batches for doc in batch], plant_ids[1:]
+        )
+        self.assertEqual(batches[0][0], {"id": plant_ids[1], "cost": 1})
+
+        history = list(Table.PLANT.iter_batches(history=True))
+        self.assertEqual([doc["id"] for doc in history[0]], plant_ids[:1])
+
     def test_update(self):
         """Test updating a document"""
         plant = Plant.from_dict({"phase": PHASES.JUVY, "cost": 15.00})
@@ -156,6 +269,235 @@ class TestTableEnum(MongoTestCase, DatabaseTestMixin):
         self.assert_banished_correctly(Table.PLANT, plant_id)
 
 
+class TestBulkWrites(MongoTestCase):
+    """Test the bulk write methods on Table"""
+
+    def test_bulk_create_and_delete(self):
+        plants = [Plant.from_dict({"phase": PHASES.ADULT}) for _ in range(3)]
+        report = Table.PLANT.bulk_create(plants)
+
+        self.assertEqual(report["inserted"], 3)
+        self.assertTrue(all(item["ok"] for item in report["results"]))
+        self.assert_collection_count("plant", 3)
+
+        ids = [str(plant.id) for plant in plants[:2]] + ["invalid_id"]
+        report = Table.PLANT.bulk_delete(ids)
+
+        self.assertEqual(report["deleted"], 2)
+        self.assertEqual([item["ok"] for item in report["results"]], [True, True, False])
+        self.assert_collection_count("plant", 1)
+
+    def test_bulk_create_reports_duplicates(self):
+        plant = Plant.from_dict({"phase": PHASES.ADULT})
+        Table.PLANT.create(plant)
+
+        report = Table.PLANT.bulk_create([plant, Plant.from_dict({"phase": PHASES.SEED})])
+
+        self.assertEqual(report["inserted"], 1)
+        self.assertFalse(report["results"][0]["ok"])
+        self.assertIsNotNone(report["results"][0]["error"])
+        self.assertTrue(report["results"][1]["ok"])
+
+    def test_bulk_upsert_and_update(self):
+        plants = [Plant.from_dict({"phase": PHASES.ADULT, "cost": i}) for i in range(2)]
+        report = Table.PLANT.bulk_upsert(plants)
+        self.assertEqual(report["upserted"], 2)
+
+        for plant in plants:
+            plant.cost = 99
+        report = Table.PLANT.bulk_update(plants)
+
+        self.assertEqual(report["modified"], 2)
+        self.assertEqual(Table.PLANT.count({"cost": 99}), 2)
+
+
+class TestTableVersions(MongoTestCase):
+    """Test the per table write counters behind conditional reads"""
+
+    def test_writes_move_the_version(self):
+        self.assertEqual(Table.PLANT.version(), "0")
+        seen = set()
+
+        plant = Plant.from_dict({"phase": PHASES.ADULT, "cost": 1})
+        plant_id = str(Table.PLANT.create(plant))
+        seen.add(Table.PLANT.version())
+        plant.cost = 2
+        Table.PLANT.update(plant_id, plant)
+        seen.add(Table.PLANT.version())
+        plant.cost = 3
+        Table.PLANT.upsert(plant_id, plant)
+        seen.add(Table.PLANT.version())
+        plant.cost = 4
+        Table.PLANT.bulk_update([plant])
+        seen.add(Table.PLANT.version())
+        Table.PLANT.banish(plant_id)
+        seen.add(Table.PLANT.version())
+
+        self.assertEqual(len(seen), 5)
+        self.assertNotIn("0", seen)
+
+    def test_writes_changing_nothing_leave_versions_alone(self):
+        plant = Plant.from_dict({"phase": PHASES.ADULT, "cost": 1})
+        plant_id = str(Table.PLANT.create(plant))
+        version = Table.PLANT.version()
+
+        Table.PLANT.update(plant_id, plant)
+        Table.PLANT.bulk_update([plant])
+        Table.PLANT.update_fields(plant_id, {"cost": 2}, {"cost": 5})
+        Table.PLANT.update_where({"cost": 5}, {"cost": 2})
+        Table.PLANT.find_one_and_update({"cost": 5}, {"$set": {"cost": 2}})
+        Table.PLANT.delete(str(ObjectId()))
+
+        self.assertEqual(Table.PLANT.version(), version)
+
+    def test_internal_tables_are_not_versioned(self):
+        Table.JOB_LEASE.find_one_and_update(
+            {"name": "drain"}, {"$inc": {"token": 1}}, upsert=True
+        )
+        queue_id = Table.QUEUED_JOB.create(QueuedJob(name="echo"))
+        Table.QUEUED_JOB.update_fields(str(queue_id), {"priority": 1})
+
+        self.assertEqual(
+            table_versions([Table.JOB_LEASE, Table.QUEUED_JOB]), ["0", "0"]
+        )
+
+    def test_reads_leave_versions_alone(self):
+        Table.PLANT.create(Plant.from_dict({"phase": PHASES.ADULT}))
+        version = Table.PLANT.version()
+
+        Table.PLANT.get_many()
+        Table.SYSTEM.create(System.from_dict({"name": "Shelf"}))
+
+        self.assertEqual(Table.PLANT.version(), version)
+        self.assertEqual(
+            table_versions([Table.SYSTEM, Table.PLANT, Table.TODO]),
+            [Table.SYSTEM.version(), version, "0"],
+        )
+
+    def test_lost_counters_start_a_new_epoch(self):
+        Table.PLANT.create(Plant.from_dict({"phase": PHASES.ADULT}))
+        version = Table.PLANT.version()
+
+        get_db_config().db.drop_collection("table_version")
+        Table.PLANT.create(Plant.from_dict({"phase": PHASES.ADULT}))
+
+        self.assertNotEqual(Table.PLANT.version(), version)
+
+
+class TestIndexes(MongoTestCase):
+    """Test reconciliation of the indexes declared on Table"""
+
+    def test_reconcile_creates_missing_indexes(self):
+        report = Table.PLANT.reconcile_indexes()
+        self.assertEqual(
+            sorted(report["created"]),
+            [
+                "active_care_plan_id",
+                "active_next_cleanse_on",
+                "active_next_fertilize_on",
+                "active_next_repot_on",
+                "active_next_water_on",
+                "active_updated_on",
+                "system_id_1",
+            ],
+        )
+
+        indexes = self.db_config.db["plant"].index_information()
+        self.assertIn("system_id_1", indexes)
+
+        report = Table.PLANT.reconcile_indexes()
+        self.assertEqual(report["created"], [])
+
+    def test_reconcile_reports_extra_indexes(self):
+        self.db_config.db["plant"].create_index("size")
+
+        report = Table.PLANT.reconcile_indexes()
+        self.assertEqual(report["extra"], ["size_1"])
+        self.assertIn("size_1", self.db_config.db["plant"].index_information())
+
+        report = Table.PLANT.reconcile_indexes(drop_extra=True)
+        self.assertEqual(report["dropped"], ["size_1"])
+        self.assertNotIn("size_1", self.db_config.db["plant"].index_information())
+
+
+class TestReferenceCache(MongoTestCase):
+    """Test the read-through cache of reference tables"""
+
+    def _care_plan(self, name):
+        return CarePlan(name=name, watering=7, fertilizing=14, cleaning=30, potting=365)
+
+    def test_get_one_is_cached(self):
+        care_plan_id = Table.CARE_PLAN.create(self._care_plan("Weekly"))
+
+        Table.CARE_PLAN.get_one(str(care_plan_id))
+        hits = Table.CARE_PLAN.cache.hits
+        cached = Table.CARE_PLAN.get_one(str(care_plan_id))
+
+        self.assertEqual(cached.name, "Weekly")
+        self.assertEqual(Table.CARE_PLAN.cache.hits, hits + 1)
+
+    def test_writes_invalidate(self):
+        care_plan_id = Table.CARE_PLAN.create(self._care_plan("Weekly"))
+        self.assertEqual(len(Table.CARE_PLAN.get_many()), 1)
+
+        care_plan = Table.CARE_PLAN.get_one(str(care_plan_id))
+        care_plan.name = "Daily"
+        Table.CARE_PLAN.update(str(care_plan_id), care_plan)
+        Table.CARE_PLAN.create(self._care_plan("Monthly"))
+
+        self.assertEqual(Table.CARE_PLAN.get_one(str(care_plan_id)).name, "Daily")
+        self.assertEqual(len(Table.CARE_PLAN.get_many()), 2)
+
+        Table.CARE_PLAN.banish(str(care_plan_id))
+        self.assertIsNone(Table.CARE_PLAN.get_one(str(care_plan_id)))
+        self.assertEqual(len(Table.CARE_PLAN.get_many()), 1)
+
+    def test_reads_racing_writes_not_cached(self):
+        care_plan_id = Table.CARE_PLAN.create(self._care_plan("Weekly"))
+        cache = Table.CARE_PLAN.cache
+        get = cache.get
+
+        def get_then_write(key):
+            # A write lands after the miss, before the read's result is stored
+            value = get(key)
+            Table.CARE_PLAN._invalidate(care_plan_id)
+            return value
+
+        with patch.object(cache, "get", side_effect=get_then_write):
+            Table.CARE_PLAN.get_one(str(care_plan_id))
+            Table.CARE_PLAN.get_many()
+
+        self.assertEqual(cache.stats()["size"], 0)
+
+    def test_writes_by_other_processes_seen(self):
+        care_plan_id = Table.CARE_PLAN.create(self._care_plan("Weekly"))
+        Table.CARE_PLAN.get_one(str(care_plan_id))
+        Table.CARE_PLAN.get_many()
+
+        # Another process writes: the shared version moves, this process'
+        # cache is left alone
+        db = get_db_config().db
+        db["care_plan"].update_one({"_id": care_plan_id}, {"$set": {"name": "Daily"}})
+        db["table_version"].update_one({"_id": "care_plan"}, {"$inc": {"version": 1}})
+
+        self.assertEqual(Table.CARE_PLAN.get_one(str(care_plan_id)).name, "Daily")
+        self.assertEqual(Table.CARE_PLAN.get_many()[0].name, "Daily")
+
+    def test_cached_pages(self):
+        ids = [Table.CARE_PLAN.create(self._care_plan(str(i))) for i in range(5)]
+
+        for sort_key, expected in (("_id", ids), ("-_id", ids[::-1])):
+            seen, cursor = [], None
+            while True:
+                page, cursor = Table.CARE_PLAN.get_page(
+                    limit=2, after=cursor, sort_key=sort_key
+                )
+                seen.extend(care_plan.id for care_plan in page)
+                if cursor is None:
+                    break
+            self.assertEqual(seen, expected)
+
+
 class TestQuery(MongoTestCase):
     """Test the Query builder class"""
 
@@ -0,0 +1,126 @@
+"""
+Tests for the care calendar
+"""
+
+from datetime import date, datetime, time, timedelta
+from unittest.mock import patch
+
+from models.plant import CarePlan, CareEventType, Plant, PlantCareEvent, PHASES
+from models.todo import Todo
+from shared.care import schedule_plants
+from shared import forecast
+from shared.forecast import CALENDAR_CACHE, calendar, project_care
+from shared.test_utils import MongoTestCase
+from shared.db import Table
+
+
+class TestCareCalendar(MongoTestCase):
+
+    def setUp(self):
+        super().setUp()
+        CALENDAR_CACHE.clear()
+        self.today = date.today()
+        self.care_plan = CarePlan(
+            name="Test Care Plan", watering=7, fertilizing=14, potting=365, cleaning=10
+        )
+        Table.CARE_PLAN.create(self.care_plan)
+
+    def _plant(self, days_since_care: int) -> Plant:
+        cared_on = datetime.combine(self.today, time(9)) - timedelta(
+            days=days_since_care
+        )
+        plant = Plant(
+            phase=PHASES.ADULT,
+            care_plan_id=self.care_plan.id,
+            watered_on=cared_on,
+            fertilized_on=cared_on,
+            potted_on=cared_on,
+            cleansed_on=cared_on,
+        )
+        schedule_plants([plant])
+        Table.PLANT.create(plant)
+        return plant
+
+    def _day(self, days: int) -> str:
+        return (self.today + timedelta(days=days)).isoformat()
+
+    def test_care_recurs_every_interval(self):
+        plant = self._plant(days_since_care=0)
+
+        entries = project_care(
+            [plant],
+            {self.care_plan.id: self.care_plan},
+            self.today,
+            self.today + timedelta(days=21),
+        )
+
+        waterings = [entry["date"] for entry in entries if entry["care"] == "Water"]
+        self.assertEqual(waterings, [self._day(7), self._day(14), self._day(21)])
+        cleanings = [entry["date"] for entry in entries if entry["care"] == "Cleanse"]
+        self.assertEqual(cleanings, [self._day(10), self._day(20)])
+        self.assertFalse(any(entry["overdue"] for entry in entries))
+
+    def test_overdue_care_due_today(self):
+        plant = self._plant(days_since_care=9)
+
+        entries = project_care(
+            [plant],
+            {self.care_plan.id: self.care_plan},
+            self.today - timedelta(days=5),
+            self.today + timedelta(days=7),
+        )
+
+        waterings = [entry for entry in entries if entry["care"] == "Water"]
+        self.assertEqual(
+            [(entry["date"], entry["overdue"]) for entry in waterings],
+            [(self._day(0), True), (self._day(7), False)],
+        )
+        # Past days of the range get no projections
+        self.assertEqual(entries[0]["date"], self._day(0))
+
+    def test_calendar_buckets_care_todos_and_events(self):
+        plant = self._plant(days_since_care=0)
+        due_on = datetime.combine(self.today + timedelta(days=7), time(12))
+        Table.TODO.create(Todo(name="Repot monstera", due_on=due_on))
+        Table.PLANT_CARE_EVENT.create(
+            PlantCareEvent(plant_id=plant.id, event_type=CareEventType.WATER)
+        )
+
+        result = calendar(self.today, self.today + timedelta(days=7))
+
+        self.assertEqual(list(result["days"]), [self._day(0), self._day(7)])
+        self.assertEqual(
+            [event["event_type"] for event in result["days"][self._day(0)]["events"]],
+            ["Water"],
+        )
+        week = result["days"][self._day(7)]
+        self.assertEqual([todo["name"] for todo in week["todos"]], ["Repot monstera"])
+        self.assertEqual(
+            week["care"],
+            [{"plant_id": str(plant.id), "care": "Water", "overdue": False}],
+        )
+
+    def test_calendar_cached_until_written(self):
+        start, end = self.today, self.today + timedelta(days=7)
+        first = calendar(start, end)
+        self.assertIs(calendar(start, end), first)
+
+        self._plant(days_since_care=0)
+
+        self.assertIsNot(calendar(start, end), first)
+        self.assertTrue(calendar(start, end)["days"])
+
+    def test_write_during_reads_not_cached(self):
+        start, end = self.today, self.today + timedelta(days=7)
+        read_plants = forecast._plants
+
+        def plants_then_write():
+            plants = read_plants()
+            # Lands after the plants were read, before the result is cached
+            Table.TODO.create(Todo(name="Repot", due_on=datetime.now()))
+            return plants
+
+        with patch.object(forecast, "_plants", plants_then_write):
+            stale = calendar(start, end)
+
+        self.assertIsNot(calendar(start, end), stale)
@@ -0,0 +1,50 @@
+"""
+Tests for the job run history
+"""
+
+from models.app import STATUS
+from shared.job_history import job_summaries, record_run
+from shared.test_utils import MongoTestCase
+from shared.db import Table
+
+
+class TestJobHistory(MongoTestCase):
+
+    def test_successful_run_recorded(self):
+        result = record_run(
+            "scan", lambda: {"items_scanned": 4, "items_written": 2, "batches": 1}
+        )
+
+        self.assertEqual(result["items_written"], 2)
+        run = Table.JOB_RUN.get_many({"job": "scan"})[0]
+        self.assertEqual(run.status, STATUS.SUCCESS)
+        self.assertEqual(run.items_scanned, 4)
+        self.assertEqual(run.items_written, 2)
+        self.assertEqual(run.stats, {"batches": 1})
+        self.assertGreaterEqual(run.duration_seconds, 0)
+        self.assertIsNotNone(run.finished_on)
+
+    def test_failed_run_recorded_and_raised(self):
+        def fail():
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            record_run("scan", fail)
+
+        run = Table.JOB_RUN.get_many({"job": "scan"})[0]
+        self.assertEqual(run.status, STATUS.FAILED)
+        self.assertEqual(run.error, "RuntimeError: boom")
+
+    def test_summaries_per_job(self):
+        for _ in range(3):
+            record_run("scan", lambda: None)
+        record_run("drain", lambda: None)
+
+        summaries = job_summaries(recent=2)
+
+        self.assertEqual([summary["job"] for summary in summaries], ["drain", "scan"])
+        scan = summaries[1]
+        self.assertEqual(scan["runs"], 3)
+        self.assertEqual(scan["failures"], 0)
+        self.assertEqual(len(scan["recent"]), 2)
+        self.assertLessEqual(scan["p50_seconds"], scan["p95_seconds"])
@@ -0,0 +1,54 @@
+"""
+Tests for job leases
+"""
+
+from datetime import datetime, timedelta
+
+from shared.lease import Lease
+from shared.test_utils import MongoTestCase
+from shared.db import Table
+
+
+class TestLease(MongoTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # Competing holders collide on the unique lease name
+        Table.JOB_LEASE.reconcile_indexes()
+
+    def _lease(self, owner: str) -> Lease:
+        lease = Lease("job", ttl_seconds=60, owner=owner)
+        self.addCleanup(lease.release)
+        return lease
+
+    def _expire(self):
+        collection = self.get_test_db_config().db["job_lease"]
+        collection.update_one(
+            {"name": "job"},
+            {"$set": {"expires_on": datetime.now() - timedelta(seconds=1)}},
+        )
+
+    def test_only_one_holder(self):
+        first, second = self._lease("first"), self._lease("second")
+
+        self.assertTrue(first.acquire())
+        self.assertFalse(second.acquire())
+        self.assertEqual(first.token, 1)
+
+    def test_release_lets_next_holder_in(self):
+        first, second = self._lease("first"), self._lease("second")
+        first.acquire()
+        first.release()
+
+        self.assertTrue(second.acquire())
+        self.assertEqual(second.token, 2)
+
+    def test_expired_lease_is_taken_over(self):
+        first, second = self._lease("first"), self._lease("second")
+        first.acquire()
+        self._expire()
+
+        self.assertTrue(second.acquire())
+        self.assertGreater(second.token, first.token)
+        self.assertFalse(first.renew())
+        self.assertTrue(second.renew())
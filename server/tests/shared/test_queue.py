@@ -0,0 +1,115 @@
+"""
+Tests for the MongoDB job queue
+"""
+
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from models.app import JOB_STATUS
+from shared import queue
+from shared.test_utils import MongoTestCase
+from shared.db import Table
+
+
+class TestJobQueue(MongoTestCase):
+
+    def setUp(self):
+        super().setUp()
+        patcher = patch.dict(queue.HANDLERS, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        @queue.handler("echo")
+        def echo(payload):
+            return {"echo": payload.get("value")}
+
+        @queue.handler("flaky", max_attempts=2, retry_delay=60)
+        def flaky(payload):
+            raise RuntimeError("boom")
+
+        @queue.handler("single", concurrency=1)
+        def single(payload):
+            return None
+
+        @queue.handler("slow", visibility_timeout=0.3)
+        def slow(payload):
+            # Outlives the visibility timeout, then looks for work again
+            time.sleep(0.6)
+            return {"reclaimed": queue.claim("other") is not None}
+
+    def _expire(self, job_id):
+        """Pretend the job's visibility timeout or retry delay has passed."""
+        Table.QUEUED_JOB.update_fields(
+            str(job_id), {"run_after": datetime.now() - timedelta(seconds=1)}
+        )
+
+    def test_unknown_job_rejected(self):
+        with self.assertRaises(ValueError):
+            queue.enqueue("missing")
+
+    def test_claims_highest_priority_first(self):
+        queue.enqueue("echo", {"value": "low"})
+        queue.enqueue("echo", {"value": "high"}, priority=5)
+
+        job = queue.claim("worker")
+
+        self.assertEqual(job.payload, {"value": "high"})
+        self.assertEqual(job.status, JOB_STATUS.RUNNING)
+        self.assertTrue(queue.run(job))
+        stored = Table.QUEUED_JOB.get_one(str(job.id))
+        self.assertEqual(stored.status, JOB_STATUS.SUCCEEDED)
+        self.assertEqual(stored.result, {"echo": "high"})
+
+    def test_claimed_job_hidden_until_visibility_timeout(self):
+        job_id = queue.enqueue("echo")
+        self.assertIsNotNone(queue.claim("first"))
+        self.assertIsNone(queue.claim("second"))
+
+        self._expire(job_id)
+        job = queue.claim("second")
+
+        self.assertEqual(job.id, job_id)
+        self.assertEqual(job.attempts, 2)
+
+    def test_failed_job_retried_then_failed(self):
+        job_id = queue.enqueue("flaky")
+
+        self.assertFalse(queue.run(queue.claim("worker")))
+        stored = Table.QUEUED_JOB.get_one(str(job_id))
+        self.assertEqual(stored.status, JOB_STATUS.QUEUED)
+        self.assertGreater(stored.run_after, datetime.now())
+        self.assertIsNone(queue.claim("worker"))
+
+        self._expire(job_id)
+        self.assertFalse(queue.run(queue.claim("worker")))
+        stored = Table.QUEUED_JOB.get_one(str(job_id))
+        self.assertEqual(stored.status, JOB_STATUS.FAILED)
+        self.assertIn("boom", stored.error)
+
+    def test_concurrency_limit(self):
+        queue.enqueue("single")
+        queue.enqueue("single")
+
+        self.assertIsNotNone(queue.claim("first"))
+        self.assertIsNone(queue.claim("second"))
+
+    def test_running_job_kept_hidden(self):
+        job_id = queue.enqueue("slow")
+
+        self.assertTrue(queue.run(queue.claim("worker")))
+
+        self.assertEqual(
+            Table.QUEUED_JOB.get_one(str(job_id)).result, {"reclaimed": False}
+        )
+
+    def test_abandoned_last_attempt_failed(self):
+        job_id = queue.enqueue("flaky")
+        Table.QUEUED_JOB.update_fields(str(job_id), {"attempts_left": 1})
+        queue.claim("worker")
+        self._expire(job_id)
+
+        self.assertEqual(queue.fail_abandoned(), 1)
+        self.assertEqual(
+            Table.QUEUED_JOB.get_one(str(job_id)).status, JOB_STATUS.FAILED
+        )
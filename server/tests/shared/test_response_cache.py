@@ -0,0 +1,122 @@
+"""
+Tests for the GET response cache
+"""
+
+from unittest.mock import patch
+
+from flask import Flask, jsonify
+
+from models.plant import CarePlan, Plant, PHASES
+from models.system import System
+from shared import response_cache
+from shared.db import Table, get_db_config
+from shared.response_cache import cached, response_cache_stats
+from shared.test_utils import MongoTestCase
+
+
+class TestResponseCache(MongoTestCase):
+
+    def setUp(self):
+        super().setUp()
+        patcher = patch.dict(response_cache.ROUTE_CACHES, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.calls = 0
+        self.app = Flask(__name__)
+
+        @self.app.route("/plants/count/")
+        @cached("plant_count", [Table.PLANT], ttl_seconds=60)
+        def plant_count():
+            self.calls += 1
+            response = jsonify({"count": Table.PLANT.count()})
+            response.set_etag(str(self.calls), weak=True)
+            return response
+
+        @self.app.route("/care_plans/names/")
+        @cached("care_plan_names", [Table.CARE_PLAN], ttl_seconds=60)
+        def care_plan_names():
+            # Served from the Table cache of care plans
+            return jsonify([care_plan.name for care_plan in Table.CARE_PLAN.get_many()])
+
+        @self.app.route("/missing/")
+        @cached("missing", [Table.PLANT])
+        def missing():
+            self.calls += 1
+            return jsonify({"error": "Not found"}), 404
+
+        self.client = self.app.test_client()
+
+    def test_repeated_gets_served_from_memory(self):
+        first = self.client.get("/plants/count/")
+        second = self.client.get("/plants/count/")
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second.headers["ETag"], first.headers["ETag"])
+        self.assertEqual(
+            response_cache_stats()["plant_count"],
+            {"hits": 1, "misses": 1, "evictions": 0, "size": 1, "hit_rate": 0.5},
+        )
+
+    def test_keyed_by_query_and_format(self):
+        self.client.get("/plants/count/")
+        self.client.get("/plants/count/?fields=count")
+        self.client.get("/plants/count/", headers={"Accept": "application/msgpack"})
+
+        self.assertEqual(self.calls, 3)
+
+    def test_writes_to_dependencies_evict(self):
+        self.client.get("/plants/count/")
+        Table.SYSTEM.create(System.from_dict({"name": "Shelf"}))
+        self.client.get("/plants/count/")
+        self.assertEqual(self.calls, 1)
+
+        Table.PLANT.create(Plant.from_dict({"phase": PHASES.ADULT}))
+        response = self.client.get("/plants/count/")
+
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(response.json, {"count": 1})
+
+    def test_writes_by_other_processes_seen(self):
+        etag = self.client.get("/plants/count/").headers["ETag"]
+
+        # Written by another process: nothing is evicted here, only the
+        # shared version moves
+        with patch.object(response_cache.RouteCache, "evict"):
+            Table.PLANT.create(Plant.from_dict({"phase": PHASES.ADULT}))
+        response = self.client.get("/plants/count/", headers={"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, {"count": 1})
+        self.assertEqual(self.calls, 2)
+
+    def test_table_cached_bodies_follow_writes_elsewhere(self):
+        care_plan_id = Table.CARE_PLAN.create(
+            CarePlan(
+                name="Weekly", watering=7, fertilizing=14, cleaning=30, potting=365
+            )
+        )
+        self.client.get("/care_plans/names/")
+
+        # Another process writes: neither cache here is evicted
+        db = get_db_config().db
+        db["care_plan"].update_one({"_id": care_plan_id}, {"$set": {"name": "Daily"}})
+        db["table_version"].update_one({"_id": "care_plan"}, {"$inc": {"version": 1}})
+
+        self.assertEqual(self.client.get("/care_plans/names/").json, ["Daily"])
+
+    def test_hits_answer_if_none_match(self):
+        etag = self.client.get("/plants/count/").headers["ETag"]
+
+        response = self.client.get("/plants/count/", headers={"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.calls, 1)
+
+    def test_errors_not_cached(self):
+        self.client.get("/missing/")
+        response = self.client.get("/missing/")
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.calls, 2)
@@ -0,0 +1,170 @@
+"""
+Tests for JSON serialization
+"""
+
+import json
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+from flask import Flask, jsonify, request
+
+from models.alert import Alert, AlertTypes
+from models.plant import Plant, PHASES
+from shared.serialization import (
+    MSGPACK,
+    MsgpackRequest,
+    OrjsonProvider,
+    dump_models,
+    dumps,
+    packb,
+    unpackb,
+)
+
+
+class TestSerialization(unittest.TestCase):
+
+    def setUp(self):
+        self.plants = [
+            Plant(
+                phase=PHASES.ADULT,
+                species_id=ObjectId(),
+                watered_on=datetime(2024, 5, 1, 8, 30, 0, 120000),
+            )
+            for _ in range(3)
+        ]
+
+    def test_models_match_json_mode_dump(self):
+        expected = [plant.model_dump(mode="json") for plant in self.plants]
+
+        self.assertEqual(json.loads(dump_models(self.plants)), expected)
+        self.assertEqual(json.loads(dumps(self.plants)), expected)
+
+    def test_mixed_model_lists(self):
+        alert = Alert(model_id=ObjectId(), alert_type=AlertTypes.WATER)
+        items = [self.plants[0], alert]
+
+        self.assertEqual(
+            json.loads(dump_models(items)),
+            [item.model_dump(mode="json") for item in items],
+        )
+        self.assertEqual(dump_models([]), b"[]")
+
+    def test_extra_object_ids(self):
+        # model_dump(mode="json") cannot serialize these
+        legacy_id = ObjectId()
+        plant = Plant(phase=PHASES.ADULT, legacy_id=legacy_id)
+
+        self.assertEqual(
+            json.loads(dump_models([plant]))[0]["legacy_id"], str(legacy_id)
+        )
+        self.assertEqual(json.loads(dumps(plant))["legacy_id"], str(legacy_id))
+
+    def test_flask_provider(self):
+        app = Flask(__name__)
+        app.json = OrjsonProvider(app)
+
+        @app.route("/echo/", methods=["POST"])
+        def echo():
+            return jsonify({"received": request.json, "plants": self.plants[:1]})
+
+        response = app.test_client().post("/echo/", json={"a": [1, 2]})
+
+        self.assertEqual(response.mimetype, "application/json")
+        self.assertEqual(response.json["received"], {"a": [1, 2]})
+        self.assertEqual(
+            response.json["plants"], [self.plants[0].model_dump(mode="json")]
+        )
+
+
+class TestMessagePack(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.json = OrjsonProvider(self.app)
+        self.app.request_class = MsgpackRequest
+
+        @self.app.route("/echo/", methods=["POST"])
+        def echo():
+            plant = Plant.model_validate(request.json)
+            return jsonify([plant])
+
+        self.client = self.app.test_client()
+
+    def test_round_trip_keeps_bson_types(self):
+        plant = Plant(
+            phase=PHASES.ADULT,
+            species_id=ObjectId(),
+            watered_on=datetime(2024, 5, 1, 8, 30, 0, 920000),
+        )
+
+        (decoded,) = unpackb(packb([plant]))
+
+        self.assertEqual(decoded["id"], plant.id)
+        self.assertEqual(decoded["species_id"], plant.species_id)
+        self.assertEqual(decoded["watered_on"], plant.watered_on)
+        self.assertEqual(decoded["phase"], "Adult")
+        self.assertEqual(
+            unpackb(packb(plant), json_compatible=True),
+            plant.model_dump(mode="json"),
+        )
+
+    def test_extra_fields_kept(self):
+        legacy_id = ObjectId()
+        plant = Plant(phase=PHASES.ADULT, legacy_id=legacy_id)
+
+        self.assertEqual(unpackb(packb([plant]))[0]["legacy_id"], legacy_id)
+
+    def test_negotiated_request_and_response(self):
+        body = packb({"phase": "Adult", "watered_on": datetime(2024, 5, 1)})
+
+        response = self.client.post(
+            "/echo/", data=body, content_type=MSGPACK, headers={"Accept": MSGPACK}
+        )
+
+        self.assertEqual(response.mimetype, MSGPACK)
+        self.assertIn("Accept", response.headers["Vary"])
+        self.assertEqual(unpackb(response.data)[0]["watered_on"], datetime(2024, 5, 1))
+
+    def test_datetimes_written_as_extension(self):
+        body = packb(
+            {
+                "naive": datetime(2024, 5, 1, 8, 30, 0, 999999),
+                "aware": datetime(
+                    2024, 5, 1, 10, 30, tzinfo=timezone(timedelta(hours=2))
+                ),
+                "before_epoch": datetime(1969, 12, 31, 23, 59, 59, 500000),
+            }
+        )
+
+        self.assertEqual(
+            unpackb(body),
+            {
+                "naive": datetime(2024, 5, 1, 8, 30, 0, 999999),
+                "aware": datetime(2024, 5, 1, 8, 30),
+                "before_epoch": datetime(1969, 12, 31, 23, 59, 59, 500000),
+            },
+        )
+        self.assertEqual(
+            unpackb(body, json_compatible=True)["naive"], "2024-05-01T08:30:00.999999"
+        )
+
+    def test_timestamp_extension_decoded(self):
+        # fixext 8 timestamp: 500000000 ns << 34 | 1714521600 s
+        body = bytes.fromhex("d7ff7735940066318600")
+
+        self.assertEqual(unpackb(body), datetime(2024, 5, 1, 0, 0, 0, 500000))
+        self.assertEqual(
+            unpackb(body, json_compatible=True), "2024-05-01T00:00:00.500000"
+        )
+
+    def test_json_by_default(self):
+        response = self.client.post("/echo/", json={"phase": "Adult"})
+
+        self.assertEqual(response.mimetype, "application/json")
+        self.assertEqual(response.json[0]["phase"], "Adult")
+
+    def test_invalid_body_rejected(self):
+        response = self.client.post("/echo/", data=b"\xc1", content_type=MSGPACK)
+
+        self.assertEqual(response.status_code, 400)